@@ -0,0 +1,78 @@
+"""index access patterns
+
+Adds the indexes the bot actually queries by and drops the unique
+constraints that duplicate the primary keys of users and tokens.
+
+Indexes are built concurrently, outside of a transaction, so the
+migration does not block writes during a live event. A failed
+concurrent build leaves an INVALID index behind: drop it, fix the data
+(e.g. duplicate token names) and run the migration again.
+
+Revision ID: ba2008f32d48
+Revises: 3a820545cbfa
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ba2008f32d48'
+down_revision: Union[str, None] = '3a820545cbfa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_telegram_id', 'users', ['telegram_id'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_tokens_name', 'tokens', ['name'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_activations_token_id', 'activations', ['token_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_activations_time', 'activations', ['time'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+    # unique(id) next to primary key(id); the second copy comes from the
+    # unnamed constraints of ee2cd9310f2f. activations keeps its unique(id)
+    # because its primary key is composite.
+    for table in ('users', 'tokens'):
+        for constraint in (f'{table}_id_key', f'{table}_id_key1'):
+            op.execute(
+                sa.text(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}'),
+            )
+
+
+def downgrade() -> None:
+    op.create_unique_constraint('tokens_id_key', 'tokens', ['id'])
+    op.create_unique_constraint('users_id_key', 'users', ['id'])
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_activations_time', table_name='activations',
+            postgresql_concurrently=True, if_exists=True,
+        )
+        op.drop_index(
+            'ix_activations_token_id', table_name='activations',
+            postgresql_concurrently=True, if_exists=True,
+        )
+        op.drop_index(
+            'ix_tokens_name', table_name='tokens',
+            postgresql_concurrently=True, if_exists=True,
+        )
+        op.drop_index(
+            'ix_users_telegram_id', table_name='users',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,40 @@
+"""broadcast claims
+
+Records when a recipient was claimed, so that recovery only gives up on
+batches whose claim has expired rather than on batches another worker
+is still sending.
+
+Revision ID: d4e07a1c9b52
+Revises: c1651349a34a
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e07a1c9b52'
+down_revision: Union[str, None] = 'c1651349a34a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'broadcast_recipients',
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        'ix_broadcast_recipients_claimed_at', 'broadcast_recipients', ['claimed_at'],
+        unique=False, postgresql_where=sa.text("status = 'sending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_broadcast_recipients_claimed_at', table_name='broadcast_recipients',
+    )
+    op.drop_column('broadcast_recipients', 'claimed_at')
@@ -0,0 +1,36 @@
+"""activation stats hourly
+
+Revision ID: f3f48fd0e5b2
+Revises: ba2008f32d48
+Create Date: 2026-10-19 18:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3f48fd0e5b2'
+down_revision: Union[str, None] = 'ba2008f32d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activation_stats_hourly',
+    sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('token_id', sa.UUID(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hour', 'token_id')
+    )
+    op.execute(
+        "INSERT INTO activation_stats_hourly (hour, token_id, count) "
+        "SELECT date_trunc('hour', time), token_id, count(*) "
+        "FROM activations GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activation_stats_hourly')
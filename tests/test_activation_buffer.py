@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import datetime
+import unittest
+import uuid
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+from prometheus_client import REGISTRY
+from sqlalchemy.dialects import postgresql
+
+from tosaquestbot.db import models
+from tosaquestbot.errors import TokenAlreadyActivatedError
+from tosaquestbot.services.activation_buffer import ActivationWriteBuffer
+
+TOKEN = uuid.uuid4()
+
+Key = tuple[uuid.UUID, uuid.UUID]
+
+
+class FakeResult:
+    def __init__(self: "FakeResult", rows: list[SimpleNamespace]):
+        self.rows = rows
+
+    def all(self: "FakeResult") -> list[SimpleNamespace]:
+        return self.rows
+
+
+class FakeDatabase:
+    """Activations table that records inserted batches."""
+
+    def __init__(self: "FakeDatabase", error: Exception | None = None):
+        self.error = error
+        self.activations: set[Key] = set()
+        self.batches: list[list[Key]] = []
+
+    @contextlib.asynccontextmanager
+    async def session(self: "FakeDatabase") -> AsyncIterator["FakeDatabase"]:
+        yield self
+
+    async def execute(
+        self: "FakeDatabase",
+        statement: Any,
+        params: Any = None,
+    ) -> FakeResult | None:
+        if params is not None:
+            # rollup update
+            return None
+        if self.error:
+            raise self.error
+
+        values = statement.compile(dialect=postgresql.dialect()).params
+        keys = [
+            (values[f"user_id_m{index}"], values[f"token_id_m{index}"])
+            for index in range(len(values) // 3)
+        ]
+        self.batches.append(keys)
+        rows = []
+        for user_id, token_id in keys:
+            if (user_id, token_id) in self.activations:
+                continue
+            self.activations.add((user_id, token_id))
+            rows.append(
+                SimpleNamespace(
+                    id=uuid.uuid4(),
+                    user_id=user_id,
+                    token_id=token_id,
+                    time=datetime.datetime.now(datetime.timezone.utc),
+                ),
+            )
+        return FakeResult(rows)
+
+    async def commit(self: "FakeDatabase") -> None:
+        await asyncio.sleep(0)
+
+
+class ActivationWriteBufferTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batches_concurrent_activations(
+        self: "ActivationWriteBufferTest",
+    ) -> None:
+        db = FakeDatabase()
+        buffer = ActivationWriteBuffer(db, enabled=True)  # type: ignore
+        commits = REGISTRY.get_sample_value("tosaquestbot_activation_commits_total")
+        users = [uuid.uuid4() for _ in range(5)]
+
+        activations = await asyncio.gather(
+            *[buffer.submit(user_id, TOKEN) for user_id in users],
+        )
+
+        self.assertEqual(len(db.batches), 1)
+        self.assertEqual([activation.user_id for activation in activations], users)
+        self.assertTrue(
+            all(
+                isinstance(activation, models.Activation) for activation in activations
+            ),
+        )
+        self.assertEqual(buffer.commits, 1)
+        self.assertEqual(buffer.flushed_rows, 5)
+        self.assertEqual(
+            REGISTRY.get_sample_value("tosaquestbot_activation_commits_total"),
+            (commits or 0) + 1,
+        )
+
+    async def test_full_batch_flushes_at_once(
+        self: "ActivationWriteBufferTest",
+    ) -> None:
+        db = FakeDatabase()
+        buffer = ActivationWriteBuffer(  # type: ignore
+            db,
+            enabled=True,
+            flush_interval_ms=200,
+            max_batch=2,
+        )
+
+        first = asyncio.gather(
+            buffer.submit(uuid.uuid4(), TOKEN),
+            buffer.submit(uuid.uuid4(), TOKEN),
+        )
+        await asyncio.wait_for(first, 0.1)
+        self.assertIsNone(buffer._flush_handle)
+
+        # the timer of the full batch must not flush the next one early
+        await asyncio.sleep(0.15)
+        last = asyncio.ensure_future(buffer.submit(uuid.uuid4(), TOKEN))
+        await asyncio.sleep(0.1)
+        self.assertFalse(last.done())
+        self.assertEqual(buffer.pending, 1)
+
+        await last
+        self.assertEqual([len(batch) for batch in db.batches], [2, 1])
+
+    async def test_duplicates(self: "ActivationWriteBufferTest") -> None:
+        db = FakeDatabase()
+        user_id = uuid.uuid4()
+        db.activations.add((user_id, TOKEN))
+        other_user_id = uuid.uuid4()
+        buffer = ActivationWriteBuffer(db, enabled=True)  # type: ignore
+
+        results = await asyncio.gather(
+            buffer.submit(user_id, TOKEN),
+            buffer.submit(other_user_id, TOKEN),
+            buffer.submit(other_user_id, TOKEN),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[0], TokenAlreadyActivatedError)
+        self.assertIsInstance(results[1], models.Activation)
+        self.assertIsInstance(results[2], TokenAlreadyActivatedError)
+        self.assertEqual(len(db.batches), 1)
+
+    async def test_error_reaches_every_waiter(
+        self: "ActivationWriteBufferTest",
+    ) -> None:
+        error = OSError("connection lost")
+        db = FakeDatabase(error)
+        buffer = ActivationWriteBuffer(db, enabled=True)  # type: ignore
+
+        with self.assertLogs("tosaquestbot.services.activation_buffer", "ERROR"):
+            results = await asyncio.gather(
+                *[buffer.submit(uuid.uuid4(), TOKEN) for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        self.assertEqual(results, [error, error, error])
+        self.assertEqual(buffer.commits, 0)
+        self.assertEqual(buffer.pending, 0)
+
+    async def test_close(self: "ActivationWriteBufferTest") -> None:
+        db = FakeDatabase()
+        buffer = ActivationWriteBuffer(  # type: ignore
+            db,
+            enabled=True,
+            flush_interval_ms=10000,
+        )
+
+        waiting = asyncio.ensure_future(buffer.submit(uuid.uuid4(), TOKEN))
+        await asyncio.sleep(0)
+        await buffer.close()
+        activation = await asyncio.wait_for(waiting, 0.1)
+        self.assertIsInstance(activation, models.Activation)
+        self.assertIsNone(buffer._flush_handle)
+
+        # once closed every activation is written right away
+        await asyncio.wait_for(buffer.submit(uuid.uuid4(), TOKEN), 1)
+        self.assertEqual([len(batch) for batch in db.batches], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import unittest
+import uuid
+from typing import Any, AsyncIterator, Callable
+
+from tosaquestbot.services.activation_index import (
+    ActivationIndex,
+    _Bitsets,
+    _parse_event,
+    activation_event,
+)
+
+USER = uuid.uuid4()
+OTHER_USER = uuid.uuid4()
+TOKEN = uuid.uuid4()
+OTHER_TOKEN = uuid.uuid4()
+
+Row = tuple[uuid.UUID, uuid.UUID]
+
+
+class FakeResult:
+    def __init__(
+        self: "FakeResult",
+        partitions: list[list[Row]],
+        on_partition: Callable[[int], None],
+    ):
+        self._partitions = partitions
+        self._on_partition = on_partition
+
+    async def partitions(self: "FakeResult", size: int) -> AsyncIterator[list[Row]]:
+        for index, partition in enumerate(self._partitions):
+            self._on_partition(index)
+            await asyncio.sleep(0)
+            yield partition
+
+
+class FakeDatabase:
+    def __init__(
+        self: "FakeDatabase",
+        partitions: list[list[Row]],
+        on_partition: Callable[[int], None] = lambda index: None,
+    ):
+        self.result = FakeResult(partitions, on_partition)
+
+    @contextlib.asynccontextmanager
+    async def session(self: "FakeDatabase") -> AsyncIterator["FakeDatabase"]:
+        yield self
+
+    async def stream(self: "FakeDatabase", statement: Any) -> FakeResult:
+        return self.result
+
+
+class FakeBus:
+    def __init__(self: "FakeBus", enabled: bool):
+        self.enabled = enabled
+        self.connected = False
+
+    def subscribe(self: "FakeBus", topic: str, callback: Any) -> None:
+        self.callback = callback
+
+
+class BitsetsTest(unittest.TestCase):
+    def test_add(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        bitsets.add(USER, TOKEN)
+        bitsets.add(USER, OTHER_TOKEN)
+        bitsets.add(OTHER_USER, OTHER_TOKEN)
+
+        self.assertTrue(bitsets.has(USER, TOKEN))
+        self.assertTrue(bitsets.has(USER, OTHER_TOKEN))
+        self.assertFalse(bitsets.has(OTHER_USER, TOKEN))
+        self.assertEqual(bitsets.count(USER), 2)
+        self.assertEqual(bitsets.count(OTHER_USER), 1)
+
+    def test_add_twice(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        bitsets.add(USER, TOKEN)
+        bitsets.add(USER, TOKEN)
+
+        self.assertEqual(bitsets.count(USER), 1)
+
+    def test_discard(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        bitsets.add(USER, TOKEN)
+        bitsets.add(USER, OTHER_TOKEN)
+        bitsets.discard(USER, TOKEN)
+        bitsets.discard(USER, TOKEN)
+
+        self.assertFalse(bitsets.has(USER, TOKEN))
+        self.assertTrue(bitsets.has(USER, OTHER_TOKEN))
+        self.assertEqual(bitsets.count(USER), 1)
+
+    def test_discard_unknown(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        bitsets.add(USER, TOKEN)
+        bitsets.discard(USER, OTHER_TOKEN)
+        bitsets.discard(OTHER_USER, TOKEN)
+
+        self.assertEqual(bitsets.count(USER), 1)
+        self.assertEqual(bitsets.count(OTHER_USER), 0)
+
+    def test_apply_events(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        bitsets.apply(_parse_event(activation_event("+", USER, TOKEN)))
+        bitsets.apply(_parse_event(activation_event("+", USER, OTHER_TOKEN)))
+        bitsets.apply(_parse_event(activation_event("-", USER, TOKEN)))
+
+        self.assertFalse(bitsets.has(USER, TOKEN))
+        self.assertEqual(bitsets.count(USER), 1)
+
+    def test_memory_usage_grows(self: "BitsetsTest") -> None:
+        bitsets = _Bitsets()
+        empty = bitsets.memory_usage()
+        for _ in range(100):
+            bitsets.add(uuid.uuid4(), TOKEN)
+
+        self.assertGreater(bitsets.memory_usage(), empty)
+
+
+class ActivationIndexTest(unittest.IsolatedAsyncioTestCase):
+    async def test_load(self: "ActivationIndexTest") -> None:
+        db = FakeDatabase([[(USER, TOKEN), (USER, OTHER_TOKEN)]])
+        index = ActivationIndex(db, enabled=True)  # type: ignore
+        index.start()
+        self.assertIsNone(index.has(USER, TOKEN))
+
+        await index._task  # type: ignore
+        self.assertTrue(index.ready)
+        self.assertTrue(index.has(USER, TOKEN))
+        self.assertEqual(index.count(USER), 2)
+        self.assertEqual(index.count(OTHER_USER), 0)
+
+    async def test_load_replays_changes(self: "ActivationIndexTest") -> None:
+        index: ActivationIndex
+
+        def commit(partition: int) -> None:
+            # committed while the first partition is being read
+            if partition == 0:
+                index.discard(USER, TOKEN)
+                index.add(OTHER_USER, TOKEN)
+
+        db = FakeDatabase(
+            [[(USER, TOKEN)], [(USER, OTHER_TOKEN), (OTHER_USER, TOKEN)]],
+            commit,
+        )
+        index = ActivationIndex(db, enabled=True)  # type: ignore
+        index.start()
+        await index._task  # type: ignore
+
+        self.assertFalse(index.has(USER, TOKEN))
+        self.assertTrue(index.has(USER, OTHER_TOKEN))
+        self.assertTrue(index.has(OTHER_USER, TOKEN))
+        self.assertEqual(index.count(USER), 1)
+        self.assertEqual(index.count(OTHER_USER), 1)
+        self.assertIsNone(index._replay)
+
+    async def test_dropped_when_too_large(self: "ActivationIndexTest") -> None:
+        db = FakeDatabase([[(USER, TOKEN)]])
+        index = ActivationIndex(db, enabled=True, max_memory_mb=0)  # type: ignore
+        index.start()
+        await index._task  # type: ignore
+
+        self.assertFalse(index.enabled)
+        self.assertFalse(index.ready)
+        self.assertIsNone(index.count(USER))
+
+    async def test_shared_without_bus(self: "ActivationIndexTest") -> None:
+        db = FakeDatabase([[(USER, TOKEN)]])
+        index = ActivationIndex(db, FakeBus(enabled=False), enabled=True)  # type: ignore
+        index.start(shared=True)
+
+        self.assertFalse(index.enabled)
+        self.assertIsNone(index._task)
+        self.assertFalse(index.ready)
+        self.assertIsNone(index.has(USER, TOKEN))
+
+    async def test_shared_with_bus(self: "ActivationIndexTest") -> None:
+        db = FakeDatabase([[(USER, TOKEN)]])
+        bus = FakeBus(enabled=True)
+        index = ActivationIndex(db, bus, enabled=True)  # type: ignore
+        index.start(shared=True)
+        self.assertIsNone(index._task)
+
+        # the bus connects and asks for a reload
+        bus.connected = True
+        bus.callback(None)
+        await index._task  # type: ignore
+        self.assertTrue(index.ready)
+        self.assertTrue(index.has(USER, TOKEN))
+
+        bus.callback([activation_event("-", USER, TOKEN)])
+        self.assertFalse(index.has(USER, TOKEN))
+
+        bus.connected = False
+        self.assertIsNone(index.has(USER, TOKEN))
+
+
+if __name__ == "__main__":
+    unittest.main()
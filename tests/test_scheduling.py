@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from typing import Any
+
+from tosaquestbot.middlewares.scheduling import ChatScheduler
+
+
+class ChatSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self: "ChatSchedulerTest") -> None:
+        self.log: list[tuple[int, int]] = []
+        self.running: set[int] = set()
+        self.peak = 0
+        self.delay = 0.01
+
+    async def handle(
+        self: "ChatSchedulerTest", event: Any, data: dict[str, Any]
+    ) -> int:
+        chat_id = data["event_chat"].id
+        self.assertNotIn(chat_id, self.running)
+        self.running.add(chat_id)
+        self.peak = max(self.peak, len(self.running))
+        self.log.append((chat_id, event.update_id))
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running.discard(chat_id)
+        return event.update_id
+
+    def send(
+        self: "ChatSchedulerTest",
+        scheduler: ChatScheduler,
+        chat_id: int,
+        update_id: int,
+    ) -> "asyncio.Task[Any]":
+        return asyncio.create_task(
+            scheduler(
+                self.handle,
+                SimpleNamespace(update_id=update_id),
+                {"event_chat": SimpleNamespace(id=chat_id)},
+            ),
+        )
+
+    def assert_idle(self: "ChatSchedulerTest", scheduler: ChatScheduler) -> None:
+        self.assertEqual(scheduler.running, 0)
+        self.assertEqual(scheduler.pending, 0)
+        self.assertFalse(scheduler._waiting)
+        self.assertFalse(scheduler._ready)
+        self.assertFalse(scheduler._busy)
+
+    async def test_updates_of_chat_run_in_order(self: "ChatSchedulerTest") -> None:
+        scheduler = ChatScheduler(concurrency=4)
+        tasks = [self.send(scheduler, 1, update_id) for update_id in (3, 5, 1, 4, 2)]
+        await asyncio.gather(*tasks)
+
+        # the first update starts right away, the rest wait and are sorted
+        self.assertEqual([update_id for _, update_id in self.log], [3, 1, 2, 4, 5])
+        self.assertEqual(self.peak, 1)
+        self.assert_idle(scheduler)
+
+    async def test_chats_take_turns(self: "ChatSchedulerTest") -> None:
+        scheduler = ChatScheduler(concurrency=1)
+        tasks = [self.send(scheduler, 1, update_id) for update_id in (1, 2, 3)]
+        tasks += [self.send(scheduler, 2, update_id) for update_id in (11, 12)]
+        tasks.append(self.send(scheduler, 3, 21))
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(
+            self.log,
+            [(1, 1), (2, 11), (3, 21), (1, 2), (2, 12), (1, 3)],
+        )
+        self.assert_idle(scheduler)
+
+    async def test_concurrency_limit(self: "ChatSchedulerTest") -> None:
+        scheduler = ChatScheduler(concurrency=3)
+        tasks = [self.send(scheduler, chat_id, 1) for chat_id in range(10)]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.running, 3)
+        self.assertEqual(scheduler.pending, 7)
+
+        await asyncio.gather(*tasks)
+        self.assertEqual(self.peak, 3)
+        self.assertEqual(len(self.log), 10)
+        self.assert_idle(scheduler)
+
+    async def test_update_without_chat_is_not_scheduled(
+        self: "ChatSchedulerTest",
+    ) -> None:
+        scheduler = ChatScheduler(concurrency=1)
+
+        async def handler(event: Any, data: dict[str, Any]) -> str:  # noqa: WPS430
+            return "done"
+
+        self.assertEqual(await scheduler(handler, SimpleNamespace(), {}), "done")
+        self.assert_idle(scheduler)
+
+    async def test_cancel_waiting_update(self: "ChatSchedulerTest") -> None:
+        scheduler = ChatScheduler(concurrency=1)
+        tasks = [self.send(scheduler, 1, update_id) for update_id in (1, 2, 3)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual(results[2], 3)
+        self.assertEqual(self.log, [(1, 1), (1, 3)])
+        self.assert_idle(scheduler)
+
+    async def test_cancel_only_update_of_ready_chat(
+        self: "ChatSchedulerTest",
+    ) -> None:
+        scheduler = ChatScheduler(concurrency=1)
+        first = self.send(scheduler, 1, 1)
+        withdrawn = self.send(scheduler, 2, 11)
+        await asyncio.sleep(0)
+        self.assertEqual(list(scheduler._ready), [2])
+        withdrawn.cancel()
+
+        await asyncio.gather(first, withdrawn, return_exceptions=True)
+        self.assertEqual(self.log, [(1, 1)])
+        self.assert_idle(scheduler)
+
+    async def test_cancel_running_update(self: "ChatSchedulerTest") -> None:
+        self.delay = 10
+        scheduler = ChatScheduler(concurrency=1)
+        running = self.send(scheduler, 1, 1)
+        waiting = self.send(scheduler, 2, 11)
+        await asyncio.sleep(0)
+        running.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await running
+
+        # the slot goes to the next chat
+        await asyncio.sleep(0)
+        self.assertEqual(self.log, [(1, 1), (2, 11)])
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.assert_idle(scheduler)
+
+
+if __name__ == "__main__":
+    unittest.main()
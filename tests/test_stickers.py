@@ -0,0 +1,100 @@
+import re
+import tempfile
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from PIL import Image
+
+from tosaquestbot import stickers
+
+CONFIG = {
+    "cache_dir": ".cache/stickers",
+    "columns": 4,
+    "rows": 6,
+    "dpi": 300,
+    "workers": 1,
+}
+
+# small pages keep the tests fast
+DPI = 30
+COLUMNS = 2
+ROWS = 2
+
+
+def page_counts(document: bytes) -> list[int]:
+    # every appended page adds an updated page tree to the document
+    return [int(count) for count in re.findall(rb"/Count (\d+)", document)]
+
+
+class RenderTokenSheetsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_ordered_by_name(self: "RenderTokenSheetsTest") -> None:
+        tokens = [
+            SimpleNamespace(id=uuid.UUID(int=number), name=name)
+            for number, name in ((1, "c"), (2, "a"), (3, "b"))
+        ]
+        with mock.patch.object(stickers, "render_sheets") as render_sheets:
+            stickers.render_token_sheets(tokens, config=CONFIG)
+
+        pairs = render_sheets.call_args.args[0]
+        self.assertEqual([name for _, name in pairs], ["a", "b", "c"])
+        self.assertEqual(pairs[0][0], str(uuid.UUID(int=2)))
+
+    def test_count_sheet_pages(self: "RenderTokenSheetsTest") -> None:
+        self.assertEqual(stickers.count_sheet_pages(0, config=CONFIG), 0)
+        self.assertEqual(stickers.count_sheet_pages(24, config=CONFIG), 1)
+        self.assertEqual(stickers.count_sheet_pages(25, config=CONFIG), 2)
+
+
+class RenderSheetsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self: "RenderSheetsTest") -> None:
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        self.cache_dir = cache.name
+        # ten cached stickers make three pages, no render process needed
+        self.tokens = [
+            (str(uuid.UUID(int=number)), str(number)) for number in range(10)
+        ]
+        for number, (token_id, name) in enumerate(self.tokens):
+            sticker = Image.new("L", (40, 48), color=number * 20)
+            sticker.save(stickers.sticker_path(self.cache_dir, token_id, name))
+
+    async def render(self: "RenderSheetsTest", **kwargs: object) -> list[bytes]:
+        sheets = stickers.render_sheets(
+            self.tokens,
+            self.cache_dir,
+            columns=COLUMNS,
+            rows=ROWS,
+            dpi=DPI,
+            **kwargs,  # type: ignore
+        )
+        return [sheet async for sheet in sheets]
+
+    async def test_one_pdf(self: "RenderSheetsTest") -> None:
+        documents = await self.render()
+
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(page_counts(documents[0])[-1], 3)
+
+    async def test_split_pdf(self: "RenderSheetsTest") -> None:
+        pages = await self.render(max_document_bytes=1)
+        self.assertEqual([page_counts(page)[-1] for page in pages], [1, 1, 1])
+
+        max_bytes = len((await self.render())[0]) - 1
+        documents = await self.render(max_document_bytes=max_bytes)
+
+        self.assertEqual([page_counts(document)[-1] for document in documents], [2, 1])
+        for document in documents:
+            self.assertLessEqual(len(document), max_bytes)
+
+    async def test_png_per_page(self: "RenderSheetsTest") -> None:
+        documents = await self.render(sheet_format="png")
+
+        self.assertEqual(len(documents), 3)
+        for document in documents:
+            self.assertTrue(document.startswith(b"\x89PNG"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+from tosaquestbot.middlewares import throttling
+from tosaquestbot.middlewares.throttling import UserBuckets
+
+USER = 1
+OTHER_USER = 2
+
+
+class FakeClock:
+    def __init__(self: "FakeClock"):
+        self.now = 1000.0
+
+    def monotonic(self: "FakeClock") -> float:
+        return self.now
+
+
+class UserBucketsTest(unittest.TestCase):
+    def setUp(self: "UserBucketsTest") -> None:
+        self.clock = FakeClock()
+        patcher = mock.patch.object(throttling, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst(self: "UserBucketsTest") -> None:
+        buckets = UserBuckets(rate=1, burst=3)
+
+        self.assertEqual([buckets.acquire(USER) for _ in range(3)], [True] * 3)
+        self.assertIs(buckets.acquire(USER), False)
+        self.assertIs(buckets.acquire(OTHER_USER), True)
+
+    def test_refill(self: "UserBucketsTest") -> None:
+        buckets = UserBuckets(rate=0.5, burst=2)
+        buckets.acquire(USER)
+        buckets.acquire(USER)
+
+        self.clock.now += 1
+        self.assertIs(buckets.acquire(USER), False)
+        self.clock.now += 1
+        self.assertIs(buckets.acquire(USER), True)
+
+        # never above the burst, however long the user is away
+        self.clock.now += 100
+        self.assertEqual([buckets.acquire(USER) for _ in range(2)], [True] * 2)
+        self.assertIs(buckets.acquire(USER), False)
+
+    def test_one_notice_per_burst(self: "UserBucketsTest") -> None:
+        buckets = UserBuckets(rate=1, burst=1)
+        buckets.acquire(USER)
+
+        self.assertIs(buckets.acquire(USER), False)
+        self.assertIsNone(buckets.acquire(USER))
+        self.assertIsNone(buckets.acquire(USER))
+
+        # an allowed message starts a new burst with its own notice
+        self.clock.now += 1
+        self.assertIs(buckets.acquire(USER), True)
+        self.assertIs(buckets.acquire(USER), False)
+        self.assertIsNone(buckets.acquire(USER))
+
+    def test_idle_eviction(self: "UserBucketsTest") -> None:
+        buckets = UserBuckets(rate=0.001, burst=1, idle_timeout=60)
+        buckets.acquire(USER)
+        self.clock.now += 30
+        buckets.acquire(OTHER_USER)
+        self.assertEqual(len(buckets), 2)
+
+        self.clock.now += 30
+        self.assertIs(buckets.acquire(OTHER_USER), False)
+        self.assertEqual(len(buckets), 1)
+
+        # a forgotten user starts over with a full bucket
+        self.assertIs(buckets.acquire(USER), True)
+        self.assertEqual(len(buckets), 2)
+
+    def test_touch_keeps_bucket(self: "UserBucketsTest") -> None:
+        buckets = UserBuckets(rate=1, burst=1, idle_timeout=60)
+        buckets.acquire(USER)
+        buckets.acquire(OTHER_USER)
+
+        self.clock.now += 50
+        buckets.acquire(USER)
+        self.clock.now += 20
+        buckets.acquire(OTHER_USER)
+
+        self.assertEqual(len(buckets), 2)
+        self.assertEqual(list(buckets._buckets), [USER, OTHER_USER])
+
+
+if __name__ == "__main__":
+    unittest.main()
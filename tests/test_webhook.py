@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from typing import Any
+from unittest import mock
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+
+from tosaquestbot.webhook import DrainingRequestHandler
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "User"},
+        "text": "hello",
+    },
+}
+
+
+class FakeRequest:
+    async def json(self: "FakeRequest", loads: Any) -> dict[str, Any]:
+        return UPDATE
+
+
+class InlineDrainTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self: "InlineDrainTest") -> None:
+        self.bot = Bot("42:TEST")
+        self.dispatcher = Dispatcher()
+        self.dispatcher.silent_call_request = mock.AsyncMock()  # type: ignore
+        self.finished = asyncio.Event()
+        self.handler = DrainingRequestHandler(
+            dispatcher=self.dispatcher,
+            bot=self.bot,
+            handle_in_background=False,
+            inline_reply_timeout=0.05,
+        )
+
+    async def asyncTearDown(self: "InlineDrainTest") -> None:
+        await self.bot.session.close()
+
+    def register(self: "InlineDrainTest", delay: float) -> None:
+        @self.dispatcher.message()
+        async def reply(message: Message) -> SendMessage:  # noqa: WPS430
+            await asyncio.sleep(delay)
+            self.finished.set()
+            return message.answer("done")
+
+    async def test_fast_update_replies_inline(self: "InlineDrainTest") -> None:
+        self.register(0)
+        response = await self.handler._handle_request(self.bot, FakeRequest())
+        self.assertEqual(response.status, 200)
+        self.assertTrue(self.finished.is_set())
+        self.dispatcher.silent_call_request.assert_not_awaited()
+        self.assertEqual(await self.handler.drain(1), (0, 0))
+
+    async def test_slow_update_is_drained(self: "InlineDrainTest") -> None:
+        self.register(0.2)
+        response = await self.handler._handle_request(self.bot, FakeRequest())
+        self.assertEqual(response.status, 200)
+        self.assertFalse(self.finished.is_set())
+
+        self.assertEqual(await self.handler.drain(5), (1, 0))
+        self.assertTrue(self.finished.is_set())
+        self.dispatcher.silent_call_request.assert_awaited_once()
+
+    async def test_slow_update_is_cancelled_after_timeout(
+        self: "InlineDrainTest",
+    ) -> None:
+        self.register(10)
+        await self.handler._handle_request(self.bot, FakeRequest())
+
+        self.assertEqual(await self.handler.drain(0.05), (0, 1))
+        await asyncio.sleep(0)
+        self.assertFalse(self.finished.is_set())
+        self.dispatcher.silent_call_request.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,14 +7,14 @@ from typing import NoReturn
 
 import coloredlogs  # type: ignore
 
-from tosaquestbot import main
+from tosaquestbot import cli, main, workers
 from tosaquestbot.containers import Container
 from tosaquestbot.settings import Settings
 
 logger = getLogger("tosaquestbot")
 
 
-async def bootstrap(argsv: list[str]) -> int:
+async def bootstrap(argsv: list[str], worker: int | None = None) -> int:
     parser = argparse.ArgumentParser(description="Tosa Quest Bot")
     parser.add_argument(
         "--log-level",
@@ -22,10 +22,22 @@ async def bootstrap(argsv: list[str]) -> int:
         default="INFO",
         help="Log level",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of webhook worker processes sharing the port",
+    )
+    cli.add_commands(parser)
     args = parser.parse_args(argsv)
     coloredlogs.install(level=args.log_level)  # type: ignore
 
-    logger.info("Running tosaquestbot version %s", version(__package__))
+    if worker is None:
+        logger.info("Running tosaquestbot version %s", version(__package__))
+        if args.workers > 1 and not args.command:
+            return await workers.supervise(argsv, args.workers)
+    else:
+        logger.info("Running worker %d", worker)
 
     container = Container()
 
@@ -36,7 +48,10 @@ async def bootstrap(argsv: list[str]) -> int:
     logger.info("Wiring packages")
     container.wire(packages=["tosaquestbot"])
 
-    await main.main()
+    if args.command:
+        return await cli.run(args)
+
+    await main.main(primary=not worker, reuse_port=worker is not None)
 
     return 0
 
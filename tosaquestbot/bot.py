@@ -1,31 +1,114 @@
+import asyncio
 from logging import getLogger
 from typing import TYPE_CHECKING, cast
 from urllib.parse import urljoin, urlparse
 
 from aiogram import types
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 from dependency_injector.wiring import Provide, inject
 
-from tosaquestbot import handlers
+from tosaquestbot import handlers, metrics, tracing
+from tosaquestbot.middlewares.metrics import HandlerMetricsMiddleware
+from tosaquestbot.middlewares.scheduling import ChatScheduler
+from tosaquestbot.middlewares.throttling import ThrottlingMiddleware
+from tosaquestbot.middlewares.tracing import HandlerSpanMiddleware, TracingMiddleware
+from tosaquestbot.webhook import DrainingRequestHandler, QueuedRequestHandler
 
 if TYPE_CHECKING:
     from aiogram import Bot, Dispatcher
     from aiohttp.web import Application
     from dependency_injector.providers import Configuration
 
+    from tosaquestbot.db.database import Database
+
 logger = getLogger(__name__)
 
+BOT_COMMANDS = [
+    types.BotCommand(command="start", description="Розпочати"),
+]
+
+
+async def log_error(event: types.ErrorEvent) -> bool:
+    """Log a failed update instead of failing the webhook request.
+
+    Telegram redelivers updates answered with an error status.
+
+    Args:
+        event: Error event.
+
+    Returns:
+        True, the error is handled.
+    """
+    logger.error(
+        "Failed to process update %s",
+        event.update.update_id,
+        exc_info=event.exception,
+    )
+    return True
+
 
 @inject
 async def init(
+    register: bool = True,
     bot: "Bot" = Provide["bot_context.bot"],
     dp: "Dispatcher" = Provide["bot_context.dispatcher"],
     app: "Application" = Provide["http.app"],
     config: "Configuration" = Provide["http.config"],
+    webhook_config: "Configuration" = Provide["config.webhook"],
+    metrics_config: "Configuration" = Provide["config.metrics"],
+    tracing_config: "Configuration" = Provide["config.tracing"],
+    throttling_config: "Configuration" = Provide["config.throttling"],
+    scheduler_config: "Configuration" = Provide["config.scheduler"],
+    db: "Database" = Provide["db"],
 ) -> None:
     bot.parse_mode = "HTML"
     dp.include_router(handlers.router)
 
+    # outermost, so that traces and handler timings exclude the wait for a turn
+    scheduled = cast(bool, scheduler_config["enabled"])
+    if scheduled:
+        scheduler = ChatScheduler(cast(int, scheduler_config["concurrency"]))
+        dp.update.outer_middleware(scheduler)
+        metrics.track_queue("chats", lambda: scheduler.pending)
+
+    if cast(bool, metrics_config["enabled"]):
+        handler_metrics = HandlerMetricsMiddleware()
+        for event_name, observer in dp.observers.items():
+            if event_name not in {"update", "error"}:
+                observer.middleware(handler_metrics)
+        bot.session.middleware(metrics.observe_bot_api)
+
+    if cast(bool, tracing_config["enabled"]):
+        export_path = cast(str | None, tracing_config["export_path"])
+        dp.update.outer_middleware(
+            TracingMiddleware(
+                slow_threshold=cast(int, tracing_config["slow_update_ms"]) / 1000,
+                exporter=tracing.TraceExporter(
+                    export_path,
+                    cast(float, tracing_config["export_sample_rate"]),
+                )
+                if export_path
+                else None,
+            ),
+        )
+        handler_spans = HandlerSpanMiddleware()
+        for event_name, observer in dp.observers.items():
+            if event_name not in {"update", "error"}:
+                observer.middleware(handler_spans)
+        bot.session.middleware(tracing.trace_bot_api)
+        tracing.instrument_engine(db.engine.sync_engine)
+
+    if cast(bool, throttling_config["enabled"]):
+        dp.message.middleware(
+            ThrottlingMiddleware(
+                photo_rate=cast(float, throttling_config["photo_rate"]),
+                photo_burst=cast(float, throttling_config["photo_burst"]),
+                command_rate=cast(float, throttling_config["command_rate"]),
+                command_burst=cast(float, throttling_config["command_burst"]),
+                idle_timeout=cast(float, throttling_config["idle_timeout"]),
+            ),
+        )
+
     base_url = cast(str, config["base_url"])
     rpath = f"/webhook/bot{bot.token}"
     parsed_url = urlparse(base_url)
@@ -39,16 +122,81 @@ async def init(
         webhook_path = rpath
         webhook_url = urljoin(base_url, webhook_path)
 
-    await bot.delete_webhook()
     logger.debug("Listening at webhook path: %s", webhook_path)
-    SimpleRequestHandler(dispatcher=dp, bot=bot).register(app, path=webhook_path)
+    drain_timeout = cast(float, webhook_config["drain_timeout"])
+    if cast(bool, webhook_config["queue"]):
+        queue_size = cast(int, webhook_config["queue_size"])
+        queued_handler = QueuedRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            # a worker waiting for its chat's turn must not hold up other chats,
+            # so with the scheduler limiting concurrency every update gets one
+            workers=queue_size
+            if scheduled
+            else cast(int, webhook_config["queue_workers"]),
+            max_size=queue_size,
+            drain_timeout=drain_timeout,
+        )
+        queued_handler.register(app, path=webhook_path)
+        metrics.track_queue("updates", lambda: queued_handler.pending)
+    elif cast(bool, webhook_config["inline_replies"]):
+        # wait for handlers so that their final reply goes back in the response,
+        # slower ones are answered empty and reply through the Bot API
+        dp.errors.register(log_error)
+        DrainingRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            handle_in_background=False,
+            drain_timeout=drain_timeout,
+            inline_reply_timeout=cast(float, webhook_config["inline_reply_timeout"]),
+        ).register(app, path=webhook_path)
+    else:
+        DrainingRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            drain_timeout=drain_timeout,
+        ).register(app, path=webhook_path)
     setup_application(app, dp)
 
-    await bot.set_webhook(webhook_url, allowed_updates=dp.resolve_used_update_types())
-    logger.info("Registered webhook: %s", webhook_url)
+    if not register:
+        return
+
+    await register_bot(bot, webhook_url, dp.resolve_used_update_types())
+
+
+async def register_bot(
+    bot: "Bot",
+    webhook_url: str,
+    allowed_updates: list[str],
+) -> None:
+    """Register webhook and commands unless Telegram already has them.
 
-    await bot.set_my_commands(
-        [
-            types.BotCommand(command="/start", description="Розпочати"),
-        ],
+    The webhook is never deleted: ``setWebhook`` replaces it in place, so
+    updates keep flowing to the old instances during a rolling restart.
+
+    Args:
+        bot: Bot.
+        webhook_url: Webhook URL.
+        allowed_updates: Update types to receive.
+    """
+    webhook_info, commands = await asyncio.gather(
+        bot.get_webhook_info(),
+        bot.get_my_commands(),
     )
+
+    webhook_registered = webhook_info.url == webhook_url and set(
+        webhook_info.allowed_updates or [],
+    ) == set(allowed_updates)
+
+    requests = []
+    if not webhook_registered:
+        requests.append(bot.set_webhook(webhook_url, allowed_updates=allowed_updates))
+        logger.info("Registering webhook: %s", webhook_url)
+    else:
+        logger.info("Webhook already registered: %s", webhook_url)
+    if [command.model_dump() for command in commands] != [
+        command.model_dump() for command in BOT_COMMANDS
+    ]:
+        requests.append(bot.set_my_commands(BOT_COMMANDS))
+
+    await asyncio.gather(*requests)
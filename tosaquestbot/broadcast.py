@@ -0,0 +1,354 @@
+import asyncio
+import enum
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable
+
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+    from tosaquestbot.db import models
+    from tosaquestbot.services.broadcast import BroadcastService
+
+logger = getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket shared by everything that sends to many chats."""
+
+    def __init__(self: "TokenBucket", rate: float, capacity: float | None = None):
+        """Initiate bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum burst, defaults to one second worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0  # noqa: WPS358
+        self._lock = asyncio.Lock()
+
+    async def acquire(self: "TokenBucket") -> None:
+        """Wait for a token. Waiters are served in FIFO order."""
+        async with self._lock:
+            while True:  # noqa: WPS457
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self: "TokenBucket", seconds: float) -> None:
+        """Stop handing out tokens, e.g. after a flood-control error.
+
+        Args:
+            seconds: Pause duration.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+
+
+class DeliveryStatus(enum.Enum):
+    """Outcome of a single message delivery."""
+
+    sent = "sent"
+    blocked = "blocked"
+    failed = "failed"
+
+
+@dataclass
+class BroadcastProgress:
+    """Broadcast progress counters."""
+
+    total: int
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self: "BroadcastProgress") -> int:
+        """Number of recipients already processed."""
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def rate(self: "BroadcastProgress") -> float:
+        """Messages processed per second."""
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed else 0
+
+    def count(self: "BroadcastProgress", status: DeliveryStatus) -> None:
+        """Account a delivery outcome.
+
+        Args:
+            status: Delivery status.
+        """
+        match status:
+            case DeliveryStatus.sent:
+                self.sent += 1
+            case DeliveryStatus.blocked:
+                self.blocked += 1
+            case DeliveryStatus.failed:
+                self.failed += 1
+
+
+ProgressCallback = Callable[[BroadcastProgress], Awaitable[None]]
+
+
+class Broadcaster:
+    """Rate-limited concurrent message sender."""
+
+    def __init__(  # noqa: WPS211
+        self: "Broadcaster",
+        bot: "Bot",
+        rate_limit: float = 25,
+        concurrency: int = 8,
+        max_retries: int = 3,
+        progress_interval: float = 5,
+    ):
+        """Initiate broadcaster.
+
+        Args:
+            bot: Bot.
+            rate_limit: Messages per second across all broadcasts.
+            concurrency: Maximum number of requests in flight.
+            max_retries: Attempts per message on flood control or network errors.
+            progress_interval: Seconds between progress reports.
+        """
+        self.bot = bot
+        self.bucket = TokenBucket(rate_limit)
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task[BroadcastProgress]] = set()
+
+    async def send(self: "Broadcaster", chat_id: int, text: str) -> DeliveryStatus:
+        """Send a message within the global rate limit.
+
+        Args:
+            chat_id: Recipient chat id.
+            text: Message text.
+
+        Returns:
+            Delivery status.
+        """
+        async with self._semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                await self.bucket.acquire()
+                try:
+                    await self.bot.send_message(chat_id, text)
+                except TelegramRetryAfter as exc:
+                    logger.warning("Flood control, pausing for %ss", exc.retry_after)
+                    self.bucket.pause(exc.retry_after)
+                except TelegramForbiddenError:
+                    return DeliveryStatus.blocked
+                except TelegramBadRequest as exc:
+                    logger.warning("Failed to send message to %s: %s", chat_id, exc)
+                    return DeliveryStatus.failed
+                except (TelegramNetworkError, TelegramServerError) as exc:
+                    logger.warning(
+                        "Attempt %d to send message to %s failed: %s",
+                        attempt,
+                        chat_id,
+                        exc,
+                    )
+                except TelegramAPIError as exc:
+                    logger.warning("Failed to send message to %s: %s", chat_id, exc)
+                    return DeliveryStatus.failed
+                else:
+                    return DeliveryStatus.sent
+        return DeliveryStatus.failed
+
+    async def broadcast(
+        self: "Broadcaster",
+        chat_ids: Iterable[int],
+        text: str,
+        on_progress: ProgressCallback | None = None,
+    ) -> BroadcastProgress:
+        """Send a message to many chats.
+
+        Args:
+            chat_ids: Recipient chat ids.
+            text: Message text.
+            on_progress: Called periodically and once when finished.
+
+        Returns:
+            Final progress.
+        """
+        recipients = list(dict.fromkeys(chat_ids))
+        progress = BroadcastProgress(total=len(recipients))
+
+        async def deliver(chat_id: int) -> None:  # noqa: WPS430
+            progress.count(await self.send(chat_id, text))
+
+        reporter = asyncio.create_task(self._report(progress, on_progress))
+        try:
+            await asyncio.gather(*[deliver(chat_id) for chat_id in recipients])
+        finally:
+            reporter.cancel()
+
+        logger.info(
+            "Broadcast finished: %d sent, %d blocked, %d failed",
+            progress.sent,
+            progress.blocked,
+            progress.failed,
+        )
+        await self._notify(progress, on_progress)
+        return progress
+
+    def start(
+        self: "Broadcaster",
+        chat_ids: Iterable[int],
+        text: str,
+        on_progress: ProgressCallback | None = None,
+    ) -> "asyncio.Task[BroadcastProgress]":
+        """Run a broadcast in the background.
+
+        Args:
+            chat_ids: Recipient chat ids.
+            text: Message text.
+            on_progress: Called periodically and once when finished.
+
+        Returns:
+            Broadcast task.
+        """
+        task = asyncio.create_task(
+            self.broadcast(chat_ids, text, on_progress),
+            name="broadcast",
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _report(
+        self: "Broadcaster",
+        progress: BroadcastProgress,
+        on_progress: ProgressCallback | None,
+    ) -> None:
+        while True:  # noqa: WPS457
+            await asyncio.sleep(self.progress_interval)
+            await self._notify(progress, on_progress)
+
+    async def _notify(
+        self: "Broadcaster",
+        progress: BroadcastProgress,
+        on_progress: ProgressCallback | None,
+    ) -> None:
+        if not on_progress:
+            return
+        try:
+            await on_progress(progress)
+        except TelegramAPIError as exc:
+            logger.warning("Failed to report broadcast progress: %s", exc)
+
+
+class BroadcastWorker:
+    """Background worker delivering persistent broadcast jobs.
+
+    Recipients are claimed in batches and checkpointed after every batch,
+    so a restarted worker resumes where the previous one stopped. Claims
+    left behind by a worker that died are given up on between jobs, once
+    they are older than the service's ``claim_timeout``.
+    """
+
+    def __init__(
+        self: "BroadcastWorker",
+        service: "BroadcastService",
+        broadcaster: Broadcaster,
+        batch_size: int = 100,
+        poll_interval: float = 5,
+    ):
+        """Initiate worker.
+
+        Args:
+            service: Broadcast service.
+            broadcaster: Rate-limited sender.
+            batch_size: Recipients per checkpoint.
+            poll_interval: Seconds between checks for new jobs.
+        """
+        self.service = service
+        self.broadcaster = broadcaster
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self: "BroadcastWorker") -> None:
+        """Start processing jobs in the background."""
+        self._task = asyncio.create_task(self._run(), name="broadcast-worker")
+
+    def wake(self: "BroadcastWorker") -> None:
+        """Check for new jobs right away."""
+        self._wakeup.set()
+
+    async def stop(self: "BroadcastWorker") -> None:
+        """Finish the current batch and stop."""
+        if not self._task:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+
+    async def _run(self: "BroadcastWorker") -> None:
+        while not self._stopping:
+            try:
+                await self.service.recover()
+                job = await self.service.get_next_job()
+                if job:
+                    await self._process(job)
+                    continue
+            except Exception:
+                logger.exception("Broadcast worker failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass  # noqa: WPS420
+            self._wakeup.clear()
+
+    async def _process(self: "BroadcastWorker", job: "models.BroadcastJob") -> None:
+        logger.info("Processing broadcast job %s", job.id)
+        while not self._stopping:
+            if await self.service.get_job_status(job.id) != "running":  # type: ignore
+                logger.info("Broadcast job %s was cancelled", job.id)
+                return
+
+            batch = await self.service.claim_batch(job, self.batch_size)
+            if not batch:
+                await self.service.finish_job(job)
+                return
+
+            statuses = await asyncio.gather(
+                *[
+                    self.broadcaster.send(telegram_id, str(job.text))
+                    for _, telegram_id in batch
+                ],
+            )
+            job = await self.service.checkpoint(
+                job,
+                [
+                    (position, status.value)
+                    for (position, _), status in zip(batch, statuses)
+                ],
+            )
@@ -0,0 +1,300 @@
+import asyncio
+from collections import OrderedDict
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Callable, Generic, TypeVar, cast
+
+import asyncpg
+from sqlalchemy import String, bindparam, inspect, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import make_transient_to_detached
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import InstanceState
+
+    from tosaquestbot.db.database import Database
+
+logger = getLogger(__name__)
+
+Model = TypeVar("Model")
+
+# called with the changed keys, or with None when every key may have changed
+InvalidationCallback = Callable[[list[str] | None], None]
+
+_notify_stmt = text("SELECT pg_notify(:channel, :payload)")
+_notify_many_stmt = text(
+    "SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload",
+).bindparams(bindparam("payloads", type_=ARRAY(String)))
+
+
+class InvalidationBus:
+    """Cross-process cache invalidation over Postgres ``LISTEN/NOTIFY``.
+
+    Services publish change events inside the transaction that makes the
+    change, so other processes hear about it only once it is committed.
+    Every process listens on a dedicated connection and evicts the changed
+    keys from its caches. While that connection is down caches are bypassed,
+    and after reconnecting they are cleared, since events may have been missed.
+    """
+
+    def __init__(  # noqa: WPS211
+        self: "InvalidationBus",
+        db: "Database",
+        enabled: bool = False,
+        channel: str = "cache_invalidation",
+        keepalive_interval: float = 30,
+        reconnect_interval: float = 5,
+    ):
+        """Initiate bus.
+
+        Args:
+            db: Database.
+            enabled: Whether to listen for events and cache at all.
+            channel: Notification channel.
+            keepalive_interval: Seconds between liveness checks of the connection.
+            reconnect_interval: Seconds between reconnection attempts.
+        """
+        self.db = db
+        self.enabled = enabled
+        self.channel = channel
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_interval = reconnect_interval
+        self.connected = False
+        self._subscribers: dict[str, list[InvalidationCallback]] = {}
+        self._interrupted = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task[None] | None = None
+
+    def subscribe(
+        self: "InvalidationBus",
+        topic: str,
+        callback: InvalidationCallback,
+    ) -> None:
+        """Receive change events of a topic.
+
+        Args:
+            topic: Topic such as ``tokens``.
+            callback: Called with changed keys.
+        """
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    async def publish(
+        self: "InvalidationBus",
+        session: "AsyncSession",
+        topic: str,
+        key: str,
+        local: bool = True,
+    ) -> None:
+        """Announce a change as part of the session transaction.
+
+        Args:
+            session: Session making the change.
+            topic: Topic.
+            key: Changed key.
+            local: Whether to dispatch the key in this process right away
+                as well, rather than leave it to the caller after commit.
+        """
+        if local:
+            self._dispatch(topic, [key])
+        if self.enabled:
+            await session.execute(
+                _notify_stmt,
+                {"channel": self.channel, "payload": f"{topic}:{key}"},
+            )
+
+    async def publish_many(
+        self: "InvalidationBus",
+        session: "AsyncSession",
+        topic: str,
+        keys: list[str],
+        local: bool = True,
+    ) -> None:
+        """Announce several changes with a single statement.
+
+        Args:
+            session: Session making the changes.
+            topic: Topic.
+            keys: Changed keys.
+            local: Whether to dispatch the keys in this process right away.
+        """
+        if local and keys:
+            self._dispatch(topic, keys)
+        if self.enabled and keys:
+            await session.execute(
+                _notify_many_stmt,
+                {
+                    "channel": self.channel,
+                    "payloads": [f"{topic}:{key}" for key in keys],
+                },
+            )
+
+    def start(self: "InvalidationBus") -> None:
+        """Start listening in the background."""
+        if self.enabled:
+            self._task = asyncio.create_task(self._run(), name="invalidation-bus")
+
+    async def stop(self: "InvalidationBus") -> None:
+        """Stop listening and close the connection."""
+        if not self._task:
+            return
+        self._stopping = True
+        self._interrupted.set()
+        await self._task
+
+    async def _run(self: "InvalidationBus") -> None:
+        while not self._stopping:
+            self._interrupted.clear()
+            try:
+                connection = await self.db.connect()
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Failed to connect invalidation bus: %s", exc)
+            else:
+                await self._listen(connection)
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(
+                        self._interrupted.wait(),
+                        self.reconnect_interval,
+                    )
+                except asyncio.TimeoutError:
+                    pass  # noqa: WPS420
+
+    async def _listen(self: "InvalidationBus", connection: asyncpg.Connection) -> None:
+        connection.add_termination_listener(lambda _: self._interrupted.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+            # events sent while disconnected are lost, start from scratch
+            self._dispatch_all()
+            self.connected = True
+            logger.info("Invalidation bus listening on %s", self.channel)
+            while not self._interrupted.is_set():
+                try:
+                    await asyncio.wait_for(
+                        self._interrupted.wait(),
+                        self.keepalive_interval,
+                    )
+                except asyncio.TimeoutError:
+                    await connection.execute(
+                        "SELECT 1", timeout=self.keepalive_interval
+                    )
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            asyncpg.PostgresError,
+            asyncpg.InterfaceError,
+        ) as exc:
+            logger.warning("Invalidation bus connection failed: %s", exc)
+        finally:
+            self.connected = False
+            if not self._stopping:
+                logger.warning("Invalidation bus disconnected, caches are bypassed")
+            connection.terminate()
+
+    def _on_notification(
+        self: "InvalidationBus",
+        connection: Any,
+        pid: int,
+        channel: str,
+        payload: str,
+    ) -> None:
+        topic, _, key = payload.partition(":")
+        self._dispatch(topic, [key])
+
+    def _dispatch(self: "InvalidationBus", topic: str, keys: list[str]) -> None:
+        for callback in self._subscribers.get(topic, []):
+            callback(keys)
+
+    def _dispatch_all(self: "InvalidationBus") -> None:
+        for callbacks in self._subscribers.values():
+            for callback in callbacks:
+                callback(None)
+
+
+class Cache(Generic[Model]):
+    """Bounded LRU cache of ORM objects kept coherent by an invalidation bus.
+
+    Objects are stored and handed out as detached copies, so callers can
+    modify and re-add them to a session without affecting other callers.
+    """
+
+    def __init__(
+        self: "Cache[Model]",
+        bus: InvalidationBus,
+        topic: str,
+        max_size: int = 10000,
+    ):
+        """Initiate cache.
+
+        Args:
+            bus: Invalidation bus.
+            topic: Topic of change events evicting entries.
+            max_size: Maximum number of entries.
+        """
+        self.bus = bus
+        self.max_size = max_size
+        self.generation = 0
+        self._items: OrderedDict[str, Model] = OrderedDict()
+        bus.subscribe(topic, self._invalidate)
+
+    def get(self: "Cache[Model]", key: str) -> Model | None:
+        """Get cached object.
+
+        Args:
+            key: Key.
+
+        Returns:
+            Copy of the object, or None on a miss or while the bus is down.
+        """
+        if not self.bus.connected:
+            return None
+        cached = self._items.get(key)
+        if cached is None:
+            return None
+        self._items.move_to_end(key)
+        return detached_copy(cached)
+
+    def put(self: "Cache[Model]", key: str, model: Model, generation: int) -> None:
+        """Cache object loaded while the cache was at ``generation``.
+
+        Objects loaded before an invalidation arrived may be stale, so they
+        are not stored.
+
+        Args:
+            key: str.
+            model: Loaded object.
+            generation: Value of ``generation`` before loading.
+        """
+        if not self.bus.connected or generation != self.generation:
+            return
+        self._items[key] = detached_copy(model)
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def _invalidate(self: "Cache[Model]", keys: list[str] | None) -> None:
+        self.generation += 1
+        if keys is None:
+            self._items.clear()
+            return
+        for key in keys:
+            self._items.pop(key, None)
+
+
+def detached_copy(model: Model) -> Model:
+    """Copy column values of an ORM object into a new detached object.
+
+    Args:
+        model: ORM object.
+
+    Returns:
+        Object that a session treats as already persisted.
+    """
+    mapper = cast("InstanceState[Any]", inspect(model)).mapper
+    copy = mapper.class_(
+        **{
+            attribute.key: getattr(model, attribute.key)
+            for attribute in mapper.column_attrs
+        },
+    )
+    make_transient_to_detached(copy)
+    return cast(Model, copy)
@@ -0,0 +1,239 @@
+import argparse
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from dependency_injector.wiring import Provide, inject
+
+from tosaquestbot import csvutils
+from tosaquestbot.loadtest import harness
+from tosaquestbot.services.token import make_token_names
+from tosaquestbot.stickers import render_token_sheets
+
+if TYPE_CHECKING:
+    from tosaquestbot.services.token import TokenService
+
+logger = getLogger(__name__)
+
+
+def add_commands(parser: argparse.ArgumentParser) -> None:
+    """Register CLI subcommands.
+
+    Args:
+        parser: Root argument parser.
+    """
+    subparsers = parser.add_subparsers(dest="command")
+
+    mint_parser = subparsers.add_parser("mint", help="Mint tokens in bulk")
+    source = mint_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--prefix", type=str, help="Token name prefix")
+    source.add_argument(
+        "--names-file",
+        type=argparse.FileType("r", encoding="utf-8-sig"),
+        help="UTF-8 file with one token name per line",
+    )
+    mint_parser.add_argument("--count", type=int, help="Number of tokens to mint")
+    mint_parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        default="-",
+        help="Where to write the id,name CSV (default: stdout)",
+    )
+
+    stickers_parser = subparsers.add_parser(
+        "stickers",
+        help="Render printable QR sticker sheets",
+    )
+    stickers_parser.add_argument(
+        "names",
+        nargs="*",
+        help="Token names to render (default: all tokens)",
+    )
+    stickers_parser.add_argument(
+        "--format",
+        choices=("pdf", "png"),
+        default="pdf",
+        help="Sheet format",
+    )
+    stickers_parser.add_argument(
+        "--output",
+        type=str,
+        default="stickers",
+        help=(
+            "Output path without extension; PNG pages and PDF parts after "
+            "the first get a number suffix"
+        ),
+    )
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest",
+        help="Load test the bot against a fake Bot API",
+    )
+    loadtest_parser.add_argument(
+        "--rate", type=float, default=50, help="Updates per second"
+    )
+    loadtest_parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    loadtest_parser.add_argument(
+        "--users", type=int, default=200, help="Synthetic users"
+    )
+    loadtest_parser.add_argument(
+        "--mix",
+        type=str,
+        default="start=1,activate=1,photo=4",
+        help="Update kind weights",
+    )
+    loadtest_parser.add_argument(
+        "--tokens",
+        type=int,
+        default=100,
+        help="Tokens to mint and photograph as stickers",
+    )
+    loadtest_parser.add_argument(
+        "--corpus", type=str, help="Directory with extra photos"
+    )
+    loadtest_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".cache/loadtest",
+        help="Where rendered sticker photos are kept",
+    )
+    loadtest_parser.add_argument(
+        "--api-port",
+        type=int,
+        default=8081,
+        help="Fake Bot API port",
+    )
+    loadtest_parser.add_argument(
+        "--target",
+        type=str,
+        help="Webhook URL (default: the URL the bot registers)",
+    )
+    loadtest_parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="Start the bot in a subprocess",
+    )
+    loadtest_parser.add_argument(
+        "--bot-port",
+        type=int,
+        default=8090,
+        help="Webhook port of the spawned bot",
+    )
+    loadtest_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes of the spawned bot",
+    )
+    loadtest_parser.add_argument(
+        "--embedded-db",
+        type=str,
+        help="Data directory of a throwaway Postgres cluster (needs pgserver)",
+    )
+    loadtest_parser.add_argument(
+        "--allow-external-db",
+        action="store_true",
+        help="Seed the configured database instead of an embedded one",
+    )
+    loadtest_parser.add_argument(
+        "--db-port",
+        type=int,
+        default=5433,
+        help="Port of the embedded database",
+    )
+    loadtest_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30,
+        help="Seconds to wait for a reply",
+    )
+    loadtest_parser.add_argument(
+        "--startup-timeout",
+        type=float,
+        default=60,
+        help="Seconds to wait for the bot to come up",
+    )
+    loadtest_parser.add_argument("--seed", type=int, help="Random seed")
+    loadtest_parser.add_argument(
+        "--output",
+        type=argparse.FileType("w"),
+        default="-",
+        help="Where to write the report (default: stdout)",
+    )
+
+
+@inject
+async def mint(
+    args: argparse.Namespace,
+    token_service: "TokenService" = Provide["services.token"],
+) -> int:
+    if args.names_file:
+        names = [line.strip() for line in args.names_file if line.strip()]
+    elif args.count and args.count > 0:
+        names = make_token_names(args.prefix, args.count)
+    else:
+        logger.error("--count is required with --prefix")
+        return 2
+
+    mint_result = await token_service.mint_tokens(names)
+
+    for name in mint_result.duplicates:
+        logger.warning("Duplicate token name: %s", name)
+
+    args.output.write(
+        csvutils.dump(
+            ("id", "name"),
+            [(token.id, token.name) for token in mint_result.created],
+        ),
+    )
+    return 1 if mint_result.duplicates else 0
+
+
+@inject
+async def stickers(
+    args: argparse.Namespace,
+    token_service: "TokenService" = Provide["services.token"],
+) -> int:
+    if args.names:
+        tokens = await token_service.get_tokens_by_names(args.names)
+    else:
+        tokens = await token_service.get_all_tokens()
+
+    if not tokens:
+        logger.error("No tokens to render")
+        return 1
+
+    sheets = render_token_sheets(tokens, sheet_format=args.format)
+
+    part = 0
+    async for sheet in sheets:
+        part += 1
+        if args.format == "png":
+            path = f"{args.output}-{part:03d}.png"
+        elif part > 1:
+            # PDFs over the upload size limit are split
+            path = f"{args.output}-{part:03d}.pdf"
+        else:
+            path = f"{args.output}.pdf"
+        with open(path, "wb") as sheet_file:
+            sheet_file.write(sheet)
+        logger.info("Written %s", path)
+    return 0
+
+
+async def run(args: argparse.Namespace) -> int:
+    """Run CLI subcommand.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        Exit code.
+    """
+    match args.command:
+        case "mint":
+            return await mint(args)
+        case "stickers":
+            return await stickers(args)
+        case "loadtest":
+            return await harness.run(args)
+    return 2
@@ -2,8 +2,18 @@ from aiogram import Bot, Dispatcher
 from aiohttp import web
 from dependency_injector import containers, providers
 
+from tosaquestbot import cache
+from tosaquestbot.broadcast import Broadcaster, BroadcastWorker
 from tosaquestbot.db import database
-from tosaquestbot.services import token, user
+from tosaquestbot.services import (
+    activation_buffer,
+    activation_index,
+    broadcast,
+    stats,
+    token,
+    user,
+)
+from tosaquestbot.session import create_session
 
 
 class HttpContext(containers.DeclarativeContainer):
@@ -17,9 +27,56 @@ class HttpContext(containers.DeclarativeContainer):
 class Services(containers.DeclarativeContainer):
     """Container for services."""
 
+    config = providers.Configuration()
+
     db = providers.Dependency(database.Database)
-    user = providers.Singleton(user.UserService, db=db)
-    token = providers.Singleton(token.TokenService, db=db)
+    invalidation_bus = providers.Singleton(
+        cache.InvalidationBus,
+        db=db,
+        enabled=config.cache.enabled,
+        channel=config.cache.channel,
+        keepalive_interval=config.cache.keepalive_interval,
+        reconnect_interval=config.cache.reconnect_interval,
+    )
+    activation_buffer = providers.Singleton(
+        activation_buffer.ActivationWriteBuffer,
+        db=db,
+        enabled=config.activation_buffer.enabled,
+        flush_interval_ms=config.activation_buffer.flush_interval_ms,
+        max_batch=config.activation_buffer.max_batch,
+        bus=invalidation_bus,
+    )
+    activation_index = providers.Singleton(
+        activation_index.ActivationIndex,
+        db=db,
+        bus=invalidation_bus,
+        enabled=config.activation_index.enabled,
+        max_memory_mb=config.activation_index.max_memory_mb,
+    )
+    user = providers.Singleton(
+        user.UserService,
+        db=db,
+        bus=invalidation_bus,
+        cache_size=config.cache.max_size,
+    )
+    stats = providers.Singleton(
+        stats.StatsService,
+        db=db,
+        token_stats_ttl=config.stats.token_stats_ttl,
+    )
+    broadcast = providers.Singleton(
+        broadcast.BroadcastService,
+        db=db,
+        claim_timeout=config.broadcast.claim_timeout,
+    )
+    token = providers.Singleton(
+        token.TokenService,
+        db=db,
+        activation_buffer=activation_buffer,
+        bus=invalidation_bus,
+        cache_size=config.cache.max_size,
+        activation_index=activation_index,
+    )
 
 
 class BotContext(containers.DeclarativeContainer):
@@ -27,9 +84,37 @@ class BotContext(containers.DeclarativeContainer):
 
     config = providers.Configuration()
 
+    session = providers.Singleton(
+        create_session,
+        api_url=config.bot_api_url,
+        local=config.bot_api_local,
+        server_dir=config.bot_api_server_dir,
+        local_dir=config.bot_api_local_dir,
+        timeout=config.bot_session.timeout,
+        connection_limit=config.bot_session.connection_limit,
+        limit_per_host=config.bot_session.limit_per_host,
+        keepalive_timeout=config.bot_session.keepalive_timeout,
+        dns_cache_ttl=config.bot_session.dns_cache_ttl,
+    )
+
+    # photo downloads get their own connections so they never hold up API calls
+    download_session = providers.Singleton(
+        create_session,
+        api_url=config.bot_api_url,
+        local=config.bot_api_local,
+        server_dir=config.bot_api_server_dir,
+        local_dir=config.bot_api_local_dir,
+        timeout=config.bot_session.download_timeout,
+        connection_limit=config.bot_session.download_connection_limit,
+        limit_per_host=config.bot_session.download_connection_limit,
+        keepalive_timeout=config.bot_session.keepalive_timeout,
+        dns_cache_ttl=config.bot_session.dns_cache_ttl,
+    )
+
     bot = providers.Singleton(
         Bot,
         token=config.bot_token,
+        session=session,
     )
 
     dispatcher = providers.Singleton(
@@ -37,6 +122,15 @@ class BotContext(containers.DeclarativeContainer):
         bot=bot,
     )
 
+    broadcaster = providers.Singleton(
+        Broadcaster,
+        bot=bot,
+        rate_limit=config.broadcast.rate_limit,
+        concurrency=config.broadcast.concurrency,
+        max_retries=config.broadcast.max_retries,
+        progress_interval=config.broadcast.progress_interval,
+    )
+
 
 class Container(containers.DeclarativeContainer):
     """Application container."""
@@ -49,6 +143,7 @@ class Container(containers.DeclarativeContainer):
     )
     services = providers.Container(
         Services,
+        config=config,
         db=db,
     )
     bot_context = providers.Container(
@@ -59,3 +154,10 @@ class Container(containers.DeclarativeContainer):
         HttpContext,
         config=config.http,
     )
+    broadcast_worker = providers.Singleton(
+        BroadcastWorker,
+        service=services.broadcast,
+        broadcaster=bot_context.broadcaster,
+        batch_size=config.broadcast.batch_size,
+        poll_interval=config.broadcast.poll_interval,
+    )
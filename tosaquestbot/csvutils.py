@@ -0,0 +1,92 @@
+import csv
+import io
+from typing import TYPE_CHECKING, AsyncGenerator, AsyncIterable, Iterable, Sequence
+
+from aiogram.types import InputFile
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+Rows = Iterable[Sequence[object]] | AsyncIterable[Sequence[object]]
+
+
+def dump(header: Sequence[str], rows: Iterable[Sequence[object]]) -> str:
+    """Render rows as CSV text.
+
+    Args:
+        header: Column names.
+        rows: Rows to render.
+
+    Returns:
+        CSV text.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def load(text: str) -> list[dict[str, str]]:
+    """Parse CSV text with a header row.
+
+    Args:
+        text: CSV text.
+
+    Returns:
+        Rows keyed by column name.
+    """
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+class CSVInputFile(InputFile):
+    """CSV document rendered chunk by chunk while it is uploaded.
+
+    The whole text is never held in memory, only one chunk of it.
+    """
+
+    def __init__(
+        self: "CSVInputFile",
+        header: Sequence[str],
+        rows: Rows,
+        filename: str,
+    ):
+        """Initiate file.
+
+        Args:
+            header: Column names.
+            rows: Rows to render, a plain or an async iterable.
+            filename: File name.
+        """
+        super().__init__(filename=filename)
+        self.header = header
+        self.rows = rows
+
+    async def read(self: "CSVInputFile", bot: "Bot") -> AsyncGenerator[bytes, None]:
+        """Render rows.
+
+        Args:
+            bot: Bot.
+
+        Yields:
+            Encoded CSV chunks of about ``chunk_size`` bytes.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(self.header)
+        async for row in _iterate(self.rows):
+            writer.writerow(row)
+            if buffer.tell() >= self.chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+async def _iterate(rows: Rows) -> AsyncGenerator[Sequence[object], None]:
+    if isinstance(rows, AsyncIterable):
+        async for async_row in rows:
+            yield async_row
+    else:
+        for row in rows:
+            yield row
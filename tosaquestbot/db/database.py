@@ -1,7 +1,14 @@
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Iterable, Sequence, cast
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncpg
+from sqlalchemy import QueuePool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 
 class Database:  # noqa: WPS306
@@ -20,6 +27,40 @@ class Database:  # noqa: WPS306
             class_=AsyncSession,
         )
 
+    @property
+    def engine(self) -> AsyncEngine:
+        """Database engine."""
+        return self._engine
+
+    async def connect(self) -> asyncpg.Connection:
+        """Open a dedicated connection outside of the pool.
+
+        Returns:
+            Raw asyncpg connection, closed by the caller.
+        """
+        url = self._engine.url.set(drivername="postgresql")
+        return await asyncpg.connect(url.render_as_string(hide_password=False))
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self._engine.dispose()
+
+    def pool_in_use(self) -> int:
+        """Get number of checked out connections.
+
+        Returns:
+            Connections in use.
+        """
+        return cast(QueuePool, self._engine.pool).checkedout()
+
+    def pool_size(self) -> int:
+        """Get connection pool size.
+
+        Returns:
+            Pool size, not counting overflow connections.
+        """
+        return cast(QueuePool, self._engine.pool).size()
+
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         """Get database session.
@@ -29,3 +70,29 @@ class Database:  # noqa: WPS306
         """
         async with self._sessionmaker() as session:
             yield session
+
+    async def copy_records(
+        self,
+        session: AsyncSession,
+        table_name: str,
+        columns: Sequence[str],
+        records: Iterable[Sequence[Any]],
+    ) -> None:
+        """Bulk load records into a table with COPY.
+
+        Runs on the session connection, so the rows become visible
+        together with the rest of the session transaction.
+
+        Args:
+            session: Database session.
+            table_name: Target table name.
+            columns: Target column names.
+            records: Rows to load.
+        """
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(  # type: ignore
+            table_name,
+            records=records,
+            columns=list(columns),
+        )
@@ -6,6 +6,8 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
     String,
     UniqueConstraint,
 )
@@ -25,10 +27,9 @@ class User(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
         nullable=False,
     )
-    telegram_id = Column(BigInteger, nullable=False)
+    telegram_id = Column(BigInteger, unique=True, index=True, nullable=False)
     first_name = Column(String, nullable=False)
     username = Column(String, nullable=True)
 
@@ -42,10 +43,9 @@ class Token(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
         nullable=False,
     )
-    name = Column(String, nullable=False)
+    name = Column(String, unique=True, index=True, nullable=False)
     valid = Column(Boolean, default=True, nullable=False)
 
 
@@ -71,7 +71,72 @@ class Activation(Base):
         UUID(as_uuid=True),
         ForeignKey("tokens.id"),
         primary_key=True,
+        index=True,
         nullable=False,
     )
     __table_args__ = (UniqueConstraint("user_id", "token_id"),)
-    time = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+    time = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        index=True,
+        nullable=False,
+    )
+
+
+class ActivationHourlyStat(Base):
+    """Activation count rollup per hour and token."""
+
+    __tablename__ = "activation_stats_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True, nullable=False)
+    token_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class BroadcastJob(Base):
+    """Broadcast job model."""
+
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    text = Column(String, nullable=False)
+    audience = Column(String, nullable=False)
+    status = Column(String, default="pending", index=True, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    blocked = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    cursor = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BroadcastRecipient(Base):
+    """Broadcast recipient model."""
+
+    __tablename__ = "broadcast_recipients"
+
+    job_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("broadcast_jobs.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    position = Column(Integer, primary_key=True, nullable=False)
+    telegram_id = Column(BigInteger, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (
+        UniqueConstraint("job_id", "telegram_id"),
+        Index(
+            "ix_broadcast_recipients_claimed_at",
+            "claimed_at",
+            postgresql_where=status == "sending",
+        ),
+    )
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+from logging import getLogger
+from typing import TYPE_CHECKING, AsyncIterator
+
+import aiohttp
+import numpy as np
+from aiogram import Bot
+from dependency_injector.wiring import Provide, inject
+
+from tosaquestbot.metrics import BOT_API_ERRORS
+
+if TYPE_CHECKING:
+    from aiogram.client.session.aiohttp import AiohttpSession
+
+logger = getLogger(__name__)
+
+
+@inject
+async def load_file(
+    bot: Bot,
+    file_path: str,
+    download_session: "AiohttpSession" = Provide["bot_context.download_session"],
+) -> np.ndarray | None:
+    """Get file contents as a byte array ready for decoding.
+
+    With a local Bot API server ``file_path`` is a path on a shared volume
+    and the file is read straight from disk into the array. Otherwise it
+    is downloaded over the separate download session and the array wraps
+    the downloaded buffer without a copy.
+
+    Args:
+        bot: Bot.
+        file_path: File path returned by ``getFile``.
+        download_session: Session used for file downloads.
+
+    Returns:
+        File bytes, or None if the file could not be fetched.
+    """
+    api = download_session.api
+    if not api.is_local:
+        buffer = io.BytesIO()
+        try:
+            async for chunk in download_session.stream_content(
+                url=api.file_url(bot.token, file_path),
+                timeout=int(download_session.timeout),
+            ):
+                buffer.write(chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            BOT_API_ERRORS.labels("downloadFile", type(exc).__name__).inc()
+            logger.warning("Failed to download file %s: %s", file_path, exc)
+            return None
+        return np.frombuffer(buffer.getbuffer(), dtype=np.uint8)
+
+    local_path = str(api.wrap_local_file.to_local(file_path))
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, np.fromfile, local_path, np.uint8)
+    except OSError as exc:
+        logger.warning("Failed to read local file %s: %s", local_path, exc)
+        return None
+
+
+@contextlib.asynccontextmanager
+@inject
+async def local_file(
+    bot: Bot,
+    file_path: str,
+    download_session: "AiohttpSession" = Provide["bot_context.download_session"],
+) -> AsyncIterator[str | None]:
+    """Make a file available on disk, for readers that need a path.
+
+    With a local Bot API server the file is used in place. Otherwise it is
+    streamed into a temporary file, removed on exit, with writes done in
+    the default executor so that slow disks do not block the event loop.
+
+    Args:
+        bot: Bot.
+        file_path: File path returned by ``getFile``.
+        download_session: Session used for file downloads.
+
+    Yields:
+        Path to the file, or None if the file could not be fetched.
+    """
+    api = download_session.api
+    if api.is_local:
+        yield str(api.wrap_local_file.to_local(file_path))
+        return
+
+    loop = asyncio.get_running_loop()
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file_path)[1]) as tmp:
+        try:
+            async for chunk in download_session.stream_content(
+                url=api.file_url(bot.token, file_path),
+                timeout=int(download_session.timeout),
+            ):
+                await loop.run_in_executor(None, tmp.write, chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            BOT_API_ERRORS.labels("downloadFile", type(exc).__name__).inc()
+            logger.warning("Failed to download file %s: %s", file_path, exc)
+            yield None
+            return
+        await loop.run_in_executor(None, tmp.flush)
+        yield tmp.name
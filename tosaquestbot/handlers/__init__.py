@@ -1,9 +1,11 @@
 """Handlers for the bot."""
 from aiogram import Router
 
-from tosaquestbot.handlers import basic, token, users
+from tosaquestbot.handlers import basic, broadcast, stats, token, users
 
 router = Router()
 router.include_router(basic.router)
 router.include_router(token.router)
 router.include_router(users.router)
+router.include_router(stats.router)
+router.include_router(broadcast.router)
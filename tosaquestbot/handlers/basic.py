@@ -1,17 +1,24 @@
 from logging import getLogger
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, Sequence, cast
 
 import cv2
-import numpy as np
 from aiogram import F as _F  # noqa: WPS347, WPS111
 from aiogram import Router, types
 from aiogram.filters import Command
 from dependency_injector.wiring import Provide, inject
 
+from tosaquestbot import metrics, tracing
 from tosaquestbot.errors import TokenAlreadyActivatedError
+from tosaquestbot.fileutils import load_file, local_file
 from tosaquestbot.qrutils import detect_and_decode
+from tosaquestbot.replyutils import reply
+from tosaquestbot.videoutils import scan_video_file
 
 if TYPE_CHECKING:
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.methods import TelegramMethod
+
+    from tosaquestbot.db import models
     from tosaquestbot.services.token import TokenService
     from tosaquestbot.services.user import UserService
 
@@ -19,19 +26,23 @@ router = Router()
 
 logger = getLogger(__name__)
 
+# getFile refuses larger files, a local Bot API server has no such limit
+MAX_VIDEO_SIZE = 20 * 1024 * 1024
+
 
 @router.message(Command("start"))
 @inject
 async def start(
     message: types.Message,
     user_service: "UserService" = Provide["services.user"],
-) -> None:
+) -> "TelegramMethod[Any] | None":
     if not message.from_user:
-        return
+        return None
 
     if message.chat.type != "private":
-        await message.answer("Бот доступний тільки в приватних повідомленнях")
-        return
+        return await reply(
+            message.answer("Бот доступний тільки в приватних повідомленнях"),
+        )
 
     user = await user_service.get_user_by_telegram_id(message.from_user.id)
 
@@ -42,10 +53,12 @@ async def start(
             message.from_user.username,
         )
 
-    await message.answer(
-        f"<b>Привіт, {message.from_user.first_name}!</b>\n"
-        "Фотографуй наліпки та надсилай їх сюди, щоб отримати бали за квест. "
-        "Слідкуй за тим, щоб на фотографії було чітко видно QR-код поруч з наліпкою.",
+    return await reply(
+        message.answer(
+            f"<b>Привіт, {message.from_user.first_name}!</b>\n"
+            "Фотографуй наліпки та надсилай їх сюди, щоб отримати бали за квест. "
+            "Слідкуй за тим, щоб на фотографії було чітко видно QR-код поруч з наліпкою.",
+        ),
     )
 
 
@@ -55,24 +68,24 @@ async def activate(
     message: types.Message,
     token_service: "TokenService" = Provide["services.token"],
     user_service: "UserService" = Provide["services.user"],
-) -> None:
+) -> "TelegramMethod[Any] | None":
     if not message.from_user:
-        return
+        return None
 
     if not message.text:
-        return
+        return None
 
     if message.chat.type != "private":
-        await message.answer("Бот доступний тільки в приватних повідомленнях")
-        return
+        return await reply(
+            message.answer("Бот доступний тільки в приватних повідомленнях"),
+        )
 
     token_id = message.text.split(" ", 1)[1]
 
     token = await token_service.get_token(token_id)
 
     if not token:
-        await message.answer("<b>Помилка:</b> Недійсний токен")
-        return
+        return await reply(message.answer("<b>Помилка:</b> Недійсний токен"))
 
     user = await user_service.get_user_by_telegram_id(message.from_user.id)
 
@@ -86,14 +99,17 @@ async def activate(
     try:
         await token_service.activate_token(token, user)
     except TokenAlreadyActivatedError:
-        await message.answer("<b>Помилка:</b> Ви вже активували цей токен")
-        return
+        return await reply(
+            message.answer("<b>Помилка:</b> Ви вже активували цей токен"),
+        )
 
-    activations = await token_service.get_activations_by_user(user)
+    activations = await token_service.count_activations_by_user(user)
 
-    await message.answer(
-        "<b>Токен активовано!</b>\n"
-        f"Активовано токенів: <code>{len(activations)}</code>",
+    return await reply(
+        message.answer(
+            "<b>Токен активовано!</b>\n"
+            f"Активовано токенів: <code>{activations}</code>",
+        ),
     )
 
 
@@ -103,9 +119,9 @@ async def photo(
     message: types.Message,
     user_service: "UserService" = Provide["services.user"],
     token_service: "TokenService" = Provide["services.token"],
-) -> None:
+) -> "TelegramMethod[Any] | None":
     if not (message.from_user and message.photo and (message.chat.type == "private")):
-        return
+        return None
 
     user = await user_service.get_user_by_telegram_id(message.from_user.id)
 
@@ -119,57 +135,131 @@ async def photo(
     photo_size = message.photo[-1]
 
     if not message.bot:
-        return
+        return None
 
-    photo_file_path = (await message.bot.get_file(photo_size.file_id)).file_path
-    if not photo_file_path:
-        await message.answer("Помилка завантаження фото. Спробуйте ще раз")
-        return
-
-    photo_file = await message.bot.download_file(photo_file_path)
-    if not photo_file:
-        await message.answer("Помилка завантаження фото. Спробуйте ще раз")
-        return
+    with metrics.PHOTO_DOWNLOAD_LATENCY.time(), tracing.span("photo.download"):
+        photo_file_path = (await message.bot.get_file(photo_size.file_id)).file_path
+        file_bytes = (
+            await load_file(message.bot, photo_file_path) if photo_file_path else None
+        )
+    if file_bytes is None:
+        return await reply(
+            message.answer("Помилка завантаження фото. Спробуйте ще раз"),
+        )
 
-    file_bytes = np.asarray(bytearray(photo_file.read()), dtype=np.uint8)
-    img = cv2.cvtColor(cv2.imdecode(file_bytes, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+    with metrics.DECODE_LATENCY.labels("imdecode").time(), tracing.span(
+        "photo.imdecode"
+    ):
+        img = cv2.cvtColor(
+            cv2.imdecode(file_bytes, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB
+        )
 
     decoded_text = await detect_and_decode(img)
 
     logger.info("Decoded text: %s", decoded_text)
 
-    if not decoded_text:
-        await message.answer("Не вдалося розпізнати QR-код. Спробуйте ще раз")
-        return
+    return await _activate_decoded(message, user, decoded_text[:1], token_service)
 
-    token_id = cast(str, decoded_text[0])
-    if not token_id:
-        await message.answer("Не вдалося розпізнати QR-код. Спробуйте ще раз")
-        return
 
-    if len(token_id) not in range(32, 37):  # noqa: WPS432
-        await message.answer("Не вдалося розпізнати QR-код. Спробуйте ще раз")
-        return
+@router.message(_F.video | _F.video_note | _F.animation)
+@inject
+async def video(
+    message: types.Message,
+    user_service: "UserService" = Provide["services.user"],
+    token_service: "TokenService" = Provide["services.token"],
+    download_session: "AiohttpSession" = Provide["bot_context.download_session"],
+) -> "TelegramMethod[Any] | None":
+    media = message.video or message.video_note or message.animation
+    if not (message.from_user and media and (message.chat.type == "private")):
+        return None
 
-    token = await token_service.get_token(token_id)
+    if not message.bot:
+        return None
 
-    if not token:
-        await message.answer("<b>Помилка:</b> Недійсний токен")
-        return
+    too_large = media.file_size and media.file_size > MAX_VIDEO_SIZE
+    if too_large and not download_session.api.is_local:
+        return await reply(
+            message.answer("Відео завелике. Надішліть коротше відео"),
+        )
 
-    if not cast(int, token.valid):
-        await message.answer("<b>Помилка:</b> Токен деактивовано")
-        return
+    user = await user_service.get_user_by_telegram_id(message.from_user.id)
 
-    try:
-        await token_service.activate_token(token, user)
-    except TokenAlreadyActivatedError:
-        await message.answer("<b>Помилка:</b> Ви вже активували цей токен")
-        return
+    if not user:
+        user = await user_service.add_user(
+            message.from_user.id,
+            message.from_user.first_name,
+            message.from_user.username,
+        )
+
+    with tracing.span("video.download"):
+        video_file_path = (await message.bot.get_file(media.file_id)).file_path
+    if not video_file_path:
+        return await reply(
+            message.answer("Помилка завантаження відео. Спробуйте ще раз"),
+        )
 
-    activations = await token_service.get_activations_by_user(user)
+    async with local_file(message.bot, video_file_path) as path:
+        if path is None:
+            return await reply(
+                message.answer("Помилка завантаження відео. Спробуйте ще раз"),
+            )
+        decoded_text = await scan_video_file(path)
+
+    logger.info("Decoded text: %s", decoded_text)
+
+    return await _activate_decoded(message, user, decoded_text, token_service)
+
+
+async def _activate_decoded(  # noqa: WPS231
+    message: types.Message,
+    user: "models.User",
+    decoded_text: Sequence[str | None],
+    token_service: "TokenService",
+) -> "TelegramMethod[Any] | None":
+    # printed stickers carry the id upper-case, see stickers.render_sticker
+    token_ids = {
+        token_id.lower(): None
+        for token_id in decoded_text
+        if token_id and len(token_id) in range(32, 37)  # noqa: WPS432
+    }
+    if not token_ids:
+        metrics.DECODE_FAILURES.inc()
+        return await reply(
+            message.answer("Не вдалося розпізнати QR-код. Спробуйте ще раз"),
+        )
+
+    activated = 0
+    error = ""
+    for token_id in token_ids:
+        token = await token_service.get_token(token_id)
+
+        if not token:
+            error = error or "<b>Помилка:</b> Недійсний токен"
+            continue
+
+        if not cast(int, token.valid):
+            error = error or "<b>Помилка:</b> Токен деактивовано"
+            continue
+
+        try:
+            await token_service.activate_token(token, user)
+        except TokenAlreadyActivatedError:
+            error = error or "<b>Помилка:</b> Ви вже активували цей токен"
+            continue
+        activated += 1
+
+    if not activated:
+        return await reply(message.answer(error))
+
+    activations = await token_service.count_activations_by_user(user)
+    title = (
+        "<b>Токен активовано!</b>"
+        if activated == 1
+        else f"<b>Активовано нових токенів: {activated}</b>"
+    )
 
-    await message.answer(
-        "<b>Токен активовано!</b>\n"
-        f"Активовано токенів: <code>{len(activations)}</code>",
+    return await reply(
+        message.answer(
+            f"{title}\nАктивовано токенів: <code>{activations}</code>",
+        ),
     )
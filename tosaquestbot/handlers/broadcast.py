@@ -0,0 +1,137 @@
+import datetime
+import uuid
+from typing import TYPE_CHECKING, cast
+
+from aiogram import Router, types
+from aiogram.filters import Command
+from dependency_injector.wiring import Provide, inject
+
+from tosaquestbot.adminutils import check_admin
+
+if TYPE_CHECKING:
+    from tosaquestbot.broadcast import BroadcastWorker
+    from tosaquestbot.services.broadcast import BroadcastService
+    from tosaquestbot.services.token import TokenService
+
+router = Router()
+
+RECENT_JOBS = 10
+
+
+@router.message(Command("broadcast"))
+@inject
+async def broadcast(  # noqa: WPS231
+    message: types.Message,
+    broadcast_service: "BroadcastService" = Provide["services.broadcast"],
+    token_service: "TokenService" = Provide["services.token"],
+    broadcast_worker: "BroadcastWorker" = Provide["broadcast_worker"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.text:
+        return
+
+    args = message.text.split(" ", 1)[1:]
+    audience_args = args[0].split(" ", 2) if args else []
+
+    match audience_args:
+        case ["all", *text_parts] if text_parts:
+            job = await broadcast_service.create_job(" ".join(text_parts), "all")
+        case ["top", count, text] if count.isdigit() and int(count) > 0:
+            job = await broadcast_service.create_job(text, "top", count)
+        case ["token", token_id, text]:
+            try:
+                token = await token_service.get_token(str(uuid.UUID(token_id)))
+            except ValueError:
+                token = None
+            if not token:
+                await message.answer("<b>Error:</b> Token not found")
+                return
+            job = await broadcast_service.create_job(text, "token", str(token.id))
+        case _:
+            await message.answer(
+                "<b>Error:</b> Usage: /broadcast all &lt;text&gt; | "
+                "top &lt;N&gt; &lt;text&gt; | token &lt;token_id&gt; &lt;text&gt;",
+            )
+            return
+
+    broadcast_worker.wake()
+    await message.answer(
+        f"Broadcast <code>{job.id}</code> queued for <b>{job.total}</b> users",
+    )
+
+
+@router.message(Command("broadcasts"))
+@inject
+async def broadcasts(
+    message: types.Message,
+    broadcast_service: "BroadcastService" = Provide["services.broadcast"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    jobs = await broadcast_service.get_jobs(RECENT_JOBS)
+
+    if not jobs:
+        await message.answer("No broadcasts")
+        return
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    text = "<b>Broadcasts:</b>\n"
+    for job in jobs:
+        total = cast(int, job.total)
+        processed = cast(int, job.sent) + cast(int, job.blocked) + cast(int, job.failed)
+        text += (
+            f"\n<code>{job.id}</code> {job.audience}: <b>{job.status}</b>\n"
+            f"{processed}/{total} processed, "
+            f"{job.sent} sent, {job.blocked} blocked, {job.failed} failed\n"
+        )
+        if job.status == "running" and job.started_at and processed:
+            elapsed = (now - job.started_at).total_seconds()
+            rate = processed / elapsed if elapsed else 0
+            if rate:
+                eta = datetime.timedelta(seconds=int((total - processed) / rate))
+                text += f"{rate:.1f} msg/s, ETA {eta}\n"
+
+    await message.answer(text)
+
+
+@router.message(Command("cancelbroadcast"))
+@inject
+async def cancelbroadcast(
+    message: types.Message,
+    broadcast_service: "BroadcastService" = Provide["services.broadcast"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.text:
+        return
+
+    args = message.text.split(" ")[1:]
+
+    if len(args) != 1:
+        await message.answer("<b>Error:</b> Invalid arguments")
+        return
+
+    try:
+        job_id = uuid.UUID(args[0])
+    except ValueError:
+        await message.answer("<b>Error:</b> Invalid job id")
+        return
+
+    if not await broadcast_service.cancel_job(str(job_id)):
+        await message.answer("<b>Error:</b> No such unfinished broadcast")
+        return
+
+    await message.answer(f"Broadcast <code>{job_id}</code> cancelled")
@@ -0,0 +1,160 @@
+import html
+from typing import TYPE_CHECKING
+
+from aiogram import Router, types
+from aiogram.filters import Command
+from dependency_injector.wiring import Provide, inject
+
+from tosaquestbot import csvutils
+from tosaquestbot.adminutils import check_admin
+
+if TYPE_CHECKING:
+    from tosaquestbot.services.stats import StatsService
+
+router = Router()
+
+DEFAULT_PERIODS = {"hour": 24, "day": 7}  # noqa: WPS407
+MAX_PERIODS = 200
+TOP_TOKENS = 10
+# keep /stats tokens well under the 4096 character message limit
+MAX_TOKENS_BY_ACTIVATIONS = 20
+MAX_TOKEN_NAME_LENGTH = 100
+MAX_UNUSED_TOKENS = 20
+
+
+@router.message(Command("stats"))
+@inject
+async def stats(  # noqa: WPS231
+    message: types.Message,
+    stats_service: "StatsService" = Provide["services.stats"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.text:
+        return
+
+    args = message.text.split(" ")[1:]
+
+    match args:
+        case [] | ["hours"]:
+            period, count = "hour", DEFAULT_PERIODS["hour"]
+        case ["days"]:
+            period, count = "day", DEFAULT_PERIODS["day"]
+        case ["hours" | "days", count_arg] if count_arg.isdigit():
+            period, count = args[0][:-1], int(count_arg)
+        case ["tokens"]:
+            by_token = await stats_service.get_activations_by_token()
+            text = "<b>Activations by token:</b>\n"
+            for name, total in by_token[:MAX_TOKENS_BY_ACTIVATIONS]:
+                if len(name) > MAX_TOKEN_NAME_LENGTH:
+                    name = f"{name[:MAX_TOKEN_NAME_LENGTH - 1]}…"
+                text += f"- {html.escape(name)}: <b>{total}</b>\n"
+            if len(by_token) > MAX_TOKENS_BY_ACTIVATIONS:
+                text += (
+                    f"... and {len(by_token) - MAX_TOKENS_BY_ACTIVATIONS} more, "
+                    "see /tokenstats csv\n"
+                )
+            await message.answer(text)
+            return
+        case ["rebuild"]:
+            await stats_service.rebuild()
+            await message.answer("Statistics rebuilt")
+            return
+        case _:
+            await message.answer("<b>Error:</b> Invalid arguments")
+            return
+
+    if count not in range(1, MAX_PERIODS + 1):
+        await message.answer("<b>Error:</b> Invalid arguments")
+        return
+
+    by_period = await stats_service.get_activations_by_period(period, count)
+    time_format = "%Y-%m-%d %H:00" if period == "hour" else "%Y-%m-%d"
+
+    text = f"<b>Activations by {period}:</b>\n"
+    for bucket, total in by_period:
+        text += f"- {bucket.strftime(time_format)}: <b>{total}</b>\n"
+    text += f"\nTotal: <b>{sum(total for _, total in by_period)}</b>"
+
+    await message.answer(text)
+
+
+@router.message(Command("tokenstats"))
+@inject
+async def tokenstats(
+    message: types.Message,
+    stats_service: "StatsService" = Provide["services.stats"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.text:
+        return
+
+    args = message.text.split(" ")[1:]
+    if args not in ([], ["csv"]):
+        await message.answer("<b>Error:</b> Invalid arguments")
+        return
+
+    report = await stats_service.get_token_stats()
+    time_format = "%Y-%m-%d %H:%M"
+
+    if args:
+        await message.answer_document(
+            csvutils.CSVInputFile(
+                (
+                    "id",
+                    "name",
+                    "valid",
+                    "activations",
+                    "first_activation",
+                    "last_activation",
+                ),
+                (
+                    (
+                        token.id,
+                        token.name,
+                        token.valid,
+                        token.activations,
+                        token.first_activation or "",
+                        token.last_activation or "",
+                    )
+                    for token in report.tokens
+                ),
+                filename="tokenstats.csv",
+            ),
+        )
+        return
+
+    text = (
+        f"Tokens: <b>{len(report.tokens)}</b>\n"
+        f"Never activated: <b>{report.never_activated}</b>\n"
+        f"As of {report.generated_at.strftime(time_format)} UTC\n"
+    )
+
+    text += "\n<b>Most activated:</b>\n"
+    for token in report.tokens[:TOP_TOKENS]:
+        first, last = token.first_activation, token.last_activation
+        if not token.activations or first is None or last is None:
+            break
+        text += (
+            f"- {html.escape(token.name)}: <b>{token.activations}</b> "
+            f"({first.strftime(time_format)} — {last.strftime(time_format)})\n"
+        )
+
+    unused = [token.name for token in report.tokens if not token.activations]
+    if unused:
+        text += "\n<b>Never activated:</b>\n"
+        for name in unused[:MAX_UNUSED_TOKENS]:
+            text += f"- {html.escape(name)}\n"
+        if len(unused) > MAX_UNUSED_TOKENS:
+            text += f"... and {len(unused) - MAX_UNUSED_TOKENS} more\n"
+
+    await message.answer(text)
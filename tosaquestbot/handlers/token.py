@@ -1,18 +1,41 @@
+import html
 import shlex
-from typing import TYPE_CHECKING
+import uuid
+from typing import TYPE_CHECKING, cast
 
 from aiogram import Router, types
 from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 from dependency_injector.wiring import Provide, inject
 
+from tosaquestbot import csvutils
 from tosaquestbot.adminutils import check_admin
 from tosaquestbot.errors import TokenAlreadyExistsError
+from tosaquestbot.services.token import ActivationAction, make_token_names
+from tosaquestbot.stickers import SheetFormat, count_sheet_pages, render_token_sheets
 
 if TYPE_CHECKING:
-    from tosaquestbot.services.token import TokenService
+    from tosaquestbot.services.token import TokenPage, TokenService
 
 router = Router()
 
+MAX_MINT_COUNT = 5000
+MAX_REPORTED_DUPLICATES = 50
+TOKENS_PAGE_SIZE = 20
+# callback data is limited to 64 bytes, most of it taken by the token id
+MAX_NAME_PREFIX_BYTES = 20
+# one message per page
+MAX_PNG_PAGES = 10
+
+
+class TokenPageCallback(CallbackData, prefix="tokens"):
+    """Token list navigation, cursors are token ids in hex."""
+
+    after: str | None = None
+    before: str | None = None
+    name_prefix: str | None = None
+
 
 @router.message(Command("newtoken"))
 @inject
@@ -40,6 +63,75 @@ async def newtoken(
     await message.answer(f"Created token <code>{token.id}</code>")
 
 
+@router.message(Command("minttokens"))
+@inject
+async def minttokens(  # noqa: WPS231
+    message: types.Message,
+    token_service: "TokenService" = Provide["services.token"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.bot:
+        return
+
+    if message.document:
+        names_file = await message.bot.download(message.document)
+        if not names_file:
+            await message.answer("<b>Error:</b> Failed to download names file")
+            return
+        try:
+            names_text = names_file.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            await message.answer("<b>Error:</b> Names file must be UTF-8 text")
+            return
+        names = [line.strip() for line in names_text.splitlines() if line.strip()]
+    else:
+        args = (message.text or "").split(" ")[1:]
+        if len(args) != 2 or not args[1].isdigit():
+            await message.answer("<b>Error:</b> Invalid arguments")
+            return
+        count = int(args[1])
+        if not 1 <= count <= MAX_MINT_COUNT:
+            await message.answer(
+                f"<b>Error:</b> Expected from 1 to {MAX_MINT_COUNT} token names",
+            )
+            return
+        names = make_token_names(args[0], count)
+
+    if not names or len(names) > MAX_MINT_COUNT:
+        await message.answer(
+            f"<b>Error:</b> Expected from 1 to {MAX_MINT_COUNT} token names",
+        )
+        return
+
+    mint_result = await token_service.mint_tokens(names)
+
+    text = csvutils.dump(
+        ("id", "name"),
+        [(token.id, token.name) for token in mint_result.created],
+    )
+    await message.answer_document(
+        types.BufferedInputFile(text.encode(), filename="tokens.csv"),
+        caption=(
+            f"Created <code>{len(mint_result.created)}</code> tokens, "
+            f"<code>{len(mint_result.duplicates)}</code> duplicates"
+        ),
+    )
+
+    if mint_result.duplicates:
+        reported = mint_result.duplicates[:MAX_REPORTED_DUPLICATES]
+        report = "<b>Duplicates:</b>\n" + "\n".join(
+            f"- <code>{html.escape(name)}</code>" for name in reported
+        )
+        if len(mint_result.duplicates) > len(reported):
+            report += f"\n...and {len(mint_result.duplicates) - len(reported)} more"
+        await message.answer(report)
+
+
 @router.message(Command("deltoken"))
 @inject
 async def deltoken(
@@ -159,18 +251,138 @@ async def listtokens(
     if not check_admin(message.from_user.id):
         return
 
-    tokens = await token_service.get_all_tokens()
+    if not message.text:
+        return
 
-    await message.answer(
-        "\n\n".join(
-            [
-                f"id: <code>{token.id}</code>\n"
-                f"name: <code>{token.name}</code>\n"
-                f"valid: <code>{token.valid}</code>"
-                for token in tokens
-            ],
-        ),
+    args = message.text.split(" ", 1)[1:]
+    name_prefix = args[0].strip() if args else None
+
+    if name_prefix and (
+        ":" in name_prefix or len(name_prefix.encode()) > MAX_NAME_PREFIX_BYTES
+    ):
+        await message.answer(
+            f"<b>Error:</b> Name prefix must be at most {MAX_NAME_PREFIX_BYTES} "
+            "bytes long and must not contain ':'",
+        )
+        return
+
+    page = await token_service.get_tokens_page(
+        TOKENS_PAGE_SIZE,
+        name_prefix=name_prefix,
     )
+    text, keyboard = _render_tokens_page(page, name_prefix)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(TokenPageCallback.filter())
+@inject
+async def listtokens_page(
+    callback: types.CallbackQuery,
+    callback_data: TokenPageCallback,
+    token_service: "TokenService" = Provide["services.token"],
+) -> None:
+    if not check_admin(callback.from_user.id):
+        await callback.answer()
+        return
+
+    page = await token_service.get_tokens_page(
+        TOKENS_PAGE_SIZE,
+        after=str(uuid.UUID(callback_data.after)) if callback_data.after else None,
+        before=str(uuid.UUID(callback_data.before)) if callback_data.before else None,
+        name_prefix=callback_data.name_prefix,
+    )
+    text, keyboard = _render_tokens_page(page, callback_data.name_prefix)
+    if isinstance(callback.message, types.Message):
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+
+def _render_tokens_page(
+    page: "TokenPage",
+    name_prefix: str | None,
+) -> tuple[str, types.InlineKeyboardMarkup | None]:
+    if not page.tokens:
+        return "No tokens", None
+
+    text = "\n\n".join(
+        [
+            f"id: <code>{token.id}</code>\n"
+            f"name: <code>{html.escape(token.name)}</code>\n"
+            f"valid: <code>{token.valid}</code>\n"
+            f"activations: <code>{token.activations}</code>"
+            for token in page.tokens
+        ],
+    )
+
+    keyboard = InlineKeyboardBuilder()
+    if page.has_previous:
+        keyboard.button(
+            text="« Prev",
+            callback_data=TokenPageCallback(
+                before=page.tokens[0].id.hex,
+                name_prefix=name_prefix,
+            ),
+        )
+    if page.has_next:
+        keyboard.button(
+            text="Next »",
+            callback_data=TokenPageCallback(
+                after=page.tokens[-1].id.hex,
+                name_prefix=name_prefix,
+            ),
+        )
+    return text, keyboard.as_markup() if page.has_previous or page.has_next else None
+
+
+@router.message(Command("stickers"))
+@inject
+async def stickers(
+    message: types.Message,
+    token_service: "TokenService" = Provide["services.token"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.text:
+        return
+
+    args = shlex.split(message.text)[1:]
+
+    sheet_format: SheetFormat = "pdf"
+    if args and args[0] in {"pdf", "png"}:
+        sheet_format = cast(SheetFormat, args.pop(0))
+
+    if args:
+        tokens = await token_service.get_tokens_by_names(args)
+    else:
+        tokens = await token_service.get_all_tokens()
+
+    if not tokens:
+        await message.answer("<b>Error:</b> Token not found")
+        return
+
+    if sheet_format == "png" and count_sheet_pages(len(tokens)) > MAX_PNG_PAGES:
+        await message.answer(
+            f"<b>Error:</b> PNG is limited to {MAX_PNG_PAGES} pages, use PDF",
+        )
+        return
+
+    part = 0
+    async for sheet in render_token_sheets(tokens, sheet_format=sheet_format):
+        part += 1
+        if sheet_format == "png":
+            filename = f"stickers-{part:03d}.png"
+        elif part > 1:
+            # PDFs over the upload size limit are split
+            filename = f"stickers-{part:03d}.pdf"
+        else:
+            filename = "stickers.pdf"
+        await message.answer_document(
+            types.BufferedInputFile(sheet, filename=filename),
+        )
 
 
 @router.message(Command("checkactivation"))
@@ -233,6 +445,71 @@ async def revokeactivation(
     )
 
 
+def _parse_activation_rows(
+    text: str,
+) -> tuple[list[tuple[ActivationAction, uuid.UUID, uuid.UUID]], int]:
+    rows: list[tuple[ActivationAction, uuid.UUID, uuid.UUID]] = []
+    malformed = 0
+    for row in csvutils.load(text):
+        action = (row.get("action") or "").strip().lower()
+        try:
+            user_id = uuid.UUID((row.get("user_id") or "").strip())
+            token_id = uuid.UUID((row.get("token_id") or "").strip())
+        except ValueError:
+            malformed += 1
+            continue
+        if action not in {"grant", "revoke"}:
+            malformed += 1
+            continue
+        rows.append((cast(ActivationAction, action), user_id, token_id))
+    return rows, malformed
+
+
+@router.message(Command("importactivations"))
+@inject
+async def importactivations(
+    message: types.Message,
+    token_service: "TokenService" = Provide["services.token"],
+) -> None:
+    if not message.from_user:
+        return
+
+    if not check_admin(message.from_user.id):
+        return
+
+    if not message.bot:
+        return
+
+    if not message.document:
+        await message.answer(
+            "<b>Error:</b> Attach a CSV file with "
+            "<code>action,user_id,token_id</code> columns",
+        )
+        return
+
+    csv_file = await message.bot.download(message.document)
+    if not csv_file:
+        await message.answer("<b>Error:</b> Failed to download CSV file")
+        return
+
+    try:
+        # spreadsheet applications start UTF-8 CSV files with a BOM
+        csv_text = csv_file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        await message.answer("<b>Error:</b> CSV file must be UTF-8 text")
+        return
+
+    rows, malformed = _parse_activation_rows(csv_text)
+
+    import_result = await token_service.import_activations(rows)
+
+    await message.answer(
+        f"Applied: <code>{import_result.applied}</code>\n"
+        f"Skipped: <code>{import_result.skipped + malformed}</code>\n"
+        f"Not found: <code>{import_result.not_found}</code>",
+    )
+
+
 @router.message(Command("allactivationscsv"))
 @inject
 async def allactivationscsv(
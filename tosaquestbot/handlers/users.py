@@ -5,8 +5,10 @@ from aiogram.filters import Command
 from dependency_injector.wiring import Provide, inject
 
 from tosaquestbot.adminutils import check_admin
+from tosaquestbot.broadcast import BroadcastProgress, DeliveryStatus
 
 if TYPE_CHECKING:
+    from tosaquestbot.broadcast import Broadcaster
     from tosaquestbot.services.token import TokenService
     from tosaquestbot.services.user import UserService
 
@@ -98,8 +100,8 @@ async def topusers(
     text = "<b>Top users:</b>\n"
 
     for user in users:
-        user_activations = await token_service.get_activations_by_user(user)
-        text += f"- <code>{user.id}</code>: " f"<b>{len(user_activations)}</b>\n"
+        user_activations = await token_service.count_activations_by_user(user)
+        text += f"- <code>{user.id}</code>: " f"<b>{user_activations}</b>\n"
 
     await message.answer(text)
 
@@ -140,6 +142,7 @@ async def alluserscsv(
 async def sendtext(
     message: types.Message,
     user_service: "UserService" = Provide["services.user"],
+    broadcaster: "Broadcaster" = Provide["bot_context.broadcaster"],
 ) -> None:
     if not message.from_user:
         return
@@ -165,10 +168,12 @@ async def sendtext(
         await message.answer("User not found")
         return
 
-    if not message.bot:
-        return
+    status = await broadcaster.send(cast(int, user.telegram_id), text)
 
-    await message.bot.send_message(cast(int, user.telegram_id), text)
+    if status == DeliveryStatus.blocked:
+        await message.answer("User blocked the bot")
+    elif status == DeliveryStatus.failed:
+        await message.answer("Failed to send message")
 
 
 @router.message(Command("sendtop"))
@@ -176,6 +181,7 @@ async def sendtext(
 async def sendtop(
     message: types.Message,
     user_service: "UserService" = Provide["services.user"],
+    broadcaster: "Broadcaster" = Provide["bot_context.broadcaster"],
 ) -> None:
     if not message.from_user:
         return
@@ -197,8 +203,19 @@ async def sendtop(
 
     users = await user_service.get_top_users(count)
 
-    if not message.bot:
-        return
+    status_message = await message.answer(f"Broadcast to {len(users)} users started")
 
-    for user in users:
-        await message.bot.send_message(cast(int, user.telegram_id), text)
+    async def report(progress: BroadcastProgress) -> None:  # noqa: WPS430
+        await status_message.edit_text(
+            f"Broadcast: <b>{progress.processed}/{progress.total}</b>\n"
+            f"sent: <code>{progress.sent}</code>\n"
+            f"blocked: <code>{progress.blocked}</code>\n"
+            f"failed: <code>{progress.failed}</code>\n"
+            f"rate: <code>{progress.rate:.1f}/s</code>",
+        )
+
+    broadcaster.start(
+        [cast(int, user.telegram_id) for user in users],
+        text,
+        on_progress=report,
+    )
@@ -0,0 +1 @@
+"""Offline load testing against a fake Bot API."""
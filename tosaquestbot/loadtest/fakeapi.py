@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from logging import getLogger
+from typing import Any, Callable
+
+from aiohttp import web
+
+logger = getLogger(__name__)
+
+MessageCallback = Callable[[int, str], None]
+
+
+class FakeBotAPI:
+    """Local stand-in for the Telegram Bot API.
+
+    Serves ``getFile`` and file downloads from a corpus of images, records
+    ``sendMessage`` calls, remembers the webhook and commands and answers
+    every other method with ``true``.
+    """
+
+    def __init__(
+        self: "FakeBotAPI",
+        files: dict[str, str],
+        on_message: MessageCallback | None = None,
+    ):
+        """Initiate fake API.
+
+        Args:
+            files: Local file paths by file id.
+            on_message: Called with chat id and text of every sent message.
+        """
+        self.files = files
+        self.on_message = on_message
+        self.calls: Counter[str] = Counter()
+        self.webhook_url: str | None = None
+        self.allowed_updates: list[str] | None = None
+        self.commands: list[Any] = []
+        self.webhook_set = asyncio.Event()
+        self._message_id = 0
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._handle_method)
+        self.app.router.add_get("/file/bot{token}/{path:.+}", self._handle_file)
+
+    def file_path(self: "FakeBotAPI", file_id: str) -> str:
+        """Get Bot API file path of a corpus file.
+
+        Args:
+            file_id: File id.
+
+        Returns:
+            File path as returned by ``getFile``.
+        """
+        _, extension = os.path.splitext(self.files[file_id])
+        return f"photos/{file_id}{extension}"
+
+    async def _handle_method(self: "FakeBotAPI", request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = dict(await request.post())
+
+        match method.lower():
+            case "getme":
+                bot_id = int(request.match_info["token"].split(":")[0])
+                result: Any = {"id": bot_id, "is_bot": True, "first_name": "Load test"}
+            case "getwebhookinfo":
+                result = {
+                    "url": self.webhook_url or "",
+                    "has_custom_certificate": False,
+                    "pending_update_count": 0,
+                    "allowed_updates": self.allowed_updates,
+                }
+            case "setwebhook":
+                self.webhook_url = str(params["url"])
+                if "allowed_updates" in params:
+                    self.allowed_updates = json.loads(str(params["allowed_updates"]))
+                self.webhook_set.set()
+                result = True
+            case "getmycommands":
+                result = self.commands
+            case "setmycommands":
+                self.commands = json.loads(str(params["commands"]))
+                result = True
+            case "getfile":
+                file_id = str(params.get("file_id"))
+                if file_id not in self.files:
+                    return _error(400, "Bad Request: invalid file_id")
+                result = {
+                    "file_id": file_id,
+                    "file_unique_id": file_id,
+                    "file_size": os.path.getsize(self.files[file_id]),
+                    "file_path": self.file_path(file_id),
+                }
+            case "sendmessage":
+                result = self._send_message(
+                    int(str(params["chat_id"])), str(params["text"])
+                )
+            case _:
+                result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def _handle_file(
+        self: "FakeBotAPI", request: web.Request
+    ) -> web.StreamResponse:
+        file_id, _ = os.path.splitext(os.path.basename(request.match_info["path"]))
+        if file_id not in self.files:
+            raise web.HTTPNotFound()
+        return web.FileResponse(self.files[file_id])
+
+    def _send_message(self: "FakeBotAPI", chat_id: int, text: str) -> dict[str, Any]:
+        if self.on_message:
+            self.on_message(chat_id, text)
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": text,
+        }
+
+
+def _error(code: int, description: str) -> web.Response:
+    return web.json_response(
+        {"ok": False, "error_code": code, "description": description},
+        status=code,
+    )
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import time
+from logging import getLogger
+from typing import Any, Mapping, Sequence
+
+import aiohttp
+
+from tosaquestbot.loadtest.report import Sample
+
+logger = getLogger(__name__)
+
+UPDATE_KINDS = ("start", "activate", "photo")
+FIRST_USER_ID = 10**9
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse update mix such as ``start=1,activate=1,photo=4``.
+
+    Args:
+        mix: Comma separated kind=weight pairs.
+
+    Returns:
+        Weights by update kind.
+
+    Raises:
+        ValueError: If a kind is unknown or a weight is not a number.
+    """
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in UPDATE_KINDS:
+            raise ValueError(f"Unknown update kind: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+class UpdateGenerator:
+    """Posts synthetic webhook updates at a fixed rate.
+
+    Every synthetic user waits for the reply to its previous update before
+    sending the next one, so a reply can be matched to its update by chat id.
+    """
+
+    def __init__(  # noqa: WPS211
+        self: "UpdateGenerator",
+        target: str,
+        users: int,
+        mix: Mapping[str, float],
+        token_ids: Sequence[str],
+        file_ids: Sequence[str],
+        timeout: float = 30,
+        seed: int | None = None,
+    ):
+        """Initiate generator.
+
+        Args:
+            target: Webhook URL.
+            users: Number of synthetic users.
+            mix: Update kind weights.
+            token_ids: Token ids for ``/activate``.
+            file_ids: Corpus file ids for photos.
+            timeout: Seconds to wait for a reply.
+            seed: Random seed.
+        """
+        self.target = target
+        self.mix = {
+            kind: weight
+            for kind, weight in mix.items()
+            if weight > 0 and (kind != "photo" or file_ids)
+        }
+        self.token_ids = token_ids
+        self.file_ids = file_ids
+        self.timeout = timeout
+        self.saturated = 0
+        self._random = random.Random(seed)
+        self._idle = [FIRST_USER_ID + index for index in range(users)]
+        self._waiters: dict[int, asyncio.Future[float]] = {}
+        self._update_id = 0
+
+    def reply_received(self: "UpdateGenerator", chat_id: int, _: str) -> None:
+        """Match a reply sent through the Bot API to its update.
+
+        Args:
+            chat_id: Chat id.
+        """
+        waiter = self._waiters.get(chat_id)
+        if waiter and not waiter.done():
+            waiter.set_result(time.perf_counter())
+
+    async def run(
+        self: "UpdateGenerator",
+        rate: float,
+        duration: float,
+    ) -> list[Sample]:
+        """Post updates and wait for all replies.
+
+        Args:
+            rate: Updates per second.
+            duration: Seconds to generate updates for.
+
+        Returns:
+            Outcome of every update sent.
+        """
+        loop = asyncio.get_running_loop()
+        kinds, weights = zip(*self.mix.items())
+        tasks = []
+        async with aiohttp.ClientSession() as session:
+            started = loop.time()
+            for index in range(int(rate * duration)):
+                delay = started + index / rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if not self._idle:
+                    self.saturated += 1
+                    continue
+                kind = self._random.choices(kinds, weights)[0]
+                tasks.append(
+                    asyncio.create_task(self._send(session, kind, self._take_user())),
+                )
+            return list(await asyncio.gather(*tasks))
+
+    async def _send(
+        self: "UpdateGenerator",
+        session: aiohttp.ClientSession,
+        kind: str,
+        user_id: int,
+    ) -> Sample:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[user_id] = waiter
+        sent = time.perf_counter()
+        try:
+            async with session.post(
+                self.target, json=self._update(kind, user_id)
+            ) as resp:
+                body = await resp.read()
+                if resp.status != 200:
+                    return Sample(kind, error=f"HTTP {resp.status}")
+                if b"sendMessage" in body:
+                    # answered inline in the webhook response
+                    return Sample(kind, latency=time.perf_counter() - sent)
+            return Sample(
+                kind, latency=await asyncio.wait_for(waiter, self.timeout) - sent
+            )
+        except asyncio.TimeoutError:
+            return Sample(kind, error="no reply")
+        except aiohttp.ClientError as exc:
+            return Sample(kind, error=type(exc).__name__)
+        finally:
+            self._waiters.pop(user_id, None)
+            self._idle.append(user_id)
+
+    def _take_user(self: "UpdateGenerator") -> int:
+        user_index = self._random.randrange(len(self._idle))
+        self._idle[user_index], self._idle[-1] = self._idle[-1], self._idle[user_index]
+        return self._idle.pop()
+
+    def _update(self: "UpdateGenerator", kind: str, user_id: int) -> dict[str, Any]:
+        self._update_id += 1
+        message: dict[str, Any] = {
+            "message_id": self._update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+        }
+        match kind:
+            case "start":
+                message.update(_command("/start"))
+            case "activate":
+                token_id = self._random.choice(self.token_ids or ["0" * 32])
+                message.update(_command(f"/activate {token_id}"))
+            case "photo":
+                file_id = self._random.choice(self.file_ids)
+                message["photo"] = [
+                    {
+                        "file_id": file_id,
+                        "file_unique_id": file_id,
+                        "width": 1280,
+                        "height": 1280,
+                    },
+                ]
+        return {"update_id": self._update_id, "message": message}
+
+
+def _command(text: str) -> dict[str, Any]:
+    command, _, _ = text.partition(" ")
+    return {
+        "text": text,
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+    }
@@ -0,0 +1,455 @@
+import argparse
+import asyncio
+import importlib
+import os
+import signal
+import sys
+import time
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, cast
+
+import aiohttp
+from aiohttp import web
+from dependency_injector.wiring import Provider, inject
+from sqlalchemy import delete, or_, select
+
+from tosaquestbot.db import models
+from tosaquestbot.loadtest.fakeapi import FakeBotAPI
+from tosaquestbot.loadtest.generator import FIRST_USER_ID, UpdateGenerator, parse_mix
+from tosaquestbot.loadtest.report import format_report
+from tosaquestbot.services import token, user
+from tosaquestbot.services.activation_index import EVENT_TOPIC, activation_event
+from tosaquestbot.services.stats import apply_activation_deltas
+from tosaquestbot.services.token import make_token_names
+from tosaquestbot.stickers import render_sticker
+
+if TYPE_CHECKING:
+    from dependency_injector.providers import Configuration
+    from dependency_injector.providers import Provider as ProviderType
+
+    from tosaquestbot.cache import InvalidationBus
+    from tosaquestbot.db.database import Database
+    from tosaquestbot.services.token import TokenService
+
+logger = getLogger(__name__)
+
+TOKEN_PREFIX = "loadtest"
+CORPUS_EXTENSIONS = (".png", ".jpg", ".jpeg")
+STOP_TIMEOUT = 30
+
+
+class EmbeddedPostgres:
+    """Throwaway Postgres cluster run from the ``pgserver`` package binaries."""
+
+    def __init__(self: "EmbeddedPostgres", data_dir: str, port: int):
+        """Initiate cluster.
+
+        Args:
+            data_dir: Data directory, created on first start.
+            port: TCP port on 127.0.0.1.
+        """
+        self.data_dir = os.path.abspath(data_dir)
+        self.port = port
+
+    @property
+    def url(self: "EmbeddedPostgres") -> str:
+        """Database URL."""
+        return f"postgresql+asyncpg://postgres@127.0.0.1:{self.port}/postgres"
+
+    async def start(self: "EmbeddedPostgres") -> None:
+        """Create the cluster if needed and start it."""
+        await asyncio.to_thread(self._start)
+        logger.info("Embedded database running at %s", self.url)
+
+    async def stop(self: "EmbeddedPostgres") -> None:
+        """Stop the cluster."""
+        await asyncio.to_thread(self._pg_ctl, "-w", "-m", "fast", "stop")
+
+    def _start(self: "EmbeddedPostgres") -> None:
+        if not os.path.exists(os.path.join(self.data_dir, "PG_VERSION")):
+            _pgserver().initdb(
+                ["--auth=trust", "--username=postgres"], pgdata=self.data_dir
+            )
+        self._pg_ctl(
+            "-w",
+            "-l",
+            os.path.join(self.data_dir, "postgres.log"),
+            "-o",
+            f"-h 127.0.0.1 -p {self.port} -k {self.data_dir}",
+            "start",
+        )
+
+    def _pg_ctl(self: "EmbeddedPostgres", *args: str) -> None:
+        _pgserver().pg_ctl(list(args), pgdata=self.data_dir)
+
+
+def _pgserver() -> Any:
+    try:
+        return importlib.import_module("pgserver")
+    except ImportError:
+        raise RuntimeError("The embedded database needs the pgserver package")
+
+
+async def seed_corpus(
+    token_service: "TokenService",
+    count: int,
+    cache_dir: str,
+    corpus_dir: str | None,
+) -> tuple[list[str], dict[str, str]]:
+    """Mint load test tokens and collect photos for the fake API.
+
+    Args:
+        token_service: Token service.
+        count: Number of tokens to mint and render as stickers.
+        cache_dir: Sticker cache directory.
+        corpus_dir: Directory with extra photos.
+
+    Returns:
+        Token ids and photo paths by file id.
+    """
+    names = make_token_names(TOKEN_PREFIX, count) if count else []
+    await token_service.mint_tokens(names)
+    tokens = await token_service.get_tokens_by_names(names)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    sticker_paths = await asyncio.gather(
+        *[
+            loop.run_in_executor(
+                None, render_sticker, cache_dir, str(token.id), str(token.name)
+            )
+            for token in tokens
+        ],
+    )
+
+    files = {f"sticker{index}": path for index, path in enumerate(sticker_paths)}
+    if corpus_dir:
+        corpus = sorted(
+            entry.path
+            for entry in os.scandir(corpus_dir)
+            if entry.name.lower().endswith(CORPUS_EXTENSIONS)
+        )
+        files.update({f"corpus{index}": path for index, path in enumerate(corpus)})
+
+    logger.info("Seeded %d tokens and %d photos", len(tokens), len(files))
+    return [str(token.id) for token in tokens], files
+
+
+async def existing_users(db: "Database", telegram_ids: range) -> set[int]:
+    """Find real users among the synthetic user ids.
+
+    Args:
+        db: Database.
+        telegram_ids: Synthetic Telegram user ids.
+
+    Returns:
+        Telegram ids of users that exist before the load test.
+    """
+    stmt = select(models.User.telegram_id).where(
+        models.User.telegram_id.between(telegram_ids.start, telegram_ids.stop - 1),
+    )
+    async with db.session() as session:
+        return set(cast(list[int], (await session.execute(stmt)).scalars().all()))
+
+
+async def remove_seeded(  # noqa: WPS210
+    db: "Database",
+    bus: "InvalidationBus",
+    token_names: list[str],
+    telegram_ids: range,
+    keep_users: set[int],
+) -> None:
+    """Delete load test tokens, synthetic users and their activations.
+
+    Args:
+        db: Database.
+        bus: Invalidation bus.
+        token_names: Load test token names.
+        telegram_ids: Synthetic Telegram user ids.
+        keep_users: Telegram ids of users that existed before the load test.
+    """
+    users = select(models.User.id).where(
+        models.User.telegram_id.between(telegram_ids.start, telegram_ids.stop - 1),
+        models.User.telegram_id.not_in(keep_users),
+    )
+    async with db.session() as session:
+        token_ids = list(
+            (
+                await session.execute(
+                    select(models.Token.id).where(models.Token.name.in_(token_names)),
+                )
+            ).scalars(),
+        )
+        activations = (
+            await session.execute(
+                delete(models.Activation)
+                .where(
+                    or_(
+                        models.Activation.token_id.in_(token_ids),
+                        models.Activation.user_id.in_(users),
+                    ),
+                )
+                .returning(
+                    models.Activation.user_id,
+                    models.Activation.token_id,
+                    models.Activation.time,
+                ),
+            )
+        ).all()
+        await apply_activation_deltas(
+            session,
+            [(token_id, time, -1) for _, token_id, time in activations],
+        )
+        await session.execute(
+            delete(models.ActivationHourlyStat).where(
+                models.ActivationHourlyStat.token_id.in_(token_ids),
+            ),
+        )
+        await session.execute(
+            delete(models.Token).where(models.Token.id.in_(token_ids)),
+        )
+        removed_users = (
+            await session.execute(
+                delete(models.User)
+                .where(models.User.id.in_(users))
+                .returning(models.User.telegram_id),
+            )
+        ).scalars()
+
+        await bus.publish_many(
+            session,
+            token.CACHE_TOPIC,
+            [str(token_id) for token_id in token_ids],
+        )
+        await bus.publish_many(
+            session,
+            user.CACHE_TOPIC,
+            [str(telegram_id) for telegram_id in removed_users],
+        )
+        await bus.publish_many(
+            session,
+            EVENT_TOPIC,
+            [
+                activation_event("-", user_id, token_id)
+                for user_id, token_id, _ in activations
+            ],
+        )
+        await session.commit()
+
+    logger.info(
+        "Removed %d load test tokens and %d activations",
+        len(token_ids),
+        len(activations),
+    )
+
+
+async def wait_listening(url: str, timeout: float) -> None:
+    """Wait until an HTTP server accepts connections.
+
+    Args:
+        url: Any URL on the server.
+        timeout: Seconds to wait.
+
+    Raises:
+        TimeoutError: If the server does not come up in time.
+    """
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:  # noqa: WPS457
+            try:
+                async with session.get(url):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{url} is not reachable")
+                await asyncio.sleep(0.2)
+
+
+async def migrate(db_url: str) -> None:
+    """Apply migrations to a database.
+
+    Args:
+        db_url: Database URL.
+
+    Raises:
+        RuntimeError: If migration fails.
+    """
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "alembic",
+        "upgrade",
+        "head",
+        env={**os.environ, "DB_URL": db_url},
+    )
+    if await process.wait():
+        raise RuntimeError("Failed to migrate the load test database")
+
+
+async def spawn_bot(
+    api_url: str,
+    port: int,
+    workers: int,
+    db_url: str | None,
+) -> asyncio.subprocess.Process:
+    """Start the bot pointed at the fake API.
+
+    Args:
+        api_url: Fake Bot API URL.
+        port: Webhook port.
+        workers: Number of worker processes.
+        db_url: Database URL, defaults to the current one.
+
+    Returns:
+        Bot process.
+    """
+    env = dict(os.environ)
+    env.update(
+        {
+            "BOT_API_URL": api_url,
+            "HTTP__HOST": "127.0.0.1",
+            "HTTP__PORT": str(port),
+            "HTTP__BASE_URL": f"http://127.0.0.1:{port}",
+        },
+    )
+    if db_url:
+        env["DB_URL"] = db_url
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "tosaquestbot",
+        "--workers",
+        str(workers),
+        env=env,
+    )
+
+
+async def stop_bot(process: asyncio.subprocess.Process) -> None:
+    """Stop the bot and wait for it.
+
+    Args:
+        process: Bot process.
+    """
+    if process.returncode is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), STOP_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+@inject
+async def run(  # noqa: WPS210, WPS213, WPS231
+    args: argparse.Namespace,
+    config: "Configuration" = Provider["config"],
+    token_service_provider: "ProviderType[TokenService]" = Provider["services.token"],
+    db_provider: "ProviderType[Database]" = Provider["db"],
+    bus_provider: "ProviderType[InvalidationBus]" = Provider[
+        "services.invalidation_bus"
+    ],
+) -> int:
+    """Run a load test.
+
+    Seeded tokens and synthetic users are deleted when the test ends. The
+    configured database is only used with ``--allow-external-db``.
+
+    Args:
+        args: Parsed ``loadtest`` arguments.
+        config: Application configuration provider.
+        token_service_provider: Token service provider.
+        db_provider: Database provider.
+        bus_provider: Invalidation bus provider.
+
+    Returns:
+        Exit code.
+    """
+    if not args.embedded_db and not args.allow_external_db:
+        logger.error(
+            "The load test seeds the database, "
+            "use --embedded-db or --allow-external-db",
+        )
+        return 2
+
+    database = None
+    if args.embedded_db:
+        database = EmbeddedPostgres(args.embedded_db, args.db_port)
+        await database.start()
+        await migrate(database.url)
+        config.db_url.from_value(database.url)
+
+    fake_api = FakeBotAPI({})
+    runner = web.AppRunner(fake_api.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    logger.info("Fake Bot API listening at %s", api_url)
+
+    telegram_ids = range(FIRST_USER_ID, FIRST_USER_ID + args.users)
+    keep_users = await existing_users(db_provider(), telegram_ids)
+    bot_process = None
+    try:
+        token_ids, fake_api.files = await seed_corpus(
+            token_service_provider(),
+            args.tokens,
+            args.cache_dir,
+            args.corpus,
+        )
+        # the embedded database lives only as long as the harness
+        if args.spawn or database:
+            bot_process = await spawn_bot(
+                api_url,
+                args.bot_port,
+                args.workers,
+                database.url if database else None,
+            )
+        else:
+            logger.info("Waiting for the bot, start it with BOT_API_URL=%s", api_url)
+
+        target = args.target
+        if not target:
+            await asyncio.wait_for(fake_api.webhook_set.wait(), args.startup_timeout)
+            target = fake_api.webhook_url
+        await wait_listening(target, args.startup_timeout)
+        fake_api.calls.clear()
+
+        generator = UpdateGenerator(
+            target,
+            users=args.users,
+            mix=parse_mix(args.mix),
+            token_ids=token_ids,
+            file_ids=list(fake_api.files),
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+        fake_api.on_message = generator.reply_received
+        logger.info(
+            "Sending %s updates/s for %ss to %s", args.rate, args.duration, target
+        )
+
+        started = time.monotonic()
+        samples = await generator.run(args.rate, args.duration)
+        args.output.write(
+            format_report(
+                samples,
+                time.monotonic() - started,
+                saturated=generator.saturated,
+                api_calls=fake_api.calls,
+            ),
+        )
+        args.output.write("\n")
+    finally:
+        if bot_process:
+            await stop_bot(bot_process)
+        await runner.cleanup()
+        await remove_seeded(
+            db_provider(),
+            bus_provider(),
+            make_token_names(TOKEN_PREFIX, args.tokens),
+            telegram_ids,
+            keep_users,
+        )
+        if database:
+            await database.stop()
+    return 0
@@ -0,0 +1,97 @@
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Mapping, Sequence
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Sample:
+    """Outcome of a single synthetic update."""
+
+    kind: str
+    latency: float | None = None
+    error: str | None = None
+
+
+def percentile(values: Sequence[float], rank: float) -> float:
+    """Get nearest-rank percentile.
+
+    Args:
+        values: Sorted values.
+        rank: Percentile, 0 to 100.
+
+    Returns:
+        Percentile value, 0 for no values.
+    """
+    if not values:
+        return 0
+    index = max(math.ceil(rank / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+def format_report(
+    samples: Sequence[Sample],
+    duration: float,
+    saturated: int = 0,
+    api_calls: Mapping[str, int] | None = None,
+) -> str:
+    """Format latency and error report.
+
+    Latency is end-to-end: from posting the update to the reply reaching the
+    Bot API, or to the webhook response for replies sent inline.
+
+    Args:
+        samples: Update outcomes.
+        duration: Test duration in seconds.
+        saturated: Updates skipped because every user was waiting for a reply.
+        api_calls: Bot API calls by method.
+
+    Returns:
+        Report text.
+    """
+    by_kind: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_kind[sample.kind].append(sample)
+
+    header = f"{'handler':<10}{'count':>8}{'errors':>8}"
+    header += "".join(f"{f'p{rank}':>10}" for rank in PERCENTILES)
+    header += f"{'max':>10}"
+    lines = [header]
+    errors: Counter[tuple[str, str]] = Counter()
+
+    for kind, kind_samples in sorted(by_kind.items()):
+        latencies = sorted(
+            sample.latency for sample in kind_samples if sample.latency is not None
+        )
+        failed = [sample for sample in kind_samples if sample.error]
+        errors.update((kind, str(sample.error)) for sample in failed)
+        line = f"{kind:<10}{len(kind_samples):>8}{len(failed):>8}"
+        line += "".join(
+            f"{percentile(latencies, rank) * 1000:>8.0f}ms" for rank in PERCENTILES
+        )
+        line += f"{(latencies[-1] if latencies else 0) * 1000:>8.0f}ms"
+        lines.append(line)
+
+    completed = sum(1 for sample in samples if sample.latency is not None)
+    lines.append("")
+    lines.append(
+        f"{len(samples)} updates in {duration:.1f}s, "
+        f"{completed / duration if duration else 0:.1f} replies/s, "
+        f"{saturated} skipped with all users busy",
+    )
+
+    if errors:
+        lines.append("")
+        lines.append("Errors:")
+        for (kind, error), count in errors.most_common():
+            lines.append(f"- {kind}: {error} x{count}")
+
+    if api_calls:
+        lines.append("")
+        lines.append("Bot API calls:")
+        for method, count in sorted(api_calls.items()):
+            lines.append(f"- {method}: {count}")
+
+    return "\n".join(lines)
@@ -1,45 +1,109 @@
 import asyncio
+import signal
 from logging import getLogger
 from typing import TYPE_CHECKING, cast
 
 from aiohttp import web
 from dependency_injector.wiring import Provide, inject
 
-from tosaquestbot import bot
+from tosaquestbot import bot, metrics, qrutils
 
 if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
     from dependency_injector.providers import Configuration
 
+    from tosaquestbot.broadcast import BroadcastWorker
+    from tosaquestbot.cache import InvalidationBus
+    from tosaquestbot.db.database import Database
+    from tosaquestbot.services.activation_buffer import ActivationWriteBuffer
+    from tosaquestbot.services.activation_index import ActivationIndex
+
 logger = getLogger(__name__)
 
 
 @inject
 async def main(
+    primary: bool = True,
+    reuse_port: bool = False,
     app: "web.Application" = Provide["http.app"],
     config: "Configuration" = Provide["http.config"],
+    webhook_config: "Configuration" = Provide["config.webhook"],
+    metrics_config: "Configuration" = Provide["config.metrics"],
+    telegram_bot: "Bot" = Provide["bot_context.bot"],
+    download_session: "AiohttpSession" = Provide["bot_context.download_session"],
+    activation_buffer: "ActivationWriteBuffer" = Provide["services.activation_buffer"],
+    broadcast_worker: "BroadcastWorker" = Provide["broadcast_worker"],
+    db: "Database" = Provide["db"],
+    invalidation_bus: "InvalidationBus" = Provide["services.invalidation_bus"],
+    activation_index: "ActivationIndex" = Provide["services.activation_index"],
 ) -> None:
-    await bot.init()
+    metrics.track_queue("activations", lambda: activation_buffer.pending)
+    metrics.track_pool("db", db.pool_in_use, db.pool_size)
+    metrics.track_memory("activation_index", activation_index.memory_usage)
+
+    invalidation_bus.start()
+    activation_index.start(shared=reuse_port)
+    await bot.init(register=primary)
+
+    # background jobs run in the primary worker only
+    if primary:
+        broadcast_worker.start()
+
+    # runs after the webhook handler has drained in-flight updates
+    async def close_resources(_: web.Application) -> None:  # noqa: WPS430
+        await broadcast_worker.stop()
+        await activation_buffer.close()
+        if qrutils.busy:
+            logger.warning("Abandoning %d running QR decodes", qrutils.busy)
+        await telegram_bot.session.close()
+        await download_session.close()
+        await activation_index.stop()
+        await invalidation_bus.stop()
+        await db.close()
+
+    app.on_cleanup.append(close_resources)  # type: ignore
 
     host = cast(str, config.get("host") or "127.0.0.1")
     port = cast(int, config["port"])
+    drain_timeout = cast(float, webhook_config["drain_timeout"])
 
     logger.info("Starting application at %s:%s", host, port)
 
-    server_task = asyncio.create_task(
-        web._run_app(  # noqa: WPS437; intented  # type: ignore
-            app,
-            host=host,
-            port=port,
-            print=lambda *args: None,
-            handle_signals=True,
-        ),
-        name="webserver",
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(
+        runner,
+        host,
+        port,
+        reuse_port=reuse_port,
+        shutdown_timeout=drain_timeout,
     )
+    await site.start()
+
+    metrics_runner = None
+    if cast(bool, metrics_config["enabled"]):
+        metrics_host = cast(str, metrics_config["host"])
+        metrics_port = cast(int, metrics_config["port"])
+        metrics_runner = await metrics.serve(
+            metrics_host,
+            metrics_port,
+            cast(str, metrics_config["path"]),
+            reuse_port=reuse_port,
+        )
+        logger.info("Serving metrics at %s:%s", metrics_host, metrics_port)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
 
     try:
-        await server_task
-    except asyncio.CancelledError:
+        await stop.wait()
+    finally:
+        # stop listening, drain updates (on shutdown), then flush and close (on cleanup)
         logger.info("Shutting down application")
-        server_task.cancel()
-        await server_task
+        await runner.cleanup()
+        if metrics_runner:
+            await metrics_runner.cleanup()
         logger.info("Application stopped")
@@ -0,0 +1,274 @@
+import functools
+import inspect
+import os
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterator, TypeVar
+
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from tosaquestbot import tracing
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+
+# Every label below takes values from a fixed set (handler, service method,
+# Bot API method and decode stage names), never from user input.
+
+UPDATE_LATENCY = Histogram(
+    "tosaquestbot_update_duration_seconds",
+    "Time spent handling an update",
+    ["handler"],
+)
+PHOTO_DOWNLOAD_LATENCY = Histogram(
+    "tosaquestbot_photo_download_seconds",
+    "Time spent fetching a photo from the Bot API",
+)
+DECODE_LATENCY = Histogram(
+    "tosaquestbot_decode_duration_seconds",
+    "Time spent decoding a photo",
+    ["stage"],
+)
+DB_LATENCY = Histogram(
+    "tosaquestbot_db_duration_seconds",
+    "Time spent in a database service method",
+    ["method"],
+)
+BOT_API_LATENCY = Histogram(
+    "tosaquestbot_bot_api_duration_seconds",
+    "Outbound Bot API request latency",
+    ["method"],
+)
+BOT_API_ERRORS = Counter(
+    "tosaquestbot_bot_api_errors",
+    "Failed outbound Bot API requests",
+    ["method", "error"],
+)
+ACTIVATION_FLUSH_LATENCY = Histogram(
+    "tosaquestbot_activation_flush_seconds",
+    "Time spent committing a batch of buffered activations",
+)
+ACTIVATION_COMMITS = Counter(
+    "tosaquestbot_activation_commits",
+    "Batches of buffered activations committed",
+)
+CHAT_QUEUE_WAIT = Histogram(
+    "tosaquestbot_chat_queue_wait_seconds",
+    "Time an update waits for earlier updates of its chat and a free slot",
+)
+
+ACTIVATIONS = Counter("tosaquestbot_activations", "Tokens activated")
+DECODE_FAILURES = Counter(
+    "tosaquestbot_decode_failures",
+    "Photos without a readable token QR code",
+)
+REJECTED_PAYLOADS = Counter(
+    "tosaquestbot_rejected_payloads",
+    "Webhook payloads refused before handling",
+    ["reason"],
+)
+THROTTLED_UPDATES = Counter(
+    "tosaquestbot_throttled_updates",
+    "Messages dropped by per-user rate limits",
+    ["kind"],
+)
+
+GaugeCallback = Callable[[], float]
+
+Service = TypeVar("Service", bound=type)
+
+
+class RuntimeCollector:
+    """Collects queue depths, pool usage and memory use when scraped."""
+
+    def __init__(self: "RuntimeCollector"):
+        """Initiate collector."""
+        self.queues: dict[str, GaugeCallback] = {}
+        self.pools: dict[str, tuple[GaugeCallback, GaugeCallback]] = {}
+        self.memory: dict[str, GaugeCallback] = {}
+
+    def collect(self: "RuntimeCollector") -> Iterator[Metric]:
+        """Collect current values.
+
+        Yields:
+            Queue depth, pool usage and memory gauges.
+        """
+        depth = GaugeMetricFamily(
+            "tosaquestbot_queue_depth",
+            "Items waiting in an in-process queue",
+            labels=["queue"],
+        )
+        for queue, queue_depth in self.queues.items():
+            depth.add_metric([queue], queue_depth())
+        yield depth
+
+        in_use = GaugeMetricFamily(
+            "tosaquestbot_pool_in_use",
+            "Pool slots in use",
+            labels=["pool"],
+        )
+        size = GaugeMetricFamily(
+            "tosaquestbot_pool_size",
+            "Pool slots",
+            labels=["pool"],
+        )
+        for pool, (pool_in_use, pool_size) in self.pools.items():
+            in_use.add_metric([pool], pool_in_use())
+            size.add_metric([pool], pool_size())
+        yield in_use
+        yield size
+
+        memory = GaugeMetricFamily(
+            "tosaquestbot_memory_bytes",
+            "Estimated size of an in-memory structure",
+            labels=["structure"],
+        )
+        for structure, memory_usage in self.memory.items():
+            memory.add_metric([structure], memory_usage())
+        yield memory
+
+
+runtime = RuntimeCollector()
+REGISTRY.register(runtime)  # type: ignore
+
+
+def track_queue(name: str, depth: GaugeCallback) -> None:
+    """Report depth of a queue on scrape.
+
+    Args:
+        name: Queue name.
+        depth: Returns the number of queued items.
+    """
+    runtime.queues[name] = depth
+
+
+def track_pool(name: str, in_use: GaugeCallback, size: GaugeCallback) -> None:
+    """Report usage of a pool on scrape.
+
+    Args:
+        name: Pool name.
+        in_use: Returns the number of busy slots.
+        size: Returns the number of slots.
+    """
+    runtime.pools[name] = (in_use, size)
+
+
+def track_memory(name: str, usage: GaugeCallback) -> None:
+    """Report size of an in-memory structure on scrape.
+
+    Args:
+        name: Structure name.
+        usage: Returns the size in bytes.
+    """
+    runtime.memory[name] = usage
+
+
+def instrument_service(cls: Service) -> Service:
+    """Time every public coroutine method of a service class.
+
+    Args:
+        cls: Service class.
+
+    Returns:
+        The same class with wrapped methods.
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _timed(method, f"{cls.__name__}.{name}"))
+    return cls
+
+
+def _timed(method: Callable[..., Awaitable[Any]], name: str) -> Any:
+    histogram = DB_LATENCY.labels(name)
+
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+        started = time.perf_counter()
+        try:
+            with tracing.span(name):
+                return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+async def observe_bot_api(
+    make_request: "NextRequestMiddlewareType[TelegramType]",
+    bot: "Bot",
+    method: "TelegramMethod[TelegramType]",
+) -> "Response[TelegramType]":
+    """Bot session middleware timing outbound requests and counting failures.
+
+    Args:
+        make_request: Next middleware.
+        bot: Bot.
+        method: Bot API method.
+
+    Returns:
+        Bot API response.
+    """
+    with BOT_API_LATENCY.labels(method.__api_method__).time():
+        try:
+            return await make_request(bot, method)
+        except Exception as exc:
+            BOT_API_ERRORS.labels(method.__api_method__, type(exc).__name__).inc()
+            raise
+
+
+async def serve(
+    host: str,
+    port: int,
+    path: str,
+    reuse_port: bool = False,
+) -> web.AppRunner:
+    """Serve metrics on their own HTTP server.
+
+    Args:
+        host: Address to listen on.
+        port: Port to listen on.
+        path: Metrics route.
+        reuse_port: Share the port with other workers.
+
+    Returns:
+        Runner to clean up on shutdown.
+    """
+    app = web.Application()
+    app.router.add_get(path, handle_metrics)
+    runner = web.AppRunner(app, handle_signals=False, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port, reuse_port=reuse_port).start()
+    return runner
+
+
+async def handle_metrics(_: web.Request) -> web.Response:
+    """Serve metrics in the Prometheus text format.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set, metrics of all worker processes
+    are aggregated; queue, pool and memory gauges then come from the scraped one.
+
+    Returns:
+        Metrics response.
+    """
+    registry: CollectorRegistry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)  # type: ignore
+        registry.register(runtime)  # type: ignore
+    return web.Response(
+        body=generate_latest(registry),
+        headers={"Content-Type": CONTENT_TYPE_LATEST},
+    )
@@ -0,0 +1,45 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from tosaquestbot.metrics import UPDATE_LATENCY
+
+
+def handler_name(data: dict[str, Any]) -> str:
+    """Get name of the handler an event was routed to.
+
+    Args:
+        data: Handler data.
+
+    Returns:
+        Handler module and function name.
+    """
+    handler_object = data.get("handler")
+    if not handler_object:
+        return "unknown"
+    callback = handler_object.callback
+    return f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Times handlers, labelled with the handler module and name."""
+
+    async def __call__(
+        self: "HandlerMetricsMiddleware",
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Run the handler under a timer.
+
+        Args:
+            handler: Next handler.
+            event: Event.
+            data: Handler data.
+
+        Returns:
+            Handler result.
+        """
+        with UPDATE_LATENCY.labels(handler_name(data)).time():
+            return await handler(event, data)
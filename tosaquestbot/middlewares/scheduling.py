@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject, User
+
+from tosaquestbot.metrics import CHAT_QUEUE_WAIT
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+# update id, arrival number, waiter
+Waiter = tuple[int, int, asyncio.Future[None]]
+
+
+class ChatScheduler(BaseMiddleware):
+    """Runs updates of a chat one at a time and of different chats in parallel.
+
+    Every chat has a queue of waiting updates ordered by update id. Chats
+    with a waiting update and none running take turns round-robin for one
+    of ``concurrency`` slots, so a chat that sends a burst gets one slot
+    at a time and goes to the back of the line after each update. Updates
+    without a chat or user run unscheduled.
+
+    The order holds within one process. Workers sharing the port with
+    ``SO_REUSEPORT`` get connections from the kernel regardless of chat, so
+    two updates of a chat may still run at once in different workers.
+    """
+
+    def __init__(self: "ChatScheduler", concurrency: int = 64):
+        """Initiate scheduler.
+
+        Args:
+            concurrency: Maximum number of updates handled at once.
+        """
+        self.concurrency = concurrency
+        self.running = 0
+        self._waiting: dict[int, list[Waiter]] = {}
+        self._busy: set[int] = set()
+        self._ready: deque[int] = deque()
+        self._arrivals = itertools.count()
+
+    @property
+    def pending(self: "ChatScheduler") -> int:
+        """Number of updates waiting for their turn."""
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    async def __call__(
+        self: "ChatScheduler",
+        handler: Handler,
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Run the update once it is the chat's turn and a slot is free.
+
+        Args:
+            handler: Next handler.
+            event: Update.
+            data: Handler data.
+
+        Returns:
+            Handler result.
+        """
+        chat: Chat | None = data.get("event_chat")
+        user: User | None = data.get("event_from_user")
+        if chat:
+            chat_id = chat.id
+        elif user:
+            chat_id = user.id
+        else:
+            return await handler(event, data)
+
+        queued = time.perf_counter()
+        await self._acquire(chat_id, getattr(event, "update_id", 0))
+        CHAT_QUEUE_WAIT.observe(time.perf_counter() - queued)
+        try:
+            return await handler(event, data)
+        finally:
+            self._release(chat_id)
+
+    async def _acquire(self: "ChatScheduler", chat_id: int, update_id: int) -> None:
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        waiters = self._waiting.setdefault(chat_id, [])
+        heapq.heappush(waiters, (update_id, next(self._arrivals), waiter))
+        if len(waiters) == 1 and chat_id not in self._busy:
+            self._ready.append(chat_id)
+        self._schedule()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._withdraw(chat_id, waiter)
+            else:
+                # the turn came just as the update was cancelled
+                self._release(chat_id)
+            raise
+
+    def _release(self: "ChatScheduler", chat_id: int) -> None:
+        self.running -= 1
+        self._busy.discard(chat_id)
+        if self._waiting.get(chat_id):
+            self._ready.append(chat_id)
+        else:
+            self._waiting.pop(chat_id, None)
+        self._schedule()
+
+    def _withdraw(
+        self: "ChatScheduler",
+        chat_id: int,
+        waiter: asyncio.Future[None],
+    ) -> None:
+        waiters = [
+            queued for queued in self._waiting[chat_id] if queued[2] is not waiter
+        ]
+        heapq.heapify(waiters)
+        if waiters:
+            self._waiting[chat_id] = waiters
+            return
+        del self._waiting[chat_id]  # noqa: WPS420
+        if chat_id not in self._busy:
+            self._ready.remove(chat_id)
+
+    def _schedule(self: "ChatScheduler") -> None:
+        while self.running < self.concurrency and self._ready:
+            chat_id = self._ready.popleft()
+            _, _, waiter = heapq.heappop(self._waiting[chat_id])
+            self._busy.add(chat_id)
+            self.running += 1
+            waiter.set_result(None)
@@ -0,0 +1,156 @@
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from tosaquestbot.adminutils import check_admin
+from tosaquestbot.metrics import THROTTLED_UPDATES
+from tosaquestbot.replyutils import reply
+
+logger = getLogger(__name__)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UserBuckets:
+    """Token buckets keyed by telegram id.
+
+    Buckets are refilled lazily when touched and kept in least recently
+    used order, so evicting idle ones only looks at the oldest entries.
+    """
+
+    def __init__(
+        self: "UserBuckets",
+        rate: float,
+        burst: float,
+        idle_timeout: float = 600,
+    ):
+        """Initiate buckets.
+
+        Args:
+            rate: Tokens added per second.
+            burst: Bucket capacity.
+            idle_timeout: Seconds after which an untouched bucket is dropped.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.idle_timeout = idle_timeout
+        # telegram id -> [tokens, last update, throttled notice sent]
+        self._buckets: OrderedDict[int, list[Any]] = OrderedDict()
+
+    def __len__(self: "UserBuckets") -> int:
+        """Number of tracked users."""
+        return len(self._buckets)
+
+    def acquire(self: "UserBuckets", telegram_id: int) -> bool | None:
+        """Take a token from the user bucket.
+
+        Args:
+            telegram_id: Telegram id.
+
+        Returns:
+            True if allowed, False if throttled for the first time since the
+            last allowed event, None if throttled again.
+        """
+        now = time.monotonic()
+        self._evict(now)
+
+        bucket = self._buckets.get(telegram_id)
+        if bucket is None:
+            bucket = [self.burst, now, False]
+            self._buckets[telegram_id] = bucket
+        else:
+            self._buckets.move_to_end(telegram_id)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True
+        if bucket[2]:
+            return None
+        bucket[2] = True
+        return False
+
+    def _evict(self: "UserBuckets", now: float) -> None:
+        while self._buckets:
+            telegram_id, bucket = next(iter(self._buckets.items()))
+            if now - bucket[1] < self.idle_timeout:
+                return
+            del self._buckets[telegram_id]  # noqa: WPS420
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Limits photos and commands per user before they reach handlers.
+
+    Videos count as photos. Throttled ones are dropped before they are
+    downloaded or decoded. The user gets one notice per burst of throttled
+    messages. Admins are never throttled.
+    """
+
+    def __init__(  # noqa: WPS211
+        self: "ThrottlingMiddleware",
+        photo_rate: float,
+        photo_burst: float,
+        command_rate: float,
+        command_burst: float,
+        idle_timeout: float = 600,
+    ):
+        """Initiate middleware.
+
+        Args:
+            photo_rate: Photos per second allowed per user.
+            photo_burst: Photos a user may send at once.
+            command_rate: Commands per second allowed per user.
+            command_burst: Commands a user may send at once.
+            idle_timeout: Seconds after which a user is forgotten.
+        """
+        self.buckets = {
+            "photo": UserBuckets(photo_rate, photo_burst, idle_timeout),
+            "command": UserBuckets(command_rate, command_burst, idle_timeout),
+        }
+
+    async def __call__(
+        self: "ThrottlingMiddleware",
+        handler: Handler,
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Run the handler unless the user is over the limit.
+
+        Args:
+            handler: Next handler.
+            event: Message.
+            data: Handler data.
+
+        Returns:
+            Handler result, or the throttled notice.
+        """
+        if not isinstance(event, Message) or not event.from_user:
+            return await handler(event, data)
+
+        if event.photo or event.video or event.video_note or event.animation:
+            kind = "photo"
+        elif event.text and event.text.startswith("/"):
+            kind = "command"
+        else:
+            return await handler(event, data)
+
+        if check_admin(event.from_user.id):
+            return await handler(event, data)
+
+        allowed = self.buckets[kind].acquire(event.from_user.id)
+        if allowed:
+            return await handler(event, data)
+
+        THROTTLED_UPDATES.labels(kind).inc()
+        if allowed is None:
+            return None
+        logger.info("Throttling %s from user %s", kind, event.from_user.id)
+        return await reply(
+            event.answer("Забагато повідомлень. Спробуйте трохи пізніше"),
+        )
@@ -0,0 +1,89 @@
+from logging import getLogger
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from tosaquestbot import tracing
+from tosaquestbot.middlewares.metrics import handler_name
+
+logger = getLogger(__name__)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Traces every update and logs slow ones with their span breakdown."""
+
+    def __init__(
+        self: "TracingMiddleware",
+        slow_threshold: float,
+        exporter: tracing.TraceExporter | None = None,
+    ):
+        """Initiate middleware.
+
+        Args:
+            slow_threshold: Seconds after which an update is logged.
+            exporter: Exporter of sampled traces.
+        """
+        self.slow_threshold = slow_threshold
+        self.exporter = exporter
+
+    async def __call__(
+        self: "TracingMiddleware",
+        handler: Handler,
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Run the update under a root span.
+
+        Args:
+            handler: Next handler.
+            event: Update.
+            data: Handler data.
+
+        Returns:
+            Handler result.
+        """
+        update_id = getattr(event, "update_id", None)
+        root = None
+        try:
+            with tracing.trace(f"update {update_id}") as root:
+                return await handler(event, data)
+        finally:
+            if root:
+                self._report(root)
+
+    def _report(self: "TracingMiddleware", root: tracing.Span) -> None:
+        if (root.duration or 0) >= self.slow_threshold:
+            logger.warning(
+                "Slow %s took %.0f ms:\n%s",
+                root.name,
+                (root.duration or 0) * 1000,
+                root.format(),
+            )
+        if self.exporter:
+            self.exporter.export(root)
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    """Records the handler an update was routed to as a span."""
+
+    async def __call__(
+        self: "HandlerSpanMiddleware",
+        handler: Handler,
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Run the handler under a span.
+
+        Args:
+            handler: Next handler.
+            event: Event.
+            data: Handler data.
+
+        Returns:
+            Handler result.
+        """
+        with tracing.span(f"handler {handler_name(data)}"):
+            return await handler(event, data)
@@ -1,5 +1,6 @@
 import asyncio
 import atexit
+import os
 from concurrent import futures
 from logging import getLogger
 from typing import cast
@@ -7,7 +8,12 @@ from typing import cast
 from cv2.typing import MatLike
 from qreader import QReader  # type: ignore
 
-pool = futures.ThreadPoolExecutor()
+from tosaquestbot import metrics, tracing
+
+POOL_SIZE = min(32, (os.cpu_count() or 1) + 4)
+
+pool = futures.ThreadPoolExecutor(POOL_SIZE)
+busy = 0
 
 qreader = QReader()
 
@@ -15,17 +21,25 @@ logger = getLogger(__name__)
 
 
 async def detect_and_decode(img: MatLike) -> tuple[str | None]:
+    global busy  # noqa: WPS420
+
     logger.info("Detecting and decoding QR code")
     loop = asyncio.get_running_loop()
-    return cast(
-        tuple[str | None],  # noqa: WPS465
-        await loop.run_in_executor(pool, qreader.detect_and_decode, img),  # type: ignore
-    )
+    busy += 1
+    try:
+        with metrics.DECODE_LATENCY.labels("qreader").time(), tracing.span("qreader"):
+            return cast(
+                tuple[str | None],  # noqa: WPS465
+                await loop.run_in_executor(pool, qreader.detect_and_decode, img),  # type: ignore
+            )
+    finally:
+        busy -= 1
 
 
 def free_pool() -> None:
-    pool.shutdown()
+    pool.shutdown(cancel_futures=True)
     atexit.unregister(free_pool)
 
 
 atexit.register(free_pool)
+metrics.track_pool("qr_decode", lambda: busy, lambda: POOL_SIZE)
@@ -0,0 +1,31 @@
+from typing import TYPE_CHECKING, Any, cast
+
+from dependency_injector.wiring import Provide, inject
+
+if TYPE_CHECKING:
+    from aiogram.methods import TelegramMethod
+    from dependency_injector.providers import Configuration
+
+
+@inject
+async def reply(
+    method: "TelegramMethod[Any]",
+    config: "Configuration" = Provide["config.webhook"],
+) -> "TelegramMethod[Any] | None":
+    """Send the final reply of a handler.
+
+    With inline replies enabled the method is handed back to the dispatcher,
+    which writes it into the webhook response if the handler finishes in time
+    and calls the Bot API otherwise. Handlers return the result of this call.
+
+    Args:
+        method: Bot API method bound to the bot, e.g. ``message.answer(...)``.
+        config: Webhook settings.
+
+    Returns:
+        The method to answer with inline, or None if it was sent already.
+    """
+    if cast(bool, config["inline_replies"]):
+        return method
+    await method
+    return None
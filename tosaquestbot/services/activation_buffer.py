@@ -0,0 +1,223 @@
+import asyncio
+import time
+import uuid
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from sqlalchemy.dialects.postgresql import insert
+
+from tosaquestbot.db import models
+from tosaquestbot.errors import TokenAlreadyActivatedError
+from tosaquestbot.metrics import ACTIVATION_COMMITS, ACTIVATION_FLUSH_LATENCY
+from tosaquestbot.services.activation_index import EVENT_TOPIC, activation_event
+from tosaquestbot.services.stats import apply_activation_deltas
+
+if TYPE_CHECKING:
+    from tosaquestbot.cache import InvalidationBus
+    from tosaquestbot.db.database import Database
+
+logger = getLogger(__name__)
+
+ActivationKey = tuple[uuid.UUID, uuid.UUID]
+
+
+class ActivationWriteBuffer:
+    """Write-behind buffer that group-commits activation inserts.
+
+    Activations are collected for up to ``flush_interval`` seconds or
+    ``max_batch`` rows and written with a single multi-row
+    ``INSERT ... ON CONFLICT DO NOTHING``. Every waiter gets its own
+    result: the inserted activation or ``TokenAlreadyActivatedError``.
+    """
+
+    def __init__(  # noqa: WPS211
+        self: "ActivationWriteBuffer",
+        db: "Database",
+        enabled: bool = False,
+        flush_interval_ms: int = 10,
+        max_batch: int = 100,
+        bus: "InvalidationBus | None" = None,
+    ):
+        """Initiate buffer.
+
+        Args:
+            db: Database.
+            enabled: Whether activations go through the buffer.
+            flush_interval_ms: Maximum time a row waits for a flush.
+            max_batch: Number of rows that triggers an immediate flush.
+            bus: Invalidation bus, inserted activations are announced on it.
+        """
+        self.db = db
+        self.bus = bus
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+
+        self.commits = 0
+        self.flushed_rows = 0
+        self.last_flush_latency = 0.0  # noqa: WPS358
+        self.total_flush_latency = 0.0  # noqa: WPS358
+
+        self._pending: list[
+            tuple[ActivationKey, asyncio.Future[models.Activation]]
+        ] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closed = False
+
+    @property
+    def pending(self: "ActivationWriteBuffer") -> int:
+        """Number of activations waiting for a flush."""
+        return len(self._pending)
+
+    async def submit(
+        self: "ActivationWriteBuffer",
+        user_id: uuid.UUID,
+        token_id: uuid.UUID,
+    ) -> models.Activation:
+        """Queue activation and wait for its flush.
+
+        Args:
+            user_id: User id.
+            token_id: Token id.
+
+        Returns:
+            Activation.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[models.Activation] = loop.create_future()
+        self._pending.append(((user_id, token_id), future))
+
+        if self._closed or len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif not self._flush_handle:
+            self._flush_handle = loop.call_later(
+                self.flush_interval,
+                self._schedule_flush,
+            )
+
+        return await future
+
+    async def flush(self: "ActivationWriteBuffer") -> None:
+        """Write all pending activations."""
+        async with self._flush_lock:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            batch, self._pending = self._pending, []
+            if batch:
+                await self._write(batch)
+
+    async def close(self: "ActivationWriteBuffer") -> None:
+        """Flush pending activations and switch to immediate writes."""
+        self._closed = True
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.commits:
+            logger.info(
+                "Activation buffer closed after %d commits of %d rows, "
+                "%.1f ms average flush",
+                self.commits,
+                self.flushed_rows,
+                self.total_flush_latency / self.commits * 1000,
+            )
+
+    def _schedule_flush(self: "ActivationWriteBuffer") -> None:
+        # a full batch flushes before the timer fires, which must not flush
+        # the next batch early
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(
+        self: "ActivationWriteBuffer",
+        batch: list[tuple[ActivationKey, asyncio.Future[models.Activation]]],
+    ) -> None:
+        waiters: dict[ActivationKey, list[asyncio.Future[models.Activation]]] = {}
+        for key, future in batch:
+            waiters.setdefault(key, []).append(future)
+
+        started = time.perf_counter()
+        try:
+            async with self.db.session() as session:
+                rows = (
+                    await session.execute(
+                        insert(models.Activation)
+                        .values(
+                            [
+                                {
+                                    "id": uuid.uuid4(),
+                                    "user_id": user_id,
+                                    "token_id": token_id,
+                                }
+                                for user_id, token_id in waiters
+                            ],
+                        )
+                        .on_conflict_do_nothing(index_elements=["user_id", "token_id"])
+                        .returning(
+                            models.Activation.id,
+                            models.Activation.user_id,
+                            models.Activation.token_id,
+                            models.Activation.time,
+                        ),
+                    )
+                ).all()
+                await apply_activation_deltas(
+                    session,
+                    [(row.token_id, row.time, 1) for row in rows],
+                )
+                if self.bus:
+                    await self.bus.publish_many(
+                        session,
+                        EVENT_TOPIC,
+                        [
+                            activation_event("+", row.user_id, row.token_id)
+                            for row in rows
+                        ],
+                        local=False,
+                    )
+                await session.commit()
+        except Exception as exc:
+            logger.exception("Failed to flush %d activations", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        latency = time.perf_counter() - started
+        ACTIVATION_COMMITS.inc()
+        ACTIVATION_FLUSH_LATENCY.observe(latency)
+        self.commits += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_latency = latency
+        self.total_flush_latency += latency
+        logger.debug(
+            "Flushed %d activations, %d inserted, in %.1f ms",
+            len(batch),
+            len(rows),
+            latency * 1000,
+        )
+
+        for row in rows:
+            alive = [
+                future
+                for future in waiters[(row.user_id, row.token_id)]
+                if not future.done()
+            ]
+            if alive:
+                alive[0].set_result(
+                    models.Activation(
+                        id=row.id,
+                        user_id=row.user_id,
+                        token_id=row.token_id,
+                        time=row.time,
+                    ),
+                )
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(TokenAlreadyActivatedError())
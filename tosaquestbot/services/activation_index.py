@@ -0,0 +1,334 @@
+import asyncio
+import contextlib
+import sys
+import uuid
+from array import array
+from logging import getLogger
+from typing import TYPE_CHECKING, Literal
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from tosaquestbot.db import models
+
+if TYPE_CHECKING:
+    from tosaquestbot.cache import InvalidationBus
+    from tosaquestbot.db.database import Database
+
+logger = getLogger(__name__)
+
+EVENT_TOPIC = "activations"
+LOAD_BATCH = 10000
+
+# size of a uuid stored as an int key and of a dense number stored as a value
+_KEY_SIZE = sys.getsizeof(uuid.UUID(int=(1 << 128) - 1).int)
+_NUMBER_SIZE = sys.getsizeof(1 << 16)
+
+EventAction = Literal["+", "-"]
+Change = tuple[EventAction, uuid.UUID, uuid.UUID]
+
+
+def activation_event(
+    action: EventAction,
+    user_id: uuid.UUID,
+    token_id: uuid.UUID,
+) -> str:
+    """Format activation change event.
+
+    Args:
+        action: ``+`` for a grant, ``-`` for a revocation.
+        user_id: User id.
+        token_id: Token id.
+
+    Returns:
+        Event key for the ``activations`` topic.
+    """
+    return f"{action}{user_id}:{token_id}"
+
+
+def _parse_event(event: str) -> Change:
+    user_id, token_id = event[1:].split(":")
+    action: EventAction = "+" if event[0] == "+" else "-"
+    return action, uuid.UUID(user_id), uuid.UUID(token_id)
+
+
+class _Bitsets:
+    """Users and tokens numbered densely with one token bitset per user."""
+
+    def __init__(self: "_Bitsets"):
+        self.users: dict[int, int] = {}
+        self.tokens: dict[int, int] = {}
+        self.bits: list[int] = []
+        self.counts = array("I")
+        self.bits_size = 0
+
+    def memory_usage(self: "_Bitsets") -> int:
+        entries = len(self.users) + len(self.tokens)
+        return sum(
+            (
+                sys.getsizeof(self.users),
+                sys.getsizeof(self.tokens),
+                entries * (_KEY_SIZE + _NUMBER_SIZE),
+                sys.getsizeof(self.bits),
+                self.bits_size,
+                sys.getsizeof(self.counts),
+            ),
+        )
+
+    def has(self: "_Bitsets", user_id: uuid.UUID, token_id: uuid.UUID) -> bool:
+        user = self.users.get(user_id.int)
+        token = self.tokens.get(token_id.int)
+        if user is None or token is None:
+            return False
+        return bool(self.bits[user] >> token & 1)
+
+    def count(self: "_Bitsets", user_id: uuid.UUID) -> int:
+        user = self.users.get(user_id.int)
+        return 0 if user is None else self.counts[user]
+
+    def add(self: "_Bitsets", user_id: uuid.UUID, token_id: uuid.UUID) -> None:
+        user = self.users.get(user_id.int)
+        if user is None:
+            user = self.users[user_id.int] = len(self.bits)
+            self.bits.append(0)
+            self.counts.append(0)
+            self.bits_size += sys.getsizeof(0)
+        token = self.tokens.setdefault(token_id.int, len(self.tokens))
+
+        bits = self.bits[user]
+        if bits >> token & 1:
+            return
+        self._replace(user, bits | 1 << token)
+        self.counts[user] += 1
+
+    def discard(self: "_Bitsets", user_id: uuid.UUID, token_id: uuid.UUID) -> None:
+        user = self.users.get(user_id.int)
+        token = self.tokens.get(token_id.int)
+        if user is None or token is None:
+            return
+
+        bits = self.bits[user]
+        if not bits >> token & 1:
+            return
+        self._replace(user, bits & ~(1 << token))
+        self.counts[user] -= 1
+
+    def apply(self: "_Bitsets", change: Change) -> None:
+        action, user_id, token_id = change
+        if action == "+":
+            self.add(user_id, token_id)
+        else:
+            self.discard(user_id, token_id)
+
+    def _replace(self: "_Bitsets", user: int, bits: int) -> None:
+        self.bits_size += sys.getsizeof(bits) - sys.getsizeof(self.bits[user])
+        self.bits[user] = bits
+
+
+class ActivationIndex:
+    """In-memory index of the tokens every user has activated.
+
+    Users and tokens are numbered densely in order of appearance, and every
+    user gets a bitset of activated token numbers along with their count,
+    so both questions are answered without database I/O. The index is
+    loaded from the activations table on start and kept up to date with
+    ``activations`` events on the invalidation bus, applied by each
+    process after its own commits and on notification for the others.
+
+    With more than one worker the bus must be enabled, otherwise the index
+    refuses to start and is never ready. While the bus is down the index
+    is bypassed, and once it reconnects the index is reloaded, since
+    events may have been missed. The index is dropped for good if it
+    outgrows ``max_memory_mb``.
+    """
+
+    def __init__(
+        self: "ActivationIndex",
+        db: "Database",
+        bus: "InvalidationBus | None" = None,
+        enabled: bool = False,
+        max_memory_mb: float = 256,
+    ):
+        """Initiate index.
+
+        Args:
+            db: Database.
+            bus: Invalidation bus carrying changes made by other processes.
+            enabled: Whether to build and use the index at all.
+            max_memory_mb: Size above which the index is dropped.
+        """
+        self.db = db
+        self.bus = bus
+        self.enabled = enabled
+        self.max_memory = int(max_memory_mb * 1024 * 1024)
+        self.shared = False
+        self._bitsets: _Bitsets | None = None
+        self._replay: list[Change] | None = None
+        self._task: asyncio.Task[None] | None = None
+        if bus:
+            bus.subscribe(EVENT_TOPIC, self._on_events)
+
+    @property
+    def ready(self: "ActivationIndex") -> bool:
+        """Whether the index is loaded and up to date."""
+        if self._bitsets is None:
+            return False
+        if self.bus and self.bus.enabled:
+            return self.bus.connected
+        return not self.shared
+
+    def start(self: "ActivationIndex", shared: bool = False) -> None:
+        """Load the index in the background.
+
+        With the bus enabled loading waits for it to connect.
+
+        Args:
+            shared: Whether other workers grant activations too.
+        """
+        self.shared = shared
+        if not self.enabled:
+            return
+        if self.bus and self.bus.enabled:
+            return
+        if shared:
+            logger.warning(
+                "Activation index needs the invalidation bus with several "
+                "workers, disabling it",
+            )
+            self.enabled = False
+            return
+        self._schedule_load()
+
+    async def stop(self: "ActivationIndex") -> None:
+        """Stop loading."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def has(
+        self: "ActivationIndex", user_id: uuid.UUID, token_id: uuid.UUID
+    ) -> bool | None:
+        """Check whether a user has activated a token.
+
+        Args:
+            user_id: User id.
+            token_id: Token id.
+
+        Returns:
+            Whether the token is activated, or None if the index is not ready.
+        """
+        if not self.ready or self._bitsets is None:
+            return None
+        return self._bitsets.has(user_id, token_id)
+
+    def count(self: "ActivationIndex", user_id: uuid.UUID) -> int | None:
+        """Count tokens a user has activated.
+
+        Args:
+            user_id: User id.
+
+        Returns:
+            Number of activations, or None if the index is not ready.
+        """
+        if not self.ready or self._bitsets is None:
+            return None
+        return self._bitsets.count(user_id)
+
+    def add(self: "ActivationIndex", user_id: uuid.UUID, token_id: uuid.UUID) -> None:
+        """Record a committed activation.
+
+        Args:
+            user_id: User id.
+            token_id: Token id.
+        """
+        self._apply([("+", user_id, token_id)])
+
+    def discard(
+        self: "ActivationIndex",
+        user_id: uuid.UUID,
+        token_id: uuid.UUID,
+    ) -> None:
+        """Record a committed revocation.
+
+        Args:
+            user_id: User id.
+            token_id: Token id.
+        """
+        self._apply([("-", user_id, token_id)])
+
+    def memory_usage(self: "ActivationIndex") -> int:
+        """Estimate index size.
+
+        Returns:
+            Size in bytes.
+        """
+        return self._bitsets.memory_usage() if self._bitsets else 0
+
+    async def _load(self: "ActivationIndex") -> None:
+        replay: list[Change] = []
+        self._replay = replay
+        bitsets = _Bitsets()
+        activation = models.Activation
+        try:
+            async with self.db.session() as session:
+                rows = await session.stream(
+                    select(activation.user_id, activation.token_id),
+                )
+                async for partition in rows.partitions(LOAD_BATCH):
+                    for user_id, token_id in partition:
+                        bitsets.add(user_id, token_id)
+                    if bitsets.memory_usage() > self.max_memory:
+                        self._drop(bitsets)
+                        return
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("Failed to load activation index: %s", exc)
+            return
+        finally:
+            # a newer load may have started after this one was cancelled
+            if self._replay is replay:
+                self._replay = None
+
+        # changes committed while loading, some of them already in the rows
+        for change in replay:
+            bitsets.apply(change)
+        self._bitsets = bitsets
+        logger.info(
+            "Loaded activation index of %d users and %d tokens, %d bytes",
+            len(bitsets.users),
+            len(bitsets.tokens),
+            bitsets.memory_usage(),
+        )
+
+    def _schedule_load(self: "ActivationIndex") -> None:
+        if self._task:
+            self._task.cancel()
+        self._bitsets = None
+        self._task = asyncio.create_task(self._load(), name="activation-index")
+
+    def _on_events(self: "ActivationIndex", keys: list[str] | None) -> None:
+        if keys is None:
+            if self.enabled:
+                self._schedule_load()
+            return
+        self._apply([_parse_event(key) for key in keys])
+
+    def _apply(self: "ActivationIndex", changes: list[Change]) -> None:
+        if self._replay is not None:
+            self._replay.extend(changes)
+        if self._bitsets is None:
+            return
+        for change in changes:
+            self._bitsets.apply(change)
+        if self._bitsets.memory_usage() > self.max_memory:
+            self._drop(self._bitsets)
+
+    def _drop(self: "ActivationIndex", bitsets: _Bitsets) -> None:
+        logger.warning(
+            "Activation index of %d users and %d tokens outgrew %d bytes, dropping it",
+            len(bitsets.users),
+            len(bitsets.tokens),
+            self.max_memory,
+        )
+        self.enabled = False
+        self._bitsets = None
@@ -0,0 +1,377 @@
+import uuid
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Literal, Sequence, cast
+
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    bindparam,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from tosaquestbot.db import models
+from tosaquestbot.metrics import instrument_service
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import CursorResult
+    from sqlalchemy.sql import Select
+
+    from tosaquestbot.db.database import Database
+
+logger = getLogger(__name__)
+
+Audience = Literal["all", "top", "token"]
+
+ACTIVE_STATUSES = ("pending", "running")
+
+_recover_stmt = text(
+    "WITH interrupted AS ("
+    "UPDATE broadcast_recipients SET status = 'unknown' "
+    "WHERE status = 'sending' AND (claimed_at IS NULL "
+    "OR claimed_at < now() - make_interval(secs => :claim_timeout)) "
+    "RETURNING job_id"
+    ") "
+    "UPDATE broadcast_jobs j SET failed = j.failed + c.interrupted "
+    "FROM (SELECT job_id, count(*) AS interrupted FROM interrupted GROUP BY job_id) c "
+    "WHERE j.id = c.job_id "
+    "RETURNING c.interrupted",
+).bindparams(bindparam("claim_timeout", type_=Float))
+
+_checkpoint_stmt = text(
+    "UPDATE broadcast_recipients r SET status = v.status "
+    "FROM unnest(:positions, :statuses) AS v(position, status) "
+    "WHERE r.job_id = :job_id AND r.position = v.position "
+    "AND r.status = 'sending' "
+    "RETURNING r.status",
+).bindparams(
+    bindparam("positions", type_=ARRAY(Integer)),
+    bindparam("statuses", type_=ARRAY(String)),
+)
+
+
+def _audience_query(
+    audience: Audience,
+    argument: str | None,
+) -> "Select[tuple[int | None]]":
+    match audience:
+        case "top":
+            top = (
+                select(models.Activation.user_id, func.count().label("activations"))
+                .group_by(models.Activation.user_id)
+                .order_by(func.count().desc())
+                .limit(int(argument or 0))
+                .subquery()
+            )
+            return select(models.User.telegram_id).join(
+                top,
+                top.c.user_id == models.User.id,
+            )
+        case "token":
+            return (
+                select(models.User.telegram_id)
+                .join(models.Activation, models.Activation.user_id == models.User.id)
+                .where(models.Activation.token_id == argument)
+            )
+    return select(models.User.telegram_id)
+
+
+@instrument_service
+class BroadcastService:
+    """Persistent broadcast job service."""
+
+    def __init__(self: "BroadcastService", db: "Database", claim_timeout: float = 600):
+        """Initiate service.
+
+        Args:
+            db: Database.
+            claim_timeout: Seconds after which a claimed batch that was never
+                checkpointed is considered abandoned.
+        """
+        self.db = db
+        self.claim_timeout = claim_timeout
+
+    async def create_job(
+        self: "BroadcastService",
+        message_text: str,
+        audience: Audience,
+        argument: str | None = None,
+    ) -> models.BroadcastJob:
+        """Create broadcast job and materialize its recipients.
+
+        Recipients are selected and stored with a single
+        ``INSERT ... SELECT``, numbered in telegram id order.
+
+        Args:
+            message_text: Message text.
+            audience: ``all`` users, ``top`` N users or users who activated a ``token``.
+            argument: N for ``top``, token id for ``token``.
+
+        Returns:
+            Broadcast job.
+        """
+        audience_label = f"{audience} {argument}" if argument else audience
+        async with self.db.session() as session:
+            job = models.BroadcastJob(
+                id=uuid.uuid4(),  # type: ignore
+                text=message_text,
+                audience=audience_label,
+                status="pending",
+            )
+            session.add(job)
+            await session.flush()
+
+            recipients = _audience_query(audience, argument).distinct().subquery()
+            insert_result = cast(
+                "CursorResult[Any]",
+                await session.execute(
+                    insert(models.BroadcastRecipient).from_select(
+                        ["job_id", "position", "telegram_id", "status"],
+                        select(
+                            literal(job.id),
+                            func.row_number().over(order_by=recipients.c.telegram_id),
+                            recipients.c.telegram_id,
+                            literal("pending"),
+                        ),
+                    ),
+                ),
+            )
+            total = insert_result.rowcount
+            job.total = total  # type: ignore
+            await session.commit()
+        logger.info("Created broadcast job %s for %d users", job.id, total)
+        return job
+
+    async def get_jobs(
+        self: "BroadcastService",
+        limit: int,
+    ) -> list[models.BroadcastJob]:
+        """Get most recent jobs.
+
+        Args:
+            limit: Number of jobs.
+
+        Returns:
+            List of jobs, newest first.
+        """
+        async with self.db.session() as session:
+            stmt = (
+                select(models.BroadcastJob)
+                .order_by(models.BroadcastJob.created_at.desc())
+                .limit(limit)
+            )
+            return list((await session.execute(stmt)).scalars().all())
+
+    async def get_next_job(self: "BroadcastService") -> models.BroadcastJob | None:
+        """Get the oldest unfinished job and mark it running.
+
+        Returns:
+            Job or None.
+        """
+        async with self.db.session() as session:
+            job = (
+                await session.execute(
+                    select(models.BroadcastJob)
+                    .where(models.BroadcastJob.status.in_(ACTIVE_STATUSES))
+                    .order_by(models.BroadcastJob.created_at)
+                    .limit(1),
+                )
+            ).scalar_one_or_none()
+            if job and job.status == "pending":
+                job.status = "running"  # type: ignore
+                job.started_at = func.now()
+                await session.commit()
+                await session.refresh(job)
+            return job
+
+    async def recover(self: "BroadcastService") -> int:
+        """Give up on deliveries interrupted by a restart.
+
+        Recipients claimed more than ``claim_timeout`` seconds ago by a
+        batch that never checkpointed may or may not have received the
+        message; they are marked ``unknown`` and never retried, so nobody
+        gets the message twice. Younger claims may belong to a worker
+        that is still sending and are left alone.
+
+        Returns:
+            Number of recipients marked unknown.
+        """
+        async with self.db.session() as session:
+            recovered = await session.execute(
+                _recover_stmt,
+                {"claim_timeout": self.claim_timeout},
+            )
+            interrupted = int(sum(recovered.scalars().all()))
+            await session.commit()
+        if interrupted:
+            logger.warning("Marked %d interrupted deliveries as unknown", interrupted)
+        return interrupted
+
+    async def claim_batch(
+        self: "BroadcastService",
+        job: models.BroadcastJob,
+        size: int,
+    ) -> list[tuple[int, int]]:
+        """Claim next pending recipients of a job.
+
+        Args:
+            job: Broadcast job.
+            size: Batch size.
+
+        Returns:
+            Pairs of recipient position and telegram id.
+        """
+        recipient = models.BroadcastRecipient
+        pending = (
+            select(recipient.position)
+            .where(
+                recipient.job_id == job.id,
+                recipient.position > job.cursor,
+                recipient.status == "pending",
+            )
+            .order_by(recipient.position)
+            .limit(size)
+            .with_for_update(skip_locked=True)
+            # in a subquery the limit would be applied anew on every rescan
+            .cte("batch")
+            .prefix_with("MATERIALIZED")
+        )
+        async with self.db.session() as session:
+            rows = (
+                await session.execute(
+                    update(recipient)
+                    .where(
+                        recipient.job_id == job.id,
+                        recipient.position == pending.c.position,
+                    )
+                    .values(status="sending", claimed_at=func.now())
+                    .returning(recipient.position, recipient.telegram_id),
+                )
+            ).all()
+            await session.commit()
+        return sorted((int(row.position), int(row.telegram_id)) for row in rows)
+
+    async def checkpoint(
+        self: "BroadcastService",
+        job: models.BroadcastJob,
+        results: Sequence[tuple[int, str]],
+    ) -> models.BroadcastJob:
+        """Store delivery results of a batch and advance the job cursor.
+
+        Only recipients still claimed are updated and counted, so a batch
+        that outlived its claim does not count recipients twice.
+
+        Args:
+            job: Broadcast job.
+            results: Pairs of recipient position and delivery status.
+
+        Returns:
+            Updated job.
+        """
+        async with self.db.session() as session:
+            statuses = list(
+                (
+                    await session.execute(
+                        _checkpoint_stmt,
+                        {
+                            "job_id": job.id,
+                            "positions": [position for position, _ in results],
+                            "statuses": [status for _, status in results],
+                        },
+                    )
+                )
+                .scalars()
+                .all(),
+            )
+            if len(statuses) < len(results):
+                logger.warning(
+                    "Claim on %d recipients of broadcast job %s expired before "
+                    "the checkpoint",
+                    len(results) - len(statuses),
+                    job.id,
+                )
+            job_table = models.BroadcastJob
+            updated = (
+                await session.execute(
+                    update(job_table)
+                    .where(job_table.id == job.id)
+                    .values(
+                        sent=job_table.sent + statuses.count("sent"),
+                        blocked=job_table.blocked + statuses.count("blocked"),
+                        failed=job_table.failed + statuses.count("failed"),
+                        cursor=func.greatest(
+                            job_table.cursor,
+                            max(position for position, _ in results),
+                        ),
+                    )
+                    .returning(job_table),
+                )
+            ).scalar_one()
+            await session.commit()
+            return updated
+
+    async def finish_job(self: "BroadcastService", job: models.BroadcastJob) -> None:
+        """Mark job as done.
+
+        Args:
+            job: Broadcast job.
+        """
+        async with self.db.session() as session:
+            await session.execute(
+                update(models.BroadcastJob)
+                .where(
+                    models.BroadcastJob.id == job.id,
+                    models.BroadcastJob.status == "running",
+                )
+                .values(status="done", finished_at=func.now()),
+            )
+            await session.commit()
+        logger.info("Broadcast job %s finished", job.id)
+
+    async def cancel_job(self: "BroadcastService", job_id: str) -> bool:
+        """Cancel unfinished job.
+
+        Args:
+            job_id: Job id.
+
+        Returns:
+            Whether the job was cancelled.
+        """
+        async with self.db.session() as session:
+            cancelled = (
+                await session.execute(
+                    update(models.BroadcastJob)
+                    .where(
+                        models.BroadcastJob.id == job_id,
+                        models.BroadcastJob.status.in_(ACTIVE_STATUSES),
+                    )
+                    .values(status="cancelled", finished_at=func.now())
+                    .returning(models.BroadcastJob.id),
+                )
+            ).all()
+            await session.commit()
+        return bool(cancelled)
+
+    async def get_job_status(self: "BroadcastService", job_id: uuid.UUID) -> str | None:
+        """Get job status.
+
+        Args:
+            job_id: Job id.
+
+        Returns:
+            Status or None.
+        """
+        async with self.db.session() as session:
+            return (
+                await session.execute(
+                    select(models.BroadcastJob.status).where(
+                        models.BroadcastJob.id == job_id,
+                    ),
+                )
+            ).scalar_one_or_none()
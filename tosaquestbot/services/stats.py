@@ -0,0 +1,223 @@
+import asyncio
+import datetime
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+from sqlalchemy import DateTime, Integer, bindparam, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from tosaquestbot.db import models
+from tosaquestbot.metrics import instrument_service
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.sql.elements import ColumnClause
+
+    from tosaquestbot.db.database import Database
+
+PERIODS = ("hour", "day")
+
+# token id, activation time (None for the transaction time) and count delta
+ActivationDelta = tuple[uuid.UUID, datetime.datetime | None, int]
+
+# rows are locked in key order, so concurrent writers cannot deadlock
+_apply_deltas_stmt = text(
+    "INSERT INTO activation_stats_hourly (hour, token_id, count) "
+    "SELECT date_trunc('hour', coalesce(d.time, now())), d.token_id, sum(d.delta) "
+    "FROM unnest(:token_ids, :times, :deltas) AS d(token_id, time, delta) "
+    "GROUP BY 1, 2 "
+    "ORDER BY 1, 2 "
+    "ON CONFLICT (hour, token_id) DO UPDATE "
+    "SET count = activation_stats_hourly.count + EXCLUDED.count",
+).bindparams(
+    bindparam("token_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("times", type_=ARRAY(DateTime(timezone=True))),
+    bindparam("deltas", type_=ARRAY(Integer)),
+)
+
+
+async def apply_activation_deltas(
+    session: "AsyncSession",
+    deltas: Sequence[ActivationDelta],
+) -> None:
+    """Update hourly activation rollup in the session transaction.
+
+    Args:
+        session: Database session that inserts or deletes the activations.
+        deltas: Count changes.
+    """
+    if not deltas:
+        return
+    token_ids, times, counts = zip(*deltas)
+    await session.execute(
+        _apply_deltas_stmt,
+        {"token_ids": list(token_ids), "times": list(times), "deltas": list(counts)},
+    )
+
+
+@dataclass
+class TokenStat:
+    """Activation summary of a token."""
+
+    id: uuid.UUID
+    name: str
+    valid: bool
+    activations: int
+    first_activation: datetime.datetime | None
+    last_activation: datetime.datetime | None
+
+
+@dataclass
+class TokenStatsReport:
+    """Activation summary of every token."""
+
+    tokens: list[TokenStat]
+    generated_at: datetime.datetime
+
+    @property
+    def never_activated(self: "TokenStatsReport") -> int:
+        """Number of tokens nobody has activated."""
+        return sum(1 for token in self.tokens if not token.activations)
+
+
+@instrument_service
+class StatsService:
+    """Activation statistics service.
+
+    Reads the ``activation_stats_hourly`` rollup only, never the
+    activations table, except for a full rebuild and the cached
+    per-token report, which needs exact activation times.
+    """
+
+    def __init__(self: "StatsService", db: "Database", token_stats_ttl: float = 60):
+        """Initiate service.
+
+        Args:
+            db: Database.
+            token_stats_ttl: Seconds the per-token report is reused for.
+        """
+        self.db = db
+        self.token_stats_ttl = token_stats_ttl
+        self._token_stats: tuple[float, TokenStatsReport] | None = None
+        self._token_stats_lock = asyncio.Lock()
+
+    async def get_activations_by_period(
+        self: "StatsService",
+        period: str,
+        count: int,
+    ) -> list[tuple[datetime.datetime, int]]:
+        """Get activation counts per period.
+
+        Args:
+            period: ``hour`` or ``day``.
+            count: Number of most recent periods.
+
+        Returns:
+            Pairs of period start and activation count, oldest first.
+
+        Raises:
+            ValueError: If period is unknown.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+
+        stat = models.ActivationHourlyStat
+        precision: ColumnClause[str] = literal_column(f"'{period}'")
+        bucket = func.date_trunc(precision, stat.hour).label("bucket")
+        since = func.date_trunc(precision, func.now()) - datetime.timedelta(
+            **{f"{period}s": count - 1},
+        )
+        stmt = (
+            select(bucket, func.sum(stat.count))
+            .where(stat.hour >= since)
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        async with self.db.session() as session:
+            return [
+                (row_bucket, int(total))
+                for row_bucket, total in (await session.execute(stmt)).all()
+            ]
+
+    async def get_activations_by_token(
+        self: "StatsService",
+    ) -> list[tuple[str, int]]:
+        """Get activation counts per token.
+
+        Returns:
+            Pairs of token name and activation count, most activated first.
+        """
+        stat = models.ActivationHourlyStat
+        total = func.sum(stat.count).label("total")
+        stmt = (
+            select(models.Token.name, total)
+            .select_from(stat)
+            .join(models.Token, models.Token.id == stat.token_id)
+            .group_by(models.Token.id, models.Token.name)
+            .order_by(total.desc(), models.Token.name)
+        )
+        async with self.db.session() as session:
+            return [
+                (str(name), int(token_total))
+                for name, token_total in (await session.execute(stmt)).all()
+            ]
+
+    async def get_token_stats(self: "StatsService") -> TokenStatsReport:
+        """Get activation count and first and last activation time per token.
+
+        Computed by a single grouped query and reused for ``token_stats_ttl``
+        seconds; concurrent callers share one query.
+
+        Returns:
+            Report with tokens most activated first, never activated ones last.
+        """
+        async with self._token_stats_lock:
+            if self._token_stats:
+                computed, report = self._token_stats
+                if time.monotonic() - computed < self.token_stats_ttl:
+                    return report
+
+            token = models.Token
+            activation = models.Activation
+            activations = func.count(activation.token_id).label("activations")
+            stmt = (
+                select(
+                    token.id,
+                    token.name,
+                    token.valid,
+                    activations,
+                    func.min(activation.time),
+                    func.max(activation.time),
+                )
+                .outerjoin(activation, activation.token_id == token.id)
+                .group_by(token.id, token.name, token.valid)
+                .order_by(activations.desc(), token.name)
+            )
+            async with self.db.session() as session:
+                rows = (await session.execute(stmt)).all()
+
+            report = TokenStatsReport(
+                tokens=[TokenStat(*row) for row in rows],
+                generated_at=datetime.datetime.now(datetime.timezone.utc),
+            )
+            self._token_stats = (time.monotonic(), report)
+            return report
+
+    async def rebuild(self: "StatsService") -> None:
+        """Rebuild the rollup from the activations table.
+
+        Activations are locked against writes for the duration of the rebuild.
+        """
+        async with self.db.session() as session:
+            await session.execute(text("LOCK TABLE activations IN SHARE MODE"))
+            await session.execute(text("DELETE FROM activation_stats_hourly"))
+            await session.execute(
+                text(
+                    "INSERT INTO activation_stats_hourly (hour, token_id, count) "
+                    "SELECT date_trunc('hour', time), token_id, count(*) "
+                    "FROM activations GROUP BY 1, 2",
+                ),
+            )
+            await session.commit()
@@ -1,28 +1,110 @@
+import uuid
+from dataclasses import dataclass, field
 from logging import getLogger
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, cast
 
-from sqlalchemy import select
+from sqlalchemy import func, select, text
 from sqlalchemy.exc import IntegrityError
 
+from tosaquestbot.cache import Cache
 from tosaquestbot.db import models
 from tosaquestbot.errors import TokenAlreadyActivatedError, TokenAlreadyExistsError
+from tosaquestbot.metrics import ACTIVATIONS, instrument_service
+from tosaquestbot.services.activation_index import EVENT_TOPIC, activation_event
+from tosaquestbot.services.stats import apply_activation_deltas
 
 if TYPE_CHECKING:
+    from tosaquestbot.cache import InvalidationBus
     from tosaquestbot.db.database import Database
+    from tosaquestbot.services.activation_buffer import ActivationWriteBuffer
+    from tosaquestbot.services.activation_index import ActivationIndex
 
 logger = getLogger(__name__)
 
+CACHE_TOPIC = "tokens"
 
+
+def make_token_names(prefix: str, count: int) -> list[str]:
+    """Generate sequential token names.
+
+    Args:
+        prefix: Name prefix.
+        count: Number of names.
+
+    Returns:
+        List of names like ``prefix001``.
+    """
+    width = max(3, len(str(count)))
+    return [f"{prefix}{number:0{width}d}" for number in range(1, count + 1)]
+
+
+@dataclass
+class MintResult:
+    """Result of bulk token minting."""
+
+    created: list[models.Token] = field(default_factory=list)
+    duplicates: list[str] = field(default_factory=list)
+
+
+@dataclass
+class TokenSummary:
+    """Token with its activation count."""
+
+    id: uuid.UUID
+    name: str
+    valid: bool
+    activations: int
+
+
+@dataclass
+class TokenPage:
+    """Page of tokens ordered by name."""
+
+    tokens: list[TokenSummary]
+    has_previous: bool
+    has_next: bool
+
+
+ActivationAction = Literal["grant", "revoke"]
+
+
+@dataclass
+class ActivationImportResult:
+    """Result of bulk activation import."""
+
+    applied: int = 0
+    skipped: int = 0
+    not_found: int = 0
+
+
+@instrument_service
 class TokenService:
     """Token service."""
 
-    def __init__(self: "TokenService", db: "Database"):
+    def __init__(  # noqa: WPS211
+        self: "TokenService",
+        db: "Database",
+        activation_buffer: "ActivationWriteBuffer | None" = None,
+        bus: "InvalidationBus | None" = None,
+        cache_size: int = 10000,
+        activation_index: "ActivationIndex | None" = None,
+    ):
         """Initiate service.
 
         Args:
             db: Database.
+            activation_buffer: Write-behind buffer for activations.
+            bus: Invalidation bus, tokens are cached by id when given.
+            cache_size: Maximum number of cached tokens.
+            activation_index: In-memory index of activations.
         """
         self.db = db
+        self.activation_buffer = activation_buffer
+        self.activation_index = activation_index
+        self.bus = bus
+        self.cache: Cache[models.Token] | None = (
+            Cache(bus, CACHE_TOPIC, cache_size) if bus else None
+        )
 
     async def create_token(self: "TokenService", name: str) -> models.Token:
         """Create token.
@@ -46,6 +128,76 @@ class TokenService:
         logger.info("Created token %s", token.id)
         return token
 
+    async def mint_tokens(self: "TokenService", names: list[str]) -> MintResult:
+        """Create tokens in bulk.
+
+        Names that already exist, or repeat within ``names``, are reported
+        as duplicates and skipped. The rest are loaded into a temporary
+        table with a single COPY and inserted from there, skipping names
+        that a concurrent mint took in the meantime.
+
+        Args:
+            names: Token names.
+
+        Returns:
+            Created tokens and duplicate names.
+        """
+        mint_result = MintResult()
+        candidates: list[models.Token] = []
+        seen: set[str] = set()
+        for name in names:
+            if name in seen:
+                mint_result.duplicates.append(name)
+                continue
+            seen.add(name)
+            candidates.append(
+                models.Token(
+                    id=uuid.uuid4(),  # type: ignore
+                    name=name,
+                    valid=True,
+                ),
+            )
+
+        async with self.db.session() as session:
+            await session.execute(
+                text(
+                    "CREATE TEMP TABLE token_mint (id uuid, name text, valid boolean) "
+                    "ON COMMIT DROP",
+                ),
+            )
+            await self.db.copy_records(
+                session,
+                "token_mint",
+                ("id", "name", "valid"),
+                [(token.id, token.name, token.valid) for token in candidates],
+            )
+            inserted = set(
+                (
+                    await session.execute(
+                        text(
+                            "INSERT INTO tokens (id, name, valid) "
+                            "SELECT id, name, valid FROM token_mint "
+                            "ON CONFLICT (name) DO NOTHING "
+                            "RETURNING name",
+                        ),
+                    )
+                ).scalars(),
+            )
+            await session.commit()
+
+        for token in candidates:
+            if token.name in inserted:
+                mint_result.created.append(token)
+            else:
+                mint_result.duplicates.append(str(token.name))
+
+        logger.info(
+            "Minted %d tokens, %d duplicates",
+            len(mint_result.created),
+            len(mint_result.duplicates),
+        )
+        return mint_result
+
     async def delete_token(self: "TokenService", token_id: str) -> None:
         """Delete token.
 
@@ -61,6 +213,8 @@ class TokenService:
             if not token:
                 return
             await session.delete(token)
+            if self.bus:
+                await self.bus.publish(session, CACHE_TOPIC, str(token.id))
             await session.commit()
 
     async def update_token(self: "TokenService", token: models.Token) -> models.Token:
@@ -74,6 +228,8 @@ class TokenService:
         """
         async with self.db.session() as session:
             session.add(token)
+            if self.bus:
+                await self.bus.publish(session, CACHE_TOPIC, str(token.id))
             await session.commit()
             return token
 
@@ -94,15 +250,36 @@ class TokenService:
         Raises:
             TokenAlreadyActivatedError: If token already activated.
         """
-        async with self.db.session() as session:
-            activation = models.Activation(user_id=user.id, token_id=token.id)
-            session.add(activation)
-            try:
+        user_id = cast(uuid.UUID, user.id)
+        token_id = cast(uuid.UUID, token.id)
+        if self.activation_index and self.activation_index.has(user_id, token_id):
+            raise TokenAlreadyActivatedError
+
+        if self.activation_buffer and self.activation_buffer.enabled:
+            activation = await self.activation_buffer.submit(user_id, token_id)
+        else:
+            async with self.db.session() as session:
+                activation = models.Activation(user_id=user.id, token_id=token.id)
+                session.add(activation)
+                try:
+                    await session.flush()
+                except IntegrityError:  # noqa: WPS329
+                    raise TokenAlreadyActivatedError from None
+                await apply_activation_deltas(session, [(token_id, None, 1)])
+                if self.bus:
+                    await self.bus.publish(
+                        session,
+                        EVENT_TOPIC,
+                        activation_event("+", user_id, token_id),
+                        local=False,
+                    )
                 await session.commit()
-            except IntegrityError:  # noqa: WPS329
-                raise TokenAlreadyActivatedError from None
-            await session.refresh(activation)
+                await session.refresh(activation)
+
+        if self.activation_index:
+            self.activation_index.add(user_id, token_id)
         logger.info("Activated token %s for user %s", token.id, user.id)
+        ACTIVATIONS.inc()
         return activation
 
     async def get_token(self: "TokenService", token_id: str) -> models.Token | None:
@@ -114,13 +291,27 @@ class TokenService:
         Returns:
             Token.
         """
+        try:
+            cache_key = str(uuid.UUID(token_id))
+        except ValueError:
+            cache_key = None
+        if self.cache and cache_key:
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached
+            generation = self.cache.generation
+
         async with self.db.session() as session:
-            return (
+            token = (
                 await session.execute(
                     select(models.Token).where(models.Token.id == token_id),
                 )
             ).scalar_one_or_none()
 
+        if self.cache and cache_key and token:
+            self.cache.put(cache_key, token, generation)
+        return token
+
     async def get_token_by_name(self: "TokenService", name: str) -> models.Token | None:
         """Get token by name.
 
@@ -137,6 +328,22 @@ class TokenService:
                 )
             ).scalar_one_or_none()
 
+    async def get_tokens_by_names(
+        self: "TokenService",
+        names: list[str],
+    ) -> list[models.Token]:
+        """Get tokens by names.
+
+        Args:
+            names: Token names.
+
+        Returns:
+            List of found tokens.
+        """
+        async with self.db.session() as session:
+            stmt = select(models.Token).where(models.Token.name.in_(names))
+            return list((await session.execute(stmt)).scalars().all())
+
     async def get_all_tokens(self: "TokenService") -> list[models.Token]:
         """Get all tokens.
 
@@ -147,6 +354,67 @@ class TokenService:
             tokens_seq = (await session.execute(select(models.Token))).scalars().all()
             return list(tokens_seq)
 
+    async def get_tokens_page(
+        self: "TokenService",
+        limit: int,
+        after: str | None = None,
+        before: str | None = None,
+        name_prefix: str | None = None,
+    ) -> TokenPage:
+        """Get a page of tokens ordered by name.
+
+        Pages are addressed by the token next to them rather than by offset,
+        so only the rows of the page are read. Activations of the page are
+        counted by the same grouped query.
+
+        Args:
+            limit: Page size.
+            after: Id of the last token of the previous page.
+            before: Id of the first token of the next page.
+            name_prefix: Only tokens with names starting with it.
+
+        Returns:
+            Token page.
+        """
+        token = models.Token
+        backwards = before is not None and after is None
+        page_stmt = select(token.id, token.name, token.valid)
+        if name_prefix:
+            page_stmt = page_stmt.where(
+                token.name.startswith(name_prefix, autoescape=True)
+            )
+        if after:
+            cursor = select(token.name).where(token.id == after).scalar_subquery()
+            page_stmt = page_stmt.where(token.name > cursor)
+        elif before:
+            cursor = select(token.name).where(token.id == before).scalar_subquery()
+            page_stmt = page_stmt.where(token.name < cursor)
+        page = (
+            page_stmt.order_by(token.name.desc() if backwards else token.name)
+            .limit(limit + 1)
+            .subquery()
+        )
+        stmt = (
+            select(
+                page.c.id,
+                page.c.name,
+                page.c.valid,
+                func.count(models.Activation.token_id),
+            )
+            .outerjoin(models.Activation, models.Activation.token_id == page.c.id)
+            .group_by(page.c.id, page.c.name, page.c.valid)
+            .order_by(page.c.name.desc() if backwards else page.c.name)
+        )
+        async with self.db.session() as session:
+            rows = (await session.execute(stmt)).all()
+
+        tokens = [TokenSummary(*row) for row in rows[:limit]]
+        has_more = len(rows) > limit
+        if backwards:
+            tokens.reverse()
+            return TokenPage(tokens, has_previous=has_more, has_next=True)
+        return TokenPage(tokens, has_previous=after is not None, has_next=has_more)
+
     async def get_activations_by_user(
         self: "TokenService",
         user: models.User,
@@ -163,6 +431,33 @@ class TokenService:
             stmt = select(models.Activation).where(models.Activation.user_id == user.id)
             return list(((await session.execute(stmt)).scalars().all()))
 
+    async def count_activations_by_user(self: "TokenService", user: models.User) -> int:
+        """Count tokens activated by user.
+
+        Answered from the activation index when it is ready.
+
+        Args:
+            user: User.
+
+        Returns:
+            Number of activations.
+        """
+        if self.activation_index:
+            count = self.activation_index.count(cast(uuid.UUID, user.id))
+            if count is not None:
+                return count
+
+        async with self.db.session() as session:
+            return int(
+                (
+                    await session.execute(
+                        select(func.count()).where(
+                            models.Activation.user_id == user.id,
+                        ),
+                    )
+                ).scalar_one(),
+            )
+
     async def get_activation(
         self: "TokenService",
         activation_id: str,
@@ -193,11 +488,134 @@ class TokenService:
         Args:
             activation: Activation.
         """
+        user_id = cast(uuid.UUID, activation.user_id)
+        token_id = cast(uuid.UUID, activation.token_id)
         async with self.db.session() as session:
             await session.delete(activation)
+            await apply_activation_deltas(
+                session,
+                [(token_id, activation.time, -1)],
+            )
+            if self.bus:
+                await self.bus.publish(
+                    session,
+                    EVENT_TOPIC,
+                    activation_event("-", user_id, token_id),
+                    local=False,
+                )
             await session.commit()
+        if self.activation_index:
+            self.activation_index.discard(user_id, token_id)
         logger.info("Revoked activation %s", activation.id)
 
+    async def import_activations(
+        self: "TokenService",
+        rows: list[tuple[ActivationAction, uuid.UUID, uuid.UUID]],
+    ) -> ActivationImportResult:
+        """Grant and revoke activations in bulk.
+
+        Rows are loaded into a temporary table and applied with set-based
+        statements in a single transaction, revocations first.
+        Repeated rows and grants of already activated tokens are skipped;
+        grants for unknown users or tokens and revocations of missing
+        activations are counted as not found.
+
+        Args:
+            rows: Triples of action, user id and token id.
+
+        Returns:
+            Import summary.
+        """
+        import_result = ActivationImportResult()
+        unique_rows = list(dict.fromkeys(rows))
+        import_result.skipped = len(rows) - len(unique_rows)
+
+        async with self.db.session() as session:
+            await session.execute(
+                text(
+                    "CREATE TEMP TABLE activation_import "
+                    "(id uuid, action text, user_id uuid, token_id uuid) "
+                    "ON COMMIT DROP",
+                ),
+            )
+            await self.db.copy_records(
+                session,
+                "activation_import",
+                ("id", "action", "user_id", "token_id"),
+                [
+                    (uuid.uuid4(), action, user_id, token_id)
+                    for action, user_id, token_id in unique_rows
+                ],
+            )
+
+            revoked = (
+                await session.execute(
+                    text(
+                        "DELETE FROM activations a USING activation_import i "
+                        "WHERE i.action = 'revoke' "
+                        "AND a.user_id = i.user_id AND a.token_id = i.token_id "
+                        "RETURNING a.user_id, a.token_id, a.time",
+                    ),
+                )
+            ).all()
+            granted = (
+                await session.execute(
+                    text(
+                        "INSERT INTO activations (id, user_id, token_id, time) "
+                        "SELECT i.id, i.user_id, i.token_id, now() "
+                        "FROM activation_import i "
+                        "JOIN users u ON u.id = i.user_id "
+                        "JOIN tokens t ON t.id = i.token_id "
+                        "WHERE i.action = 'grant' "
+                        "ON CONFLICT (user_id, token_id) DO NOTHING "
+                        "RETURNING user_id, token_id, time",
+                    ),
+                )
+            ).all()
+            counts = (
+                await session.execute(
+                    text(
+                        "SELECT "
+                        "count(*) FILTER (WHERE i.action = 'grant'), "
+                        "count(*) FILTER (WHERE i.action = 'grant' "
+                        "AND (u.id IS NULL OR t.id IS NULL)), "
+                        "count(*) FILTER (WHERE i.action = 'revoke') "
+                        "FROM activation_import i "
+                        "LEFT JOIN users u ON u.id = i.user_id "
+                        "LEFT JOIN tokens t ON t.id = i.token_id",
+                    ),
+                )
+            ).one()
+            deltas = [(row.token_id, row.time, -1) for row in revoked]
+            deltas.extend((row.token_id, row.time, 1) for row in granted)
+            await apply_activation_deltas(session, deltas)
+            if self.bus:
+                events = [
+                    activation_event("-", row.user_id, row.token_id) for row in revoked
+                ]
+                events.extend(
+                    activation_event("+", row.user_id, row.token_id) for row in granted
+                )
+                await self.bus.publish_many(session, EVENT_TOPIC, events, local=False)
+            await session.commit()
+
+        if self.activation_index:
+            for row in revoked:
+                self.activation_index.discard(row.user_id, row.token_id)
+            for row in granted:
+                self.activation_index.add(row.user_id, row.token_id)
+
+        grants, grants_not_found, revokes = counts
+        import_result.applied = len(revoked) + len(granted)
+        import_result.not_found = grants_not_found + revokes - len(revoked)
+        import_result.skipped += grants - grants_not_found - len(granted)
+        logger.info(
+            "Imported activations: %d granted, %d revoked",
+            len(granted),
+            len(revoked),
+        )
+        return import_result
+
     async def get_all_activations(self: "TokenService") -> list[models.Activation]:
         """Get all activations.
 
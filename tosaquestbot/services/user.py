@@ -1,23 +1,41 @@
 from typing import TYPE_CHECKING
 
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
+from tosaquestbot.cache import Cache
 from tosaquestbot.db import models
+from tosaquestbot.metrics import instrument_service
 
 if TYPE_CHECKING:
+    from tosaquestbot.cache import InvalidationBus
     from tosaquestbot.db.database import Database
 
+CACHE_TOPIC = "users"
 
+
+@instrument_service
 class UserService:
     """User service."""
 
-    def __init__(self: "UserService", db: "Database"):
+    def __init__(
+        self: "UserService",
+        db: "Database",
+        bus: "InvalidationBus | None" = None,
+        cache_size: int = 10000,
+    ):
         """Initiate service.
 
         Args:
             db: Database.
+            bus: Invalidation bus, users are cached by telegram id when given.
+            cache_size: Maximum number of cached users.
         """
         self.db = db
+        self.bus = bus
+        self.cache: Cache[models.User] | None = (
+            Cache(bus, CACHE_TOPIC, cache_size) if bus else None
+        )
 
     async def get_user_by_telegram_id(
         self: "UserService",
@@ -31,13 +49,23 @@ class UserService:
         Returns:
             User or None.
         """
+        if self.cache:
+            cached = self.cache.get(str(telegram_id))
+            if cached:
+                return cached
+            generation = self.cache.generation
+
         async with self.db.session() as session:
-            return (
+            user = (
                 await session.execute(
                     select(models.User).where(models.User.telegram_id == telegram_id),
                 )
             ).scalar_one_or_none()
 
+        if self.cache and user:
+            self.cache.put(str(telegram_id), user, generation)
+        return user
+
     async def get_user(self: "UserService", user_id: str) -> models.User | None:
         """Get user.
 
@@ -68,7 +96,7 @@ class UserService:
             username: Username.
 
         Returns:
-            User.
+            User, or the existing one if a concurrent update added it first.
         """
         async with self.db.session() as session:
             user = models.User(
@@ -77,7 +105,17 @@ class UserService:
                 username=username,
             )
             session.add(user)
-            await session.commit()
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return (
+                    await session.execute(
+                        select(models.User).where(
+                            models.User.telegram_id == telegram_id,
+                        ),
+                    )
+                ).scalar_one()
             return user
 
     async def update_user(
@@ -94,6 +132,8 @@ class UserService:
         """
         async with self.db.session() as session:
             session.add(user)
+            if self.bus:
+                await self.bus.publish(session, CACHE_TOPIC, str(user.telegram_id))
             await session.commit()
             return user
 
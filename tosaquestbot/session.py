@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import Any
+
+import orjson
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import (
+    PRODUCTION,
+    BareFilesPathWrapper,
+    FilesPathWrapper,
+    SimpleFilesPathWrapper,
+    TelegramAPIServer,
+)
+
+
+def create_session(  # noqa: WPS211
+    api_url: str | None = None,
+    local: bool = False,
+    server_dir: str | None = None,
+    local_dir: str | None = None,
+    timeout: float = 60,
+    connection_limit: int = 100,
+    limit_per_host: int = 0,
+    keepalive_timeout: float = 60,
+    dns_cache_ttl: int = 300,
+) -> AiohttpSession:
+    """Create Bot API session.
+
+    A local Bot API server (``telegram-bot-api --local``) returns absolute
+    file paths, which are read from disk instead of being downloaded. If its
+    working directory is mounted elsewhere here, give both directories.
+
+    Args:
+        api_url: Base URL of the Bot API server, defaults to api.telegram.org.
+        local: Whether the server runs in local mode.
+        server_dir: Working directory of the local server.
+        local_dir: The same directory as mounted for the bot.
+        timeout: Request timeout in seconds.
+        connection_limit: Maximum number of open connections.
+        limit_per_host: Maximum number of open connections to one host, 0 for no limit.
+        keepalive_timeout: Seconds an idle connection is kept open.
+        dns_cache_ttl: Seconds resolved addresses are cached.
+
+    Returns:
+        Bot session.
+    """
+    api = PRODUCTION
+    if api_url:
+        wrap_local_file: FilesPathWrapper = BareFilesPathWrapper()
+        if server_dir and local_dir:
+            wrap_local_file = SimpleFilesPathWrapper(Path(server_dir), Path(local_dir))
+        api = TelegramAPIServer.from_base(
+            api_url,
+            is_local=local,
+            wrap_local_file=wrap_local_file,
+        )
+
+    session = AiohttpSession(
+        api=api,
+        json_loads=orjson.loads,
+        json_dumps=_json_dumps,
+        timeout=timeout,
+    )
+    # aiogram 3.0 has no public connector options
+    session._connector_init.update(  # noqa: WPS437
+        limit=connection_limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    return session
+
+
+def _json_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
@@ -1,4 +1,4 @@
-from pydantic import PostgresDsn
+from pydantic import BaseModel, PostgresDsn
 from pydantic_settings import BaseSettings
 
 
@@ -10,13 +10,177 @@ class HTTPSettings(BaseSettings):
     port: int
 
 
+class BotSessionSettings(BaseModel):
+    """Outbound Bot API session settings."""
+
+    timeout: float = 60
+    connection_limit: int = 100
+    limit_per_host: int = 50
+    keepalive_timeout: float = 60
+    dns_cache_ttl: int = 300
+    download_timeout: float = 30
+    download_connection_limit: int = 16
+
+
+class WebhookSettings(BaseModel):
+    """Webhook settings."""
+
+    inline_replies: bool = False
+    inline_reply_timeout: float = 1
+    queue: bool = False
+    # ignored while the scheduler is enabled, see SchedulerSettings
+    queue_workers: int = 16
+    queue_size: int = 1000
+    drain_timeout: float = 20
+
+
+class SchedulerSettings(BaseModel):
+    """Per-chat update scheduler settings.
+
+    Disabled by default. While enabled, ``concurrency`` limits how many
+    updates are handled at once, and the webhook queue runs ``queue_size``
+    workers in place of ``queue_workers``. Updates of a chat are ordered
+    within one worker process only.
+    """
+
+    enabled: bool = False
+    concurrency: int = 64
+
+
+class MetricsSettings(BaseModel):
+    """Prometheus metrics settings.
+
+    Metrics are served by a separate HTTP server, not by the public webhook
+    app, and ``host`` should stay an internal address.
+    """
+
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9464
+    path: str = "/metrics"
+
+
+class ThrottlingSettings(BaseModel):
+    """Per-user rate limit settings.
+
+    Rates are in messages per second. Buckets are kept in each worker
+    process, so with ``--workers N`` a user may get up to N times the
+    configured rate and burst.
+    """
+
+    enabled: bool = False
+    photo_rate: float = 0.2
+    photo_burst: float = 5
+    command_rate: float = 1
+    command_burst: float = 10
+    idle_timeout: float = 600
+
+
+class TracingSettings(BaseModel):
+    """Per-update tracing settings.
+
+    Disabled by default. While enabled, updates slower than
+    ``slow_update_ms`` are logged with their span tree, and a sample of
+    traces is written to ``export_path`` if set.
+    """
+
+    enabled: bool = False
+    slow_update_ms: int = 2000
+    export_path: str | None = None
+    export_sample_rate: float = 0.01
+
+
+class CacheSettings(BaseModel):
+    """In-process cache settings."""
+
+    enabled: bool = False
+    max_size: int = 10000
+    channel: str = "cache_invalidation"
+    keepalive_interval: float = 30
+    reconnect_interval: float = 5
+
+
+class StickerSettings(BaseModel):
+    """Printable sticker sheet settings."""
+
+    cache_dir: str = ".cache/stickers"
+    columns: int = 4
+    rows: int = 6
+    dpi: int = 300
+    workers: int | None = None
+
+
+class ActivationBufferSettings(BaseModel):
+    """Activation write-behind buffer settings."""
+
+    enabled: bool = False
+    flush_interval_ms: int = 10
+    max_batch: int = 100
+
+
+class VideoSettings(BaseModel):
+    """QR scanning from videos settings."""
+
+    frame_stride: int = 5
+    diff_threshold: float = 4
+    time_budget: float = 10
+    max_codes: int = 5
+
+
+class ActivationIndexSettings(BaseModel):
+    """In-memory activation index settings."""
+
+    enabled: bool = False
+    max_memory_mb: float = 256
+
+
+class StatsSettings(BaseModel):
+    """Statistics settings."""
+
+    token_stats_ttl: float = 60
+
+
+class BroadcastSettings(BaseModel):
+    """Broadcast settings.
+
+    ``claim_timeout`` must be longer than the slowest batch takes to send,
+    about ``batch_size / rate_limit`` seconds plus flood-control pauses,
+    or batches still being sent are given up on as interrupted.
+    """
+
+    rate_limit: float = 25
+    concurrency: int = 8
+    max_retries: int = 3
+    progress_interval: float = 5
+    batch_size: int = 100
+    poll_interval: float = 5
+    claim_timeout: float = 600
+
+
 class Settings(BaseSettings):
     """Application settings."""
 
     db_url: PostgresDsn
     bot_token: str
+    bot_api_url: str | None = None
+    bot_api_local: bool = False
+    bot_api_server_dir: str | None = None
+    bot_api_local_dir: str | None = None
+    bot_session: BotSessionSettings = BotSessionSettings()
     bot_admins: list[int]
     http: HTTPSettings
+    webhook: WebhookSettings = WebhookSettings()
+    scheduler: SchedulerSettings = SchedulerSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    tracing: TracingSettings = TracingSettings()
+    throttling: ThrottlingSettings = ThrottlingSettings()
+    stickers: StickerSettings = StickerSettings()
+    video: VideoSettings = VideoSettings()
+    activation_buffer: ActivationBufferSettings = ActivationBufferSettings()
+    activation_index: ActivationIndexSettings = ActivationIndexSettings()
+    cache: CacheSettings = CacheSettings()
+    broadcast: BroadcastSettings = BroadcastSettings()
+    stats: StatsSettings = StatsSettings()
 
     class Config:  # noqa: D106
         env_file = ".env"
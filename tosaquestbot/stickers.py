@@ -0,0 +1,320 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent import futures
+from logging import getLogger
+from typing import TYPE_CHECKING, AsyncIterator, Literal, Sequence, cast
+
+import qrcode
+from dependency_injector.wiring import Provide, inject
+from PIL import Image, ImageDraw, ImageFont
+
+if TYPE_CHECKING:
+    from dependency_injector.providers import Configuration
+
+    from tosaquestbot.db import models
+
+logger = getLogger(__name__)
+
+# Token ids are encoded upper-case so that they fit the alphanumeric mode:
+# 36 characters fit a version 2 (25x25) symbol at error correction level M.
+# Large modules on a small symbol are what the QR detector locks onto fastest
+# from a phone photo, while level M still tolerates scuffed stickers.
+QR_VERSION = 2
+QR_ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_M
+QR_BOX_SIZE = 12
+QR_BORDER = 4
+
+LABEL_HEIGHT = 64
+LABEL_FONT_SIZE = 32
+LABEL_FONT = "DejaVuSans.ttf"
+
+A4_INCHES = (8.27, 11.69)
+
+# Bump whenever the sticker layout changes to invalidate the cache.
+RENDER_VERSION = 1
+
+# Bot API uploads are limited to 50 MB, part of which the form encoding takes.
+MAX_DOCUMENT_BYTES = 45 * 1024 * 1024
+
+SheetFormat = Literal["pdf", "png"]
+
+
+def _load_font() -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype(LABEL_FONT, LABEL_FONT_SIZE)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def sticker_path(cache_dir: str, token_id: str, name: str) -> str:
+    """Get cache path of a rendered sticker.
+
+    The name is part of the key, so renaming a token redraws its sticker.
+
+    Args:
+        cache_dir: Sticker cache directory.
+        token_id: Token id.
+        name: Token name.
+
+    Returns:
+        Path of the sticker PNG.
+    """
+    digest = hashlib.sha1(
+        f"{RENDER_VERSION}:{name}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return os.path.join(cache_dir, f"{token_id}-{digest[:12]}.png")
+
+
+def render_sticker(cache_dir: str, token_id: str, name: str) -> str:
+    """Render a single sticker into the cache.
+
+    Runs in a worker process.
+
+    Args:
+        cache_dir: Sticker cache directory.
+        token_id: Token id.
+        name: Token name.
+
+    Returns:
+        Path of the sticker PNG.
+    """
+    path = sticker_path(cache_dir, token_id, name)
+
+    qr = qrcode.QRCode(
+        version=QR_VERSION,
+        error_correction=QR_ERROR_CORRECTION,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(token_id.upper())
+    qr.make(fit=False)
+    code = qr.make_image(fill_color="black", back_color="white").get_image()
+
+    sticker = Image.new("L", (code.width, code.height + LABEL_HEIGHT), color=255)
+    sticker.paste(code, (0, 0))
+
+    draw = ImageDraw.Draw(sticker)
+    draw.text(
+        (sticker.width // 2, code.height + LABEL_HEIGHT // 2 - QR_BOX_SIZE),
+        name,
+        fill=0,
+        font=_load_font(),
+        anchor="mm",
+    )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    sticker.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _compose_page(
+    paths: Sequence[str],
+    columns: int,
+    rows: int,
+    dpi: int,
+) -> Image.Image:
+    page = Image.new("L", (int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi)), color=255)
+    cell_width = page.width // columns
+    cell_height = page.height // rows
+    for index, path in enumerate(paths):
+        with Image.open(path) as sticker:
+            sticker.thumbnail((cell_width, cell_height))
+            column, row = index % columns, index // columns
+            page.paste(
+                sticker,
+                (
+                    column * cell_width + (cell_width - sticker.width) // 2,
+                    row * cell_height + (cell_height - sticker.height) // 2,
+                ),
+            )
+    return page
+
+
+def _encode_pdf(
+    pages: Sequence[Sequence[str]],
+    columns: int,
+    rows: int,
+    dpi: int,
+    max_bytes: int,
+) -> tuple[bytes, int]:
+    # pages are composed and appended one by one; appending only adds to
+    # the end of the file, so a page that overflows the document is cut off
+    # again and starts the next one
+    buffer = io.BytesIO()
+    for count, paths in enumerate(pages):
+        page_start = buffer.tell()
+        _compose_page(paths, columns, rows, dpi).save(
+            buffer,
+            format="PDF",
+            append=bool(count),
+            resolution=dpi,
+        )
+        if count and buffer.tell() > max_bytes:
+            buffer.truncate(page_start)
+            return buffer.getvalue(), count
+    return buffer.getvalue(), len(pages)
+
+
+def _encode_png(paths: Sequence[str], columns: int, rows: int, dpi: int) -> bytes:
+    buffer = io.BytesIO()
+    _compose_page(paths, columns, rows, dpi).save(buffer, format="PNG", dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+@functools.cache
+def _render_pool(workers: int | None) -> futures.ProcessPoolExecutor:
+    # processes are spawned on demand and kept for later requests
+    pool = futures.ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    atexit.register(pool.shutdown, cancel_futures=True)
+    return pool
+
+
+async def render_sheets(  # noqa: WPS211
+    tokens: Sequence[tuple[str, str]],
+    cache_dir: str,
+    columns: int,
+    rows: int,
+    dpi: int,
+    sheet_format: SheetFormat = "pdf",
+    workers: int | None = None,
+    max_document_bytes: int = MAX_DOCUMENT_BYTES,
+) -> AsyncIterator[bytes]:
+    """Render paginated sticker sheets.
+
+    Stickers missing from the cache are rendered in a process pool shared
+    by all calls, cached ones are reused as is. Pages are composed and
+    encoded one at a time, and documents are yielded as soon as they are
+    ready, so only one page and one document are held in memory.
+
+    Args:
+        tokens: Pairs of token id and name.
+        cache_dir: Sticker cache directory.
+        columns: Stickers per row.
+        rows: Rows per page.
+        dpi: Page resolution.
+        sheet_format: Output format.
+        workers: Number of render processes.
+        max_document_bytes: Size limit of a PDF, more pages go into the next one.
+
+    Yields:
+        PDF documents of consecutive pages, or one PNG image per page.
+    """
+    if not tokens:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    loop = asyncio.get_running_loop()
+
+    missing = [
+        (token_id, name)
+        for token_id, name in tokens
+        if not os.path.exists(sticker_path(cache_dir, token_id, name))
+    ]
+    logger.info(
+        "Rendering %d stickers, %d cached",
+        len(missing),
+        len(tokens) - len(missing),
+    )
+
+    if missing:
+        pool = _render_pool(workers)
+        try:
+            await asyncio.gather(
+                *[
+                    loop.run_in_executor(
+                        pool, render_sticker, cache_dir, token_id, name
+                    )
+                    for token_id, name in missing
+                ],
+            )
+        except futures.process.BrokenProcessPool:
+            # a render process died, start a new pool next time
+            _render_pool.cache_clear()
+            raise
+
+    paths = [sticker_path(cache_dir, token_id, name) for token_id, name in tokens]
+    per_page = columns * rows
+    pages = [
+        paths[page_start:][:per_page] for page_start in range(0, len(paths), per_page)
+    ]
+    while pages:
+        if sheet_format == "pdf":
+            document, count = await loop.run_in_executor(
+                None,
+                _encode_pdf,
+                pages,
+                columns,
+                rows,
+                dpi,
+                max_document_bytes,
+            )
+        else:
+            document = await loop.run_in_executor(
+                None,
+                _encode_png,
+                pages[0],
+                columns,
+                rows,
+                dpi,
+            )
+            count = 1
+        pages = pages[count:]
+        yield document
+
+
+@inject
+def count_sheet_pages(
+    token_count: int,
+    config: "Configuration" = Provide["config.stickers"],
+) -> int:
+    """Count pages of sticker sheets.
+
+    Args:
+        token_count: Number of tokens.
+        config: Sticker settings.
+
+    Returns:
+        Number of pages.
+    """
+    per_page = cast(int, config["columns"]) * cast(int, config["rows"])
+    return -(-token_count // per_page)
+
+
+@inject
+def render_token_sheets(
+    tokens: Sequence["models.Token"],
+    sheet_format: SheetFormat = "pdf",
+    config: "Configuration" = Provide["config.stickers"],
+) -> AsyncIterator[bytes]:
+    """Render sticker sheets for tokens, ordered by name.
+
+    Args:
+        tokens: Tokens to render.
+        sheet_format: Output format.
+        config: Sticker settings.
+
+    Returns:
+        PDF documents of consecutive pages, or one PNG image per page.
+    """
+    return render_sheets(
+        [
+            (str(token.id), str(token.name))
+            for token in sorted(tokens, key=lambda token: str(token.name))
+        ],
+        cache_dir=cast(str, config["cache_dir"]),
+        columns=cast(int, config["columns"]),
+        rows=cast(int, config["rows"]),
+        dpi=cast(int, config["dpi"]),
+        sheet_format=sheet_format,
+        workers=cast(int | None, config["workers"]),
+    )
@@ -0,0 +1,209 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, Iterator
+
+from sqlalchemy import event
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+    from sqlalchemy.engine import Engine
+
+logger = getLogger(__name__)
+
+SQL_SUMMARY_LENGTH = 80
+
+
+@dataclass
+class Span:
+    """Timed unit of work inside an update."""
+
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+    children: list["Span"] = field(default_factory=list)
+
+    def to_dict(self: "Span", origin: float | None = None) -> dict[str, Any]:
+        """Convert span tree to plain data.
+
+        Args:
+            origin: Start time of the root span.
+
+        Returns:
+            Span tree with times in milliseconds from the root start.
+        """
+        origin = self.started if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+    def format(self: "Span") -> str:
+        """Format span tree as an indented breakdown.
+
+        Returns:
+            One line per span with start offset and duration.
+        """
+        lines: list[str] = []
+        self._format_into(lines, self.started, 0)
+        return "\n".join(lines)
+
+    def _format_into(self: "Span", lines: list[str], origin: float, depth: int) -> None:
+        lines.append(
+            f"{(self.started - origin) * 1000:>9.1f} ms "
+            f"{(self.duration or 0) * 1000:>9.1f} ms  {'  ' * depth}{self.name}",
+        )
+        for child in self.children:
+            child._format_into(lines, origin, depth + 1)  # noqa: WPS437
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span",
+    default=None,
+)
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[Span | None]:
+    """Time a block as a child of the current span.
+
+    Does nothing outside of a traced update.
+
+    Args:
+        name: Span name.
+
+    Yields:
+        The new span, or None when not tracing.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.duration = time.perf_counter() - child.started
+        _current_span.reset(token)
+
+
+@contextlib.contextmanager
+def trace(name: str) -> Iterator[Span]:
+    """Start a root span.
+
+    Args:
+        name: Span name.
+
+    Yields:
+        Root span.
+    """
+    root = Span(name)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.duration = time.perf_counter() - root.started
+        _current_span.reset(token)
+
+
+def instrument_engine(engine: "Engine") -> None:
+    """Record every SQL statement as a span.
+
+    Args:
+        engine: Synchronous engine, ``AsyncEngine.sync_engine`` for async ones.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(  # noqa: WPS211
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    parent = _current_span.get()
+    if parent is not None:
+        statement_span = Span(f"sql {' '.join(statement.split())[:SQL_SUMMARY_LENGTH]}")
+        parent.children.append(statement_span)
+        conn.info.setdefault("trace_spans", []).append(statement_span)
+
+
+def _after_cursor_execute(  # noqa: WPS211
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    spans = conn.info.get("trace_spans")
+    if spans:
+        statement_span = spans.pop()
+        statement_span.duration = time.perf_counter() - statement_span.started
+
+
+async def trace_bot_api(
+    make_request: "NextRequestMiddlewareType[TelegramType]",
+    bot: "Bot",
+    method: "TelegramMethod[TelegramType]",
+) -> "Response[TelegramType]":
+    """Bot session middleware recording outbound requests as spans.
+
+    Args:
+        make_request: Next middleware.
+        bot: Bot.
+        method: Bot API method.
+
+    Returns:
+        Bot API response.
+    """
+    with span(f"bot_api {method.__api_method__}"):
+        return await make_request(bot, method)
+
+
+class TraceExporter:
+    """Writes a sample of finished traces as JSON lines."""
+
+    def __init__(self: "TraceExporter", path: str, sample_rate: float):
+        """Initiate exporter.
+
+        Args:
+            path: Output file, appended to.
+            sample_rate: Fraction of traces to export.
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self._tasks: set[asyncio.Future[None]] = set()
+
+    def export(self: "TraceExporter", root: Span) -> None:
+        """Export trace if sampled.
+
+        Args:
+            root: Root span.
+        """
+        if random.random() >= self.sample_rate:  # noqa: S311
+            return
+        line = json.dumps(root.to_dict())
+        task = asyncio.get_running_loop().run_in_executor(None, self._write, line)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _write(self: "TraceExporter", line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as export_file:
+            export_file.write(f"{line}\n")
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from logging import getLogger
+from typing import TYPE_CHECKING, cast
+
+import cv2
+from cv2.typing import MatLike
+from dependency_injector.wiring import Provide, inject
+
+from tosaquestbot import metrics, tracing
+from tosaquestbot.qrutils import detect_and_decode
+
+if TYPE_CHECKING:
+    from dependency_injector.providers import Configuration
+
+logger = getLogger(__name__)
+
+THUMBNAIL_SIZE = (32, 32)
+
+
+class FrameSampler:
+    """Reads every ``stride``-th frame of a video, skipping near duplicates.
+
+    Frames in between are grabbed but never converted. A sampled frame is
+    compared with the previous candidate on a tiny grayscale thumbnail, so
+    still shots cost almost nothing before they reach the QR decoder.
+    """
+
+    def __init__(self: "FrameSampler", path: str, stride: int, diff_threshold: float):
+        """Open video.
+
+        Args:
+            path: Video file.
+            stride: Sample one frame out of this many.
+            diff_threshold: Mean absolute thumbnail difference, out of 255,
+                below which a frame counts as a duplicate.
+        """
+        self.capture = cv2.VideoCapture(path)
+        self.stride = max(stride, 1)
+        self.diff_threshold = diff_threshold
+        self.sampled = 0
+        self.skipped = 0
+        self._previous: MatLike | None = None
+
+    def next_frame(self: "FrameSampler", deadline: float) -> MatLike | None:
+        """Decode up to the next candidate frame.
+
+        Args:
+            deadline: ``time.monotonic`` value to give up at.
+
+        Returns:
+            RGB frame, or None at the end of the video or past the deadline.
+        """
+        while time.monotonic() < deadline:
+            for _ in range(self.stride - 1):
+                if not self.capture.grab():
+                    return None
+            ok, frame = self.capture.read()
+            if not ok:
+                return None
+            self.sampled += 1
+
+            thumbnail = cv2.resize(
+                cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+                THUMBNAIL_SIZE,
+                interpolation=cv2.INTER_AREA,
+            )
+            if self._previous is not None:
+                difference = cv2.norm(thumbnail, self._previous, cv2.NORM_L1)
+                if difference / thumbnail.size < self.diff_threshold:
+                    self.skipped += 1
+                    continue
+            self._previous = thumbnail
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return None
+
+    def close(self: "FrameSampler") -> None:
+        """Release video."""
+        self.capture.release()
+
+
+async def scan_video(
+    path: str,
+    frame_stride: int = 5,
+    diff_threshold: float = 4,
+    time_budget: float = 10,
+    max_codes: int = 5,
+) -> list[str]:
+    """Find QR codes in a video.
+
+    Frames are read in the default executor while the previous candidate
+    is decoded in the QR pool, and scanning stops at the end of the video,
+    once ``max_codes`` codes are found or when ``time_budget`` runs out.
+
+    Args:
+        path: Video file.
+        frame_stride: Sample one frame out of this many.
+        diff_threshold: Thumbnail difference below which frames are skipped.
+        time_budget: Seconds to spend on the video at most.
+        max_codes: Number of distinct codes to stop at.
+
+    Returns:
+        Distinct decoded texts in order of appearance.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    deadline = started + time_budget
+    sampler = FrameSampler(path, frame_stride, diff_threshold)
+    codes: dict[str, None] = {}
+    pending = loop.run_in_executor(None, sampler.next_frame, deadline)
+    try:  # noqa: WPS501
+        while len(codes) < max_codes:
+            with tracing.span("video.read"):
+                frame = await pending
+            if frame is None:
+                break
+            pending = loop.run_in_executor(None, sampler.next_frame, deadline)
+            for text in await detect_and_decode(frame):
+                if text:
+                    codes.setdefault(text)
+    finally:
+        # the sampler must not be released while a read is in progress
+        await asyncio.wait([pending])
+        sampler.close()
+
+    logger.info(
+        "Scanned %d frames of %s, skipped %d duplicates, found %d codes",
+        sampler.sampled,
+        path,
+        sampler.skipped,
+        len(codes),
+    )
+    metrics.DECODE_LATENCY.labels("video").observe(time.monotonic() - started)
+    return list(codes)
+
+
+@inject
+async def scan_video_file(
+    path: str,
+    config: "Configuration" = Provide["config.video"],
+) -> list[str]:
+    """Find QR codes in a video with configured sampling and limits.
+
+    Args:
+        path: Video file.
+        config: Video settings.
+
+    Returns:
+        Distinct decoded texts in order of appearance.
+    """
+    return await scan_video(
+        path,
+        frame_stride=cast(int, config["frame_stride"]),
+        diff_threshold=cast(float, config["diff_threshold"]),
+        time_budget=cast(float, config["time_budget"]),
+        max_codes=cast(int, config["max_codes"]),
+    )
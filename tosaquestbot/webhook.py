@@ -0,0 +1,311 @@
+import asyncio
+import time
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from tosaquestbot.metrics import REJECTED_PAYLOADS
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+
+logger = getLogger(__name__)
+
+QueuedUpdate = tuple[float, dict[str, Any]]
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Webhook handler that finishes in-flight updates on shutdown.
+
+    Once closing, new updates are refused with 503 so that Telegram
+    redelivers them to another instance, and updates already being handled
+    get up to ``drain_timeout`` seconds to finish; the rest are cancelled.
+    The bot session is left open for the rest of the shutdown sequence.
+
+    Handled inline, an update gets ``inline_reply_timeout`` seconds to put
+    its reply in the response. A slower one is answered empty and keeps
+    running as an in-flight update that replies through the Bot API.
+    """
+
+    def __init__(
+        self: "DrainingRequestHandler",
+        dispatcher: "Dispatcher",
+        bot: "Bot",
+        handle_in_background: bool = True,
+        drain_timeout: float = 20,
+        inline_reply_timeout: float = 55,
+        **data: Any,
+    ):
+        """Initiate handler.
+
+        Args:
+            dispatcher: Dispatcher.
+            bot: Bot.
+            handle_in_background: Answer before the update is handled.
+            drain_timeout: Seconds to wait for in-flight updates on close.
+            inline_reply_timeout: Seconds to wait for an inline reply.
+            data: Extra data passed to the dispatcher.
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=handle_in_background,
+            **data,
+        )
+        self.drain_timeout = drain_timeout
+        self.inline_reply_timeout = inline_reply_timeout
+        self.closing = False
+        self._in_flight: set[asyncio.Future[Any]] = set()
+
+    async def handle(
+        self: "DrainingRequestHandler", request: web.Request
+    ) -> web.Response:
+        """Handle webhook request unless shutting down.
+
+        Args:
+            request: Webhook request.
+
+        Returns:
+            Webhook response.
+        """
+        if self.closing:
+            REJECTED_PAYLOADS.labels("shutting_down").inc()
+            return web.Response(status=503)
+        return await super().handle(request)
+
+    async def close(self: "DrainingRequestHandler") -> None:
+        """Refuse new updates and wait for in-flight ones."""
+        self.closing = True
+        drained, abandoned = await self.drain(self.drain_timeout)
+        if drained or abandoned:
+            logger.info(
+                "Drained %d in-flight updates, abandoned %d",
+                drained,
+                abandoned,
+            )
+
+    async def drain(self: "DrainingRequestHandler", timeout: float) -> tuple[int, int]:
+        """Wait for in-flight updates and cancel those not done in time.
+
+        Args:
+            timeout: Seconds to wait.
+
+        Returns:
+            Numbers of finished and abandoned updates.
+        """
+        if not self._in_flight:
+            return 0, 0
+        logger.info("Waiting for %d in-flight updates", len(self._in_flight))
+        done, not_done = await asyncio.wait(set(self._in_flight), timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        return len(done), len(not_done)
+
+    async def _handle_request(
+        self: "DrainingRequestHandler",
+        bot: "Bot",
+        request: web.Request,
+    ) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        answered = asyncio.Event()
+
+        async def process() -> TelegramMethod[Any] | None:  # noqa: WPS430
+            result = await self.dispatcher.feed_raw_update(
+                bot=bot,
+                update=update,
+                **self.data,
+            )
+            if not isinstance(result, TelegramMethod):
+                return None
+            if answered.is_set():
+                await self.dispatcher.silent_call_request(bot=bot, result=result)
+                return None
+            return result
+
+        task = asyncio.create_task(process())
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        try:
+            await asyncio.wait([task], timeout=self.inline_reply_timeout)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        if not task.done():
+            answered.set()
+            logger.info(
+                "Update %s is slow, replying through the Bot API",
+                update.get("update_id"),
+            )
+            return web.Response(body=self._build_response_writer(bot=bot, result=None))
+        return web.Response(
+            body=self._build_response_writer(bot=bot, result=task.result()),
+        )
+
+    async def _handle_request_background(
+        self: "DrainingRequestHandler",
+        bot: "Bot",
+        request: web.Request,
+    ) -> web.Response:
+        task = asyncio.create_task(
+            self._background_feed_update(
+                bot=bot,
+                update=await request.json(loads=bot.session.json_loads),
+            ),
+        )
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+
+class QueuedRequestHandler(DrainingRequestHandler):
+    """Webhook handler that acknowledges updates before processing them.
+
+    Updates are parsed, put on a bounded queue and answered with 200 right
+    away; a fixed pool of worker tasks feeds them to the dispatcher. When the
+    queue is full the update is refused with 503 and Telegram redelivers it
+    later. Time spent waiting in the queue and time spent in handlers are
+    accounted separately.
+    """
+
+    def __init__(
+        self: "QueuedRequestHandler",
+        dispatcher: "Dispatcher",
+        bot: "Bot",
+        workers: int = 16,
+        max_size: int = 1000,
+        drain_timeout: float = 20,
+        **data: Any,
+    ):
+        """Initiate handler.
+
+        Args:
+            dispatcher: Dispatcher.
+            bot: Bot.
+            workers: Number of updates processed concurrently.
+            max_size: Maximum number of queued updates.
+            drain_timeout: Seconds to process queued updates on close.
+            data: Extra data passed to the dispatcher.
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            drain_timeout=drain_timeout,
+            **data,
+        )
+        self.workers = workers
+        self.active = 0
+
+        self.processed = 0
+        self.rejected = 0
+        self.last_queue_latency = 0.0  # noqa: WPS358
+        self.total_queue_latency = 0.0  # noqa: WPS358
+        self.last_processing_latency = 0.0  # noqa: WPS358
+        self.total_processing_latency = 0.0  # noqa: WPS358
+
+        self._queue: asyncio.Queue[QueuedUpdate] = asyncio.Queue(max_size)
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def pending(self: "QueuedRequestHandler") -> int:
+        """Number of queued updates."""
+        return self._queue.qsize()
+
+    def register(
+        self: "QueuedRequestHandler",
+        app: web.Application,
+        /,
+        path: str,
+        **kwargs: Any,
+    ) -> None:
+        """Register route, worker startup and shutdown callbacks.
+
+        Args:
+            app: Application.
+            path: Route path.
+            kwargs: Extra route arguments.
+        """
+        app.on_startup.append(self._start_workers)  # type: ignore
+        super().register(app, path=path, **kwargs)
+
+    async def close(self: "QueuedRequestHandler") -> None:
+        """Refuse new updates, process queued ones and stop workers."""
+        await super().close()
+        if self.processed:
+            logger.info(
+                "Update queue closed after %d updates, %d rejected, "
+                "%.1f ms average queue wait, %.1f ms average processing",
+                self.processed,
+                self.rejected,
+                self.total_queue_latency / self.processed * 1000,
+                self.total_processing_latency / self.processed * 1000,
+            )
+
+    async def drain(self: "QueuedRequestHandler", timeout: float) -> tuple[int, int]:
+        """Process queued updates and stop workers.
+
+        Args:
+            timeout: Seconds to wait.
+
+        Returns:
+            Numbers of finished and abandoned updates.
+        """
+        processed = self.processed
+        if self.pending or self.active:
+            logger.info("Processing %d queued updates", self.pending + self.active)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass  # noqa: WPS420
+        drained = self.processed - processed
+        abandoned = self.pending + self.active
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        return drained, abandoned
+
+    async def _start_workers(self: "QueuedRequestHandler", _: web.Application) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"update-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def _handle_request_background(
+        self: "QueuedRequestHandler",
+        bot: "Bot",
+        request: web.Request,
+    ) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        try:
+            self._queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            REJECTED_PAYLOADS.labels("queue_full").inc()
+            logger.warning(
+                "Update queue is full, refusing update %s", update.get("update_id")
+            )
+            return web.Response(status=503)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _work(self: "QueuedRequestHandler") -> None:
+        while True:  # noqa: WPS457
+            queued, update = await self._queue.get()
+            started = time.perf_counter()
+            self.active += 1
+            try:
+                await self._background_feed_update(bot=self.bot, update=update)
+            except Exception:
+                logger.exception("Failed to process update %s", update.get("update_id"))
+            finally:
+                finished = time.perf_counter()
+                self.active -= 1
+                self.processed += 1
+                self.last_queue_latency = started - queued
+                self.total_queue_latency += self.last_queue_latency
+                self.last_processing_latency = finished - started
+                self.total_processing_latency += self.last_processing_latency
+                self._queue.task_done()
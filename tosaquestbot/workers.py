@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import signal
+import sys
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+STOP_TIMEOUT = 30
+
+
+def run_worker(argsv: list[str], index: int) -> None:
+    """Run a single worker process.
+
+    Args:
+        argsv: Command line arguments.
+        index: Worker index, worker 0 is the primary one.
+    """
+    from tosaquestbot.__main__ import bootstrap  # noqa: WPS433
+
+    sys.exit(asyncio.run(bootstrap(argsv, worker=index)))
+
+
+async def supervise(argsv: list[str], count: int) -> int:
+    """Run worker processes serving the same port and stop them together.
+
+    Every worker binds the port with ``SO_REUSEPORT`` and the kernel spreads
+    connections between them. When one worker exits or a stop signal
+    arrives, the rest are terminated.
+
+    Args:
+        argsv: Command line arguments passed to the workers.
+        count: Number of workers.
+
+    Returns:
+        Exit code of the first worker that exited on its own, or 0.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(argsv, index),
+            name=f"worker-{index}",
+        )
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    logger.info("Started %d workers", count)
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    while not stopping.is_set() and all(process.is_alive() for process in processes):
+        try:
+            await asyncio.wait_for(stopping.wait(), POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass  # noqa: WPS420
+
+    exit_code = next(
+        (process.exitcode for process in processes if process.exitcode),
+        0,
+    )
+    if exit_code:
+        logger.error("Worker exited with code %d, stopping the rest", exit_code)
+        # killed by a signal, report it the way a shell does
+        exit_code = exit_code if exit_code > 0 else 128 - exit_code
+    else:
+        logger.info("Stopping workers")
+
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        await asyncio.to_thread(process.join, STOP_TIMEOUT)
+        if process.is_alive():
+            logger.warning("Worker %s did not stop in time, killing it", process.name)
+            process.kill()
+            await asyncio.to_thread(process.join)
+
+    return exit_code